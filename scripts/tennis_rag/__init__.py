@@ -0,0 +1,10 @@
+"""
+tennis_rag - Tennis Rules RAG ETL 공용 모듈
+-------------------------------------------
+upload_tennis_rules.py 와 gen_sql_bilingual.py 가 함께 사용하는
+임베딩 캐시 등 공용 구성 요소를 모아둔 패키지입니다.
+
+두 스크립트의 구현(upload.py, gen_sql.py)도 이 패키지에 있으며,
+`python -m tennis_rag <command>` 로 단계별 subcommand 를 실행할 수 있습니다 (cli.py).
+여기서는 아무것도 import 하지 않습니다 (CLI 시작 시간).
+"""
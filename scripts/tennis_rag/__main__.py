@@ -0,0 +1,7 @@
+"""python -m tennis_rag <command> (tennis_rag.cli)"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Embedding Artifact
+------------------
+ETL 결과를 재사용 가능한 columnar artifact 로 저장합니다.
+
+    <dir>/embeddings.npy   float32 [N, dim] 행렬 (L2 정규화, np.load(mmap_mode='r') 로 읽기)
+    <dir>/chunks.parquet   source_file, rule_id, chunk_hash, language, content, metadata
+                           (pyarrow 가 없으면 chunks.jsonl)
+    <dir>/meta.json        모델, 차원, 행 수, sidecar 형식
+    <dir>/lexical.json.gz  rule_id / content BM25 역색인 (lexical.py, 임베딩 없는 조항 검색용)
+    <dir>/ivf.npz, <dir>/quantized/
+                           검색 시 만들어지는 파생 인덱스 (search.py, quantize.py). 만든 시점의
+                           artifact fingerprint (행 수 + created_at) 를 함께 저장하고, 다르면 다시 만듦
+
+ArtifactWriter 는 행을 하나씩 받아 임시 파일에 float32 로 이어 쓰므로 메모리를 거의
+쓰지 않고, close() 에서 .npy 로 변환한 뒤 블록 단위 행렬 연산으로 한 번에 정규화합니다.
+실행이 중간에 실패하면 discard() (또는 with 블록) 가 임시 파일과 쓰다 만 파일을 지웁니다.
+artifact 가 있으면 임베딩을 다시 호출하지 않고 SQL/COPY 출력을 재생성할 수 있습니다.
+"""
+
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lexical import LEXICAL_FILE, LexicalIndexBuilder
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+EMBEDDINGS_FILE = 'embeddings.npy'
+META_FILE = 'meta.json'
+SIDECAR_COLUMNS = ('source_file', 'rule_id', 'chunk_hash', 'language', 'content', 'metadata')
+IVF_FILE = 'ivf.npz'
+QUANTIZED_DIR = 'quantized'
+DERIVED_PATHS = (IVF_FILE, QUANTIZED_DIR)
+OUTPUT_FILES = (EMBEDDINGS_FILE, 'chunks.parquet', 'chunks.jsonl', LEXICAL_FILE, META_FILE)
+NORMALIZE_BLOCK_ROWS = 4096
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """행 단위 L2 정규화 (in-place, 0 벡터는 그대로)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def load_derived(path: Path, fingerprint: str) -> Optional[Dict[str, np.ndarray]]:
+    """파생 인덱스 .npz 를 읽음 (없거나 다른 artifact 에서 만든 것이면 None)"""
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        if 'fingerprint' not in data.files or str(data['fingerprint']) != fingerprint:
+            logger.info(f"🔄 artifact 가 바뀌어 파생 인덱스를 다시 만듭니다: {path}")
+            return None
+        return {name: data[name] for name in data.files}
+
+
+class ArtifactWriter:
+    """행을 stream 으로 받아 artifact 디렉토리에 저장"""
+
+    def __init__(self, directory: Path, model: str, task_type: str = 'retrieval_document'):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.task_type = task_type
+        self.dim: Optional[int] = None
+        self.count = 0
+        self._finishing = False
+        self._closed = False
+        self._remove_derived()
+
+        self._vectors_tmp = self.directory / 'embeddings.f32.tmp'
+        self._rows_tmp = self.directory / 'chunks.jsonl.tmp'
+        self._vectors = open(self._vectors_tmp, 'wb')
+        self._rows = open(self._rows_tmp, 'w', encoding='utf-8')
+        self._lexical = LexicalIndexBuilder()
+
+    def _remove_derived(self) -> None:
+        """이전 artifact 로 만든 ivf.npz / quantized/ 삭제"""
+        for name in DERIVED_PATHS:
+            path = self.directory / name
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+
+    def add(self, row: Dict, embedding: Sequence[float]) -> None:
+        """
+        Args:
+            row: source_file, rule_id, chunk_hash, content, metadata (language 는 metadata 에서 가져옴)
+            embedding: 임베딩 벡터 (정규화 전이어도 됨)
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vector.shape[0]
+        elif vector.shape[0] != self.dim:
+            raise ValueError(f"임베딩 차원 불일치: {vector.shape[0]} != {self.dim}")
+
+        self._vectors.write(vector.tobytes())
+        metadata = row.get('metadata') or {}
+        self._rows.write(json.dumps({
+            'source_file': row['source_file'],
+            'rule_id': row['rule_id'],
+            'chunk_hash': row['chunk_hash'],
+            'language': row.get('language') or metadata.get('language'),
+            'content': row['content'],
+            'metadata': json.dumps(metadata, ensure_ascii=False),
+        }, ensure_ascii=False) + '\n')
+        self._lexical.add(row['rule_id'], row['content'])
+        self.count += 1
+
+    def __enter__(self) -> 'ArtifactWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is not None:
+            self.discard()
+
+    def discard(self) -> None:
+        """
+        실패한 실행의 결과 삭제: 임시 파일과 close() 가 쓰다 만 artifact 파일
+
+        close() 전에 실패하면 디렉토리에 있던 이전 artifact 는 그대로 남습니다.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._vectors.close()
+        self._rows.close()
+        paths = [self._vectors_tmp, self._rows_tmp]
+        if self._finishing:
+            # .npy 를 덮어쓰기 시작했으면 이전 meta.json 과도 맞지 않으므로 artifact 전체 삭제
+            paths += [self.directory / name for name in OUTPUT_FILES]
+        for path in paths:
+            path.unlink(missing_ok=True)
+        logger.warning(f"⚠️  Artifact 저장 취소, 쓰다 만 파일 삭제: {self.directory}")
+
+    def close(self) -> Path:
+        """.npy / sidecar / meta.json 작성 후 artifact 디렉토리 반환 (실패하면 discard)"""
+        try:
+            self._finish()
+        except BaseException:
+            self.discard()
+            raise
+        self._closed = True
+        return self.directory
+
+    def _finish(self) -> None:
+        self._finishing = True
+        self._vectors.close()
+        self._rows.close()
+        dim = self.dim or 0
+
+        # raw float32 → .npy (헤더 작성 후 블록 복사), 이후 memmap 으로 블록 단위 정규화
+        npy_path = self.directory / EMBEDDINGS_FILE
+        matrix = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.float32,
+                                           shape=(self.count, dim))
+        raw = np.memmap(self._vectors_tmp, dtype=np.float32, mode='r',
+                        shape=(self.count, dim)) if self.count and dim else None
+        for start in range(0, self.count, NORMALIZE_BLOCK_ROWS):
+            end = min(start + NORMALIZE_BLOCK_ROWS, self.count)
+            block = np.array(raw[start:end])
+            matrix[start:end] = normalize_rows(block)
+        matrix.flush()
+        del matrix, raw
+        self._vectors_tmp.unlink()
+
+        sidecar = self._write_sidecar()
+        self._lexical.build().save(self.directory)
+
+        with open(self.directory / META_FILE, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': ARTIFACT_VERSION,
+                'model': self.model,
+                'task_type': self.task_type,
+                'dim': dim,
+                'count': self.count,
+                'normalized': True,
+                'dtype': 'float32',
+                'sidecar': sidecar,
+                'lexical': LEXICAL_FILE,
+                'created_at': datetime.now(timezone.utc).isoformat(),
+            }, f, ensure_ascii=False, indent=1)
+
+        logger.info(f"✓ Artifact 저장: {self.directory} ({self.count} x {dim} float32, {sidecar})")
+
+    def _write_sidecar(self) -> str:
+        if _has_pyarrow():
+            import pyarrow as pa
+            import pyarrow.json as pa_json
+            import pyarrow.parquet as pq
+
+            if self.count:
+                table = pa_json.read_json(str(self._rows_tmp))
+                table = table.select(list(SIDECAR_COLUMNS))
+            else:
+                table = pa.table({name: pa.array([], pa.string()) for name in SIDECAR_COLUMNS})
+            pq.write_table(table, self.directory / 'chunks.parquet', compression='zstd')
+            self._rows_tmp.unlink()
+            return 'chunks.parquet'
+
+        os.replace(self._rows_tmp, self.directory / 'chunks.jsonl')
+        return 'chunks.jsonl'
+
+
+def write_artifact(directory: Path, rows: Sequence[Dict], embeddings: Sequence[Sequence[float]],
+                   model: str, task_type: str = 'retrieval_document') -> Path:
+    """rows/embeddings 리스트를 한 번에 저장"""
+    with ArtifactWriter(directory, model, task_type) as writer:
+        for row, embedding in zip(rows, embeddings):
+            writer.add(row, embedding)
+        return writer.close()
+
+
+class EmbeddingArtifact:
+    """저장된 artifact 읽기 (임베딩 행렬은 memory-map)"""
+
+    def __init__(self, directory: Path, mmap: bool = True):
+        self.directory = Path(directory)
+        with open(self.directory / META_FILE, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"지원하지 않는 artifact 버전: {self.meta.get('version')}")
+
+        self.embeddings: np.ndarray = np.load(self.directory / EMBEDDINGS_FILE,
+                                              mmap_mode='r' if mmap else None)
+        self.rows: List[Dict] = self._read_sidecar()
+
+    @property
+    def model(self) -> str:
+        return self.meta['model']
+
+    @property
+    def dim(self) -> int:
+        return self.meta['dim']
+
+    @property
+    def fingerprint(self) -> str:
+        """파생 인덱스가 이 artifact 로 만들어졌는지 확인하는 값 (행 수 + created_at)"""
+        return f"{len(self.embeddings)}:{self.meta.get('created_at', '')}"
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _read_sidecar(self) -> List[Dict]:
+        path = self.directory / self.meta['sidecar']
+        if path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            rows = pq.read_table(path).to_pylist()
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+        for row in rows:
+            row['metadata'] = json.loads(row['metadata']) if row.get('metadata') else {}
+        return rows
+
+    def iter_rows(self) -> Iterator[Dict]:
+        """SQL/COPY 출력용 행 (embedding 은 float32 ndarray)"""
+        for row, vector in zip(self.rows, self.embeddings):
+            yield {
+                'source_file': row['source_file'],
+                'rule_id': row['rule_id'],
+                'language': row.get('language'),
+                'content': row['content'],
+                'metadata': row['metadata'],
+                'embedding': vector,
+                'chunk_hash': row['chunk_hash'],
+            }
+
+    def nbytes(self) -> Tuple[int, int]:
+        """(임베딩 행렬 크기, sidecar 파일 크기)"""
+        return (
+            (self.directory / EMBEDDINGS_FILE).stat().st_size,
+            (self.directory / self.meta['sidecar']).stat().st_size,
+        )
+
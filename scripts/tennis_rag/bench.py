@@ -0,0 +1,279 @@
+"""
+Retrieval Benchmark
+-------------------
+버전이 붙은 golden set (한국어/영어 질문 → 기대 rule_id)으로 embedding artifact 의
+검색 품질과 속도를 측정합니다. Supabase 없이 로컬 인덱스(tennis_rag.search)만 사용합니다.
+
+측정 항목 (artifact x match_threshold 조합마다):
+- recall@k, MRR, 질문별 순위
+- 검색 latency p50 / p95 (질문 임베딩 시간 제외)
+- chunk 수, 추정 임베딩 토큰 수
+
+질문 임베딩은 임베딩 캐시에서만 읽습니다 (완전 오프라인). 캐시에 없는 질문이 있으면
+--online 으로 한 번 실행해 캐시를 채우세요. local provider 로 만든 artifact 는
+캐시 없이도 로컬에서 질문을 임베딩합니다.
+
+사용법:
+    python -m tennis_rag.bench --artifact ../insert_rules.artifact --output bench.json
+    python -m tennis_rag.bench --artifact a.artifact --artifact b.artifact --threshold 0.3 --threshold 0.5
+    python -m tennis_rag.bench --artifact a.artifact --baseline bench_prev.json
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .artifact import EmbeddingArtifact
+from .embedding_cache import add_cache_arguments, cache_from_args
+from .rate_limit import estimate_tokens
+from .search import (
+    DEFAULT_MATCH_THRESHOLD, IVFIndex, VectorIndex,
+    embed_queries, query_client,
+)
+from .providers import add_provider_arguments, embed_fn_from_args, provider_for_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GOLDEN_SET = Path(__file__).parent / 'golden' / 'golden_set_v1.json'
+DEFAULT_K_VALUES = (1, 3, 5, 10)
+DEFAULT_REPEAT = 5
+
+RULE_NUMBER = re.compile(r'^(?:rule|article|제)?\s*(\d+)\s*(?:조|\.|\b)', re.IGNORECASE)
+APPENDIX = re.compile(r'^(?:appendix|부록)\s*([ivx]+)\b|^([ivx]+)\.\s', re.IGNORECASE)
+
+
+def rule_key(rule_id: str) -> str:
+    """
+    chunker 마다 다른 rule_id 표기를 비교 가능한 key 로 변환
+
+    'Rule 5', '5. SCORE IN A GAME', '**5. 게임 스코어**', '제5조' → 'rule-5'
+    'Appendix VI ...', '부록 VI', 'VI. ALTERNATIVE ...'        → 'appendix-vi'
+    """
+    text = rule_id.replace('**', '').strip()
+    match = APPENDIX.match(text)
+    if match:
+        return f"appendix-{(match.group(1) or match.group(2)).lower()}"
+    match = RULE_NUMBER.match(text)
+    if match:
+        return f"rule-{int(match.group(1))}"
+    return re.sub(r'\s+', ' ', text.lower())
+
+
+def load_golden_set(path: Path = DEFAULT_GOLDEN_SET) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    for item in golden['questions']:
+        item['expected'] = [key.lower() for key in item['expected']]
+    return golden
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def _cache_only_embed_fn(content, **kwargs):
+    raise LookupError(f"질문 {len(content)}개가 임베딩 캐시에 없습니다. --online 으로 한 번 실행하세요")
+
+
+def golden_query_vectors(artifact_dir: Path, questions: Sequence[str], args, cache) -> np.ndarray:
+    """
+    artifact 와 같은 모델로 질문 임베딩 (기본: 캐시에서만 읽음, --online 이면 API 호출)
+
+    local provider 로 만든 artifact 는 캐시 없이 로컬에서 임베딩합니다.
+    실패한 질문이 있으면 RuntimeError.
+    """
+    meta = EmbeddingArtifact(artifact_dir).meta
+    provider = args.embedding_provider or provider_for_model(meta['model'])
+    embed_fn = _cache_only_embed_fn
+    if args.online or provider == 'local':
+        embed_fn = embed_fn_from_args(args, provider=provider)
+    return embed_queries(questions, query_client(meta, cache, embed_fn))
+
+
+def score_question(expected: Iterable[str], ranked_keys: Sequence[str],
+                   k_values: Sequence[int]) -> Dict:
+    """한 질문의 recall@k 와 reciprocal rank"""
+    expected = set(expected)
+    first_rank = next((rank for rank, key in enumerate(ranked_keys, 1) if key in expected), None)
+    recall = {}
+    for k in k_values:
+        found = expected.intersection(ranked_keys[:k])
+        recall[k] = len(found) / len(expected)
+    return {'rank': first_rank, 'rr': 1.0 / first_rank if first_rank else 0.0, 'recall': recall}
+
+
+def summarize(scores: Sequence[Dict], k_values: Sequence[int]) -> Dict:
+    count = len(scores) or 1
+    summary = {f"recall@{k}": round(sum(s['recall'][k] for s in scores) / count, 4) for k in k_values}
+    summary['mrr'] = round(sum(s['rr'] for s in scores) / count, 4)
+    summary['questions'] = len(scores)
+    return summary
+
+
+def benchmark_artifact(artifact_dir: Path, golden: Dict, query_vectors: np.ndarray,
+                       thresholds: Sequence[float], k_values: Sequence[int],
+                       ivf: bool = False, n_probe: int = 8, repeat: int = DEFAULT_REPEAT) -> List[Dict]:
+    """artifact 하나를 threshold 별로 측정한 결과 목록"""
+    artifact = EmbeddingArtifact(artifact_dir)
+    if ivf:
+        index = IVFIndex.from_artifact(artifact_dir, n_probe=n_probe)
+    else:
+        index = VectorIndex(artifact.embeddings, artifact.rows)
+
+    keys = [rule_key(row['rule_id']) for row in artifact.rows]
+    embedding_tokens = sum(estimate_tokens(row['content']) for row in artifact.rows)
+    match_count = max(k_values)
+    questions = golden['questions']
+
+    results = []
+    for threshold in thresholds:
+        latencies = []
+        for _ in range(repeat):
+            for vector in query_vectors:
+                started = time.perf_counter()
+                index.search(vector, threshold, match_count)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        matches = index.search_batch(query_vectors, threshold, match_count)
+        per_question = []
+        scores_by_language: Dict[str, List[Dict]] = {}
+        for item, found in zip(questions, matches):
+            ranked_keys = [keys[m.id] for m in found]
+            score = score_question(item['expected'], ranked_keys, k_values)
+            scores_by_language.setdefault(item['language'], []).append(score)
+            per_question.append({
+                'id': item['id'],
+                'rank': score['rank'],
+                'top': ranked_keys[:3],
+                'top_similarity': round(found[0].similarity, 4) if found else None,
+            })
+
+        all_scores = [s for group in scores_by_language.values() for s in group]
+        results.append({
+            'artifact': str(artifact_dir),
+            'model': artifact.model,
+            'dim': artifact.dim,
+            'index': f"ivf(n_probe={n_probe})" if ivf else 'exact',
+            'match_threshold': threshold,
+            'match_count': match_count,
+            'chunks': len(artifact),
+            'embedding_tokens': embedding_tokens,
+            'metrics': summarize(all_scores, k_values),
+            'by_language': {lang: summarize(group, k_values)
+                            for lang, group in sorted(scores_by_language.items())},
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 4),
+                'p95': round(percentile(latencies, 95), 4),
+                'mean': round(float(np.mean(latencies)), 4),
+            },
+            'questions': per_question,
+        })
+    return results
+
+
+def compare(report: Dict, baseline: Dict) -> List[str]:
+    """baseline 보고서 대비 지표 변화 (같은 artifact / index / threshold 끼리 비교)"""
+    def key(result):
+        return result['artifact'], result['index'], result['match_threshold']
+
+    previous = {key(r): r for r in baseline.get('results', [])}
+    lines = []
+    for result in report['results']:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        deltas = []
+        for name, value in result['metrics'].items():
+            old = before['metrics'].get(name)
+            if isinstance(value, float) and old is not None and value != old:
+                deltas.append(f"{name} {old:.4f}→{value:.4f}")
+        p95_before, p95 = before['latency_ms']['p95'], result['latency_ms']['p95']
+        deltas.append(f"p95 {p95_before:.3f}→{p95:.3f}ms")
+        lines.append(f"{result['artifact']} [{result['index']}, threshold {result['match_threshold']}]: "
+                     + ', '.join(deltas))
+    return lines
+
+
+def print_report(report: Dict) -> None:
+    for result in report['results']:
+        metrics = result['metrics']
+        recalls = ' '.join(f"{k}={v:.3f}" for k, v in metrics.items() if k.startswith('recall@'))
+        print(f"\n📊 {result['artifact']} ({result['model']}, {result['chunks']} chunks, "
+              f"~{result['embedding_tokens']:,} tokens) [{result['index']}, "
+              f"threshold {result['match_threshold']}]")
+        print(f"   {recalls} MRR={metrics['mrr']:.3f}")
+        print(f"   latency p50={result['latency_ms']['p50']:.3f}ms p95={result['latency_ms']['p95']:.3f}ms")
+        top_k = f"recall@{max(report['k_values'])}"
+        for lang, summary in result['by_language'].items():
+            print(f"   [{lang}] {top_k}={summary[top_k]:.3f} MRR={summary['mrr']:.3f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline retrieval benchmark for tennis rules artifacts')
+    parser.add_argument('--artifact', action='append', required=True,
+                        help='측정할 embedding artifact 디렉토리 (여러 번 지정 가능)')
+    parser.add_argument('--golden-set', default=str(DEFAULT_GOLDEN_SET), help='golden set JSON')
+    parser.add_argument('--threshold', type=float, action='append',
+                        help=f'match_threshold (여러 번 지정 가능, 기본값: {DEFAULT_MATCH_THRESHOLD})')
+    parser.add_argument('--k', type=int, action='append', help='recall@k 의 k (기본값: 1 3 5 10)')
+    parser.add_argument('--ivf', action='store_true', help='IVF 근사 인덱스로 측정')
+    parser.add_argument('--n-probe', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='latency 측정 반복 횟수')
+    parser.add_argument('--online', action='store_true',
+                        help='캐시에 없는 질문은 artifact 를 만든 provider (기본: Gemini)로 임베딩')
+    parser.add_argument('--output', default='bench_results.json', help='결과 JSON 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON')
+    add_cache_arguments(parser)
+    add_provider_arguments(parser, default=None)
+    args = parser.parse_args(argv)
+
+    golden = load_golden_set(Path(args.golden_set))
+    thresholds = args.threshold or [DEFAULT_MATCH_THRESHOLD]
+    k_values = sorted(set(args.k or DEFAULT_K_VALUES))
+    cache = cache_from_args(args)
+    questions = [item['question'] for item in golden['questions']]
+
+    report = {
+        'golden_set': {'path': args.golden_set, 'version': golden['version'], 'questions': len(questions)},
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'k_values': k_values,
+        'results': [],
+    }
+    for artifact_dir in args.artifact:
+        try:
+            query_vectors = golden_query_vectors(Path(artifact_dir), questions, args, cache)
+        except RuntimeError as e:
+            logger.error(f"❌ {artifact_dir}: {e}")
+            return 1
+        report['results'].extend(benchmark_artifact(
+            Path(artifact_dir), golden, query_vectors, thresholds, k_values,
+            ivf=args.ivf, n_probe=args.n_probe, repeat=args.repeat,
+        ))
+    cache.close()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+    print_report(report)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            lines = compare(report, json.load(f))
+        print('\n🔁 baseline 대비:' if lines else '\n🔁 baseline 과 겹치는 설정이 없습니다')
+        for line in lines:
+            print(f"   {line}")
+    print(f"\n✓ 결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
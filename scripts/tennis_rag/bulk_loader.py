@@ -0,0 +1,294 @@
+"""
+Bulk Loader
+-----------
+tennis_rules 적재용 bulk loader 입니다.
+
+- 큰 batch (기본 200행) 단위 upsert
+- 최대 max_in_flight 개의 batch 를 동시에 전송
+- 네트워크/timeout/5xx 오류는 batch 그대로 backoff 후 재시도
+- 4xx/제약 조건 같은 데이터 오류만 batch 를 절반씩 나눠 재시도 (문제 행만 격리)
+- 끝까지 실패한 batch 는 retry queue 파일(JSONL)에 보관하고, 다음 실행 시작 시 먼저 재전송
+- 실행이 끝나면 실패 내역을 담은 오류 리포트(JSON)를 남김
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .embedding_cache import DEFAULT_CACHE_DIR
+from .rate_limit import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPLOAD_BATCH_SIZE = 200
+DEFAULT_UPLOAD_CONCURRENCY = 4
+DEFAULT_RETRY_QUEUE_PATH = DEFAULT_CACHE_DIR / 'retry_queue.jsonl'
+# 행 내용 때문에 실패하는 SQLSTATE class (22: 잘못된 값, 23: 제약 조건 위반, 42: 없는 컬럼 등)
+DATA_ERROR_SQLSTATE_CLASSES = ('22', '23', '42')
+DEFAULT_REPORT_PATH = DEFAULT_CACHE_DIR / 'load_report.json'
+
+Record = Dict
+WriteFn = Callable[[List[Record]], None]
+ResultFn = Callable[[List[Record], bool], None]
+
+
+@dataclass
+class LoadReport:
+    """bulk load 결과 요약"""
+    loaded: int = 0
+    failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    replayed: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.loaded / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'loaded': self.loaded,
+            'failed': self.failed,
+            'batches': self.batches,
+            'retries': self.retries,
+            'replayed': self.replayed,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors,
+        }
+
+
+def is_data_error(exc: Exception) -> bool:
+    """
+    같은 행을 다시 보내도 실패하는 데이터 오류인지 (HTTP 4xx, PostgREST/SQLSTATE 데이터 오류, 직렬화 실패)
+
+    네트워크 오류, timeout, 408/429/5xx 와 알 수 없는 오류는 False (batch 그대로 재시도)
+    """
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return 400 <= status < 500 and status not in (408, 429)
+    code = str(getattr(exc, 'code', None) or '')
+    if code.startswith('PGRST') or (len(code) == 5 and code[:2] in DATA_ERROR_SQLSTATE_CLASSES):
+        return True
+    return isinstance(exc, (TypeError, ValueError))
+
+
+class BulkLoader:
+    """batch upsert 를 동시에 전송하고 실패한 batch 를 재시도/보관"""
+
+    def __init__(self, write_fn: WriteFn,
+                 batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE,
+                 max_in_flight: int = DEFAULT_UPLOAD_CONCURRENCY,
+                 max_retries: int = 3,
+                 retry_queue_path: Optional[Path] = DEFAULT_RETRY_QUEUE_PATH,
+                 on_result: Optional[ResultFn] = None):
+        """
+        Args:
+            write_fn: records 리스트 1개를 저장하는 함수 (실패 시 예외 발생)
+            batch_size: batch 1개의 행 수
+            max_in_flight: 동시에 전송할 최대 batch 수
+            max_retries: 일시적 오류일 때 batch 당 재시도 횟수 (데이터 오류는 재시도 없이 절반으로 나눔)
+            retry_queue_path: 최종 실패 batch 를 보관할 JSONL 파일 (None 이면 보관 안 함)
+            on_result: batch 완료 시 (records, 성공 여부) 로 호출 (호출한 스레드에서 실행)
+        """
+        self.write_fn = write_fn
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.retry_queue_path = Path(retry_queue_path) if retry_queue_path else None
+        self.on_result = on_result
+        self.report = LoadReport()
+
+        self._buffer: List[Record] = []
+        self._inflight: Dict[Future, List[Record]] = {}
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        self._started = time.monotonic()
+        self._dead_letters: List[Dict] = []
+        self._queued = 0  # retry queue 파일에 이미 기록된 _dead_letters 수
+        self._lock = threading.Lock()
+
+    def replay_retry_queue(self) -> int:
+        """
+        이전 실행에서 남은 실패 batch 를 먼저 재전송
+
+        queue 파일은 재전송이 모두 끝난 뒤에 이번에도 실패한 행만 남기도록 다시 씁니다
+        (중간에 중단되면 파일이 그대로 남아 다음 실행에서 다시 재전송).
+        """
+        if not self.retry_queue_path or not self.retry_queue_path.exists():
+            return 0
+
+        with open(self.retry_queue_path, 'r', encoding='utf-8') as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+
+        records = [record for entry in entries for record in entry['records']]
+        if records:
+            logger.info(f"↻ retry queue 재전송: {len(entries)} batch, {len(records)}행")
+            self.report.replayed += len(records)
+            self.add_many(records)
+            self.flush()
+
+        self._write_retry_queue(self._dead_letters[self._queued:], mode='w')
+        self._queued = len(self._dead_letters)
+        return len(records)
+
+    def _write_retry_queue(self, entries: List[Dict], mode: str = 'a') -> None:
+        """실패 batch 를 queue 파일에 기록 (mode='w' 는 임시 파일에 쓴 뒤 교체, 비어 있으면 삭제)"""
+        if mode == 'w' and not entries:
+            self.retry_queue_path.unlink(missing_ok=True)
+            return
+        if not entries:
+            return
+        self.retry_queue_path.parent.mkdir(parents=True, exist_ok=True)
+        path = self.retry_queue_path.with_suffix('.tmp') if mode == 'w' else self.retry_queue_path
+        with open(path, mode, encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        if mode == 'w':
+            os.replace(path, self.retry_queue_path)
+
+    def add(self, record: Record) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._dispatch(self._buffer)
+            self._buffer = []
+
+    def add_many(self, records: List[Record]) -> None:
+        for record in records:
+            self.add(record)
+
+    def _dispatch(self, batch: List[Record]) -> None:
+        # in-flight 가 가득 차면 하나가 끝날 때까지 대기 (backpressure)
+        while len(self._inflight) >= self.max_in_flight:
+            self._reap(block=True)
+        self._inflight[self._pool.submit(self._write_with_retry, batch)] = batch
+        self.report.batches += 1
+
+    def _reap(self, block: bool) -> None:
+        """완료된 batch 결과 처리 (on_result 는 호출한 스레드에서 실행)"""
+        if not self._inflight:
+            return
+        done, _ = wait(list(self._inflight), timeout=None if block else 0,
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            batch = self._inflight.pop(future)
+            failed = future.result()
+            if failed:
+                self._dead_letters.extend(failed)
+            failed_rows = sum(len(entry['records']) for entry in failed)
+            self.report.loaded += len(batch) - failed_rows
+            self.report.failed += failed_rows
+            if self.on_result is not None:
+                failed_ids = {id(r) for entry in failed for r in entry['records']}
+                ok_records = [r for r in batch if id(r) not in failed_ids]
+                if ok_records:
+                    self.on_result(ok_records, True)
+                for entry in failed:
+                    self.on_result(entry['records'], False)
+
+    def _write_with_retry(self, batch: List[Record]) -> List[Dict]:
+        """
+        batch 를 저장합니다 (worker 스레드). 일시적 오류는 batch 그대로 재시도하고,
+        데이터 오류는 절반씩 나눠 문제 행만 남깁니다. 끝까지 실패한 부분을 {'records', 'error'} 리스트로 반환합니다.
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.write_fn(batch)
+                return []
+            except Exception as e:
+                error = e
+                if is_data_error(e):
+                    break   # 같은 batch 로는 다시 실패 → 나눠서 문제 행 격리
+                if attempt < self.max_retries:
+                    with self._lock:
+                        self.report.retries += 1
+                    delay = backoff_delay(attempt, base=0.5, cap=10.0)
+                    logger.warning(f"⚠️  batch 업로드 재시도 {attempt + 1}/{self.max_retries} "
+                                   f"({len(batch)}행, {delay:.1f}초 후): {e}")
+                    time.sleep(delay)
+
+        if len(batch) > 1 and is_data_error(error):
+            middle = len(batch) // 2
+            return self._write_with_retry(batch[:middle]) + self._write_with_retry(batch[middle:])
+
+        logger.error(f"❌ 업로드 실패 ({len(batch)}행): {error}")
+        return [{'records': batch, 'error': str(error)}]
+
+    def flush(self) -> None:
+        """버퍼에 남은 행을 전송하고 모든 batch 완료까지 대기"""
+        if self._buffer:
+            self._dispatch(self._buffer)
+            self._buffer = []
+        while self._inflight:
+            self._reap(block=True)
+
+    def close(self, report_path: Optional[Path] = DEFAULT_REPORT_PATH) -> LoadReport:
+        """flush 후 실패 batch 를 retry queue 에 기록하고 리포트 반환"""
+        self.flush()
+        self._pool.shutdown()
+        self.report.elapsed_seconds = time.monotonic() - self._started
+
+        if self.retry_queue_path:
+            # replay 에서 다시 실패한 batch 는 replay_retry_queue 가 이미 기록함
+            self._write_retry_queue(self._dead_letters[self._queued:])
+
+        for entry in self._dead_letters:
+            for record in entry['records']:
+                self.report.errors.append({
+                    'source_file': record.get('source_file'),
+                    'rule_id': record.get('rule_id'),
+                    'chunk_hash': record.get('chunk_hash'),
+                    'error': entry['error'],
+                })
+
+        if report_path:
+            report_path = Path(report_path)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = report_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.report.to_dict(), f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, report_path)
+
+        self.log_report()
+        return self.report
+
+    def log_report(self) -> None:
+        r = self.report
+        logger.info(
+            f"Bulk load: {r.loaded}행 업로드, 실패 {r.failed}행, {r.batches} batch, "
+            f"재시도 {r.retries}, {r.rows_per_second:.1f} rows/sec ({r.elapsed_seconds:.1f}초)"
+        )
+        if r.failed and self.retry_queue_path:
+            logger.error(f"❌ 실패한 {r.failed}행은 retry queue에 보관됨: {self.retry_queue_path} "
+                         f"(다음 실행 시 자동 재전송)")
+
+
+def add_bulk_load_arguments(parser) -> None:
+    parser.add_argument(
+        '--upload-batch-size',
+        type=int,
+        default=DEFAULT_UPLOAD_BATCH_SIZE,
+        help=f'upsert batch 1개의 행 수 (기본값: {DEFAULT_UPLOAD_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--upload-concurrency',
+        type=int,
+        default=DEFAULT_UPLOAD_CONCURRENCY,
+        help=f'동시에 전송할 upsert batch 수 (기본값: {DEFAULT_UPLOAD_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--retry-queue',
+        type=str,
+        default=str(DEFAULT_RETRY_QUEUE_PATH),
+        help=f'실패 batch 보관 파일 (기본값: {DEFAULT_RETRY_QUEUE_PATH})'
+    )
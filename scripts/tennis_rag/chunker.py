@@ -0,0 +1,288 @@
+"""
+Rule Chunker
+------------
+upload_tennis_rules.py 와 gen_sql_bilingual.py 가 함께 사용하는 조항 단위 chunking 엔진입니다.
+
+- 미리 컴파일한 제목 패턴 하나로 텍스트를 한 번만 훑음 (finditer)
+- 페이지 stream 을 받아 완성된 조항부터 바로 yield (버퍼는 조항 1개 크기)
+- chunk 크기는 글자 수가 아니라 추정 토큰 수로 제한 (임베딩 입력 한도 이하)
+- 제목을 찾지 못한 문서는 토큰 기준 overlap window 로 나눔
+
+같은 텍스트는 어느 스크립트에서 실행해도 같은 chunk 가 나옵니다.
+
+사용법 (scripts/ 에서, 임베딩 없이 chunk 만 확인):
+    python -m tennis_rag chunk english_rules.txt
+    python -m tennis_rag chunk ./tennis-rules-pdfs --output chunks.jsonl
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from .rate_limit import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 1800      # 임베딩 입력 한도(2048 토큰)보다 여유 있게
+DEFAULT_WINDOW_TOKENS = 400    # 제목이 없는 문서의 window 크기
+DEFAULT_OVERLAP_TOKENS = 64
+MIN_CHUNK_CHARS = 50
+INTRO_RULE_ID = 'Foreword/Intro'
+
+# 줄 단위 제목 패턴
+#  - markdown 굵은 제목: **1. 코트**, **Rule 5 ...**, **a. ...**, **APPENDIX IV ...**
+#    (페이지/목차/표지 등 장식용 굵은 글씨는 제외)
+#  - PDF 원문의 대문자 제목: 1. THE COURT, APPENDIX IV (앞에 붙은 쪽 번호 " 2 1. THE COURT" 는 제외)
+#  - 일반 텍스트 조항: 제5조, 제2장, Article 10, Rule 5, Section 3
+#    (목차 줄 "Rule 1  THE COURT  2", "제1조 목적 ..... 3" 처럼 넓은 공백이나 점선 뒤 쪽 번호로
+#     끝나는 줄은 제목이 아님. "Rule 3 ... is 15" 처럼 한 칸 띄운 숫자로 끝나는 제목은 유지)
+HEADING_PATTERN = re.compile(
+    r'^[ \t]*(?:'
+    r'\*\*(?P<md>(?!(?:페이지|목차|표지|머리말|Page|Contents|Table\s*of|Note))'
+    r'(?:\d+\.\s|[I-V]+\.\s|[A-Z]\.\s|Rule\s*\d+|Appendix\s+[IVX]+)[^\n]*?)\*\*[ \t]*$'
+    r'|(?:\d+[ \t]+)?(?-i:(?P<plain>\d+\.[ \t]+[A-Z][A-Z0-9 ()\-]*[A-Z)]|APPENDIX[ \t]+[IVX][IVX ]*))[ \t]*$'
+    r'|(?P<article>제\s*\d+\s*[조장절항]|(?:Article|Rule|Section)\s+\d+)(?![^\n]*(?:\.{2,}|…+|[ \t]{2,})[ \t]*\d+[ \t]*$)'
+    r')',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+SECTION_TYPES = (
+    ('rule', re.compile(r'^(?:\d+\.|(?:Rule|Article)\s*\d+|제\s*\d+\s*조)', re.IGNORECASE)),
+    ('appendix', re.compile(r'^(?:부록|Appendix|[IVX]+\.)', re.IGNORECASE)),
+    ('sub-section', re.compile(r'^[a-zA-Z]\.')),
+    ('foreword', re.compile(r'^(?:Foreword|머리말)', re.IGNORECASE)),
+)
+SENTENCE_END = re.compile(r'(?<=[.!?。])\s+')
+
+
+class Chunk(NamedTuple):
+    rule_id: str
+    content: str
+    section_type: str
+    index: int
+    part: int = 0       # 토큰 상한 때문에 나뉜 경우 1부터, 아니면 0
+
+
+def classify_section(rule_id: str) -> str:
+    """rule_id 로 section 종류 분류 (rule / appendix / sub-section / foreword / other)"""
+    for section_type, pattern in SECTION_TYPES:
+        if pattern.match(rule_id):
+            return section_type
+    return 'other'
+
+
+def _char_tokens(ch: str) -> float:
+    return 1.0 if ord(ch) > 127 else 0.25
+
+
+def _token_cost(text: str) -> float:
+    """estimate_tokens 와 같은 기준이지만 버림 없이 계산 (조각을 더해도 합이 맞도록)"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii) / 4 + non_ascii
+
+
+def _hard_split(text: str, max_tokens: int) -> Iterator[str]:
+    """공백/문장 경계가 없는 긴 줄을 토큰 상한에 맞춰 자름"""
+    start, tokens = 0, 0.0
+    for i, ch in enumerate(text):
+        tokens += _char_tokens(ch)
+        if tokens > max_tokens:
+            yield text[start:i]
+            start, tokens = i, _char_tokens(ch)
+    if start < len(text):
+        yield text[start:]
+
+
+def _units(text: str, max_tokens: int) -> Iterator[str]:
+    """줄 → 문장 → 글자 순으로, 각 조각이 max_tokens 이하가 되도록 나눔"""
+    for line in text.splitlines(keepends=True):
+        if _token_cost(line) <= max_tokens:
+            yield line
+            continue
+        for sentence in SENTENCE_END.split(line):
+            if _token_cost(sentence) + 0.25 <= max_tokens:
+                yield sentence + ' '
+            else:
+                yield from _hard_split(sentence, max_tokens)
+
+
+def split_by_tokens(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    텍스트를 추정 토큰 수가 max_tokens 이하인 조각으로 나눔
+
+    줄 경계를 우선으로 묶고, overlap_tokens 만큼 앞 조각의 끝부분을 다음 조각에 반복합니다.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    pieces: List[str] = []
+    window: List[str] = []
+    window_tokens = 0.0
+    for unit in _units(text, max_tokens):
+        tokens = _token_cost(unit)
+        if window and window_tokens + tokens > max_tokens:
+            pieces.append(''.join(window))
+            # 다음 window 는 이전 window 의 마지막 몇 줄로 시작
+            carried: List[str] = []
+            carried_tokens = 0.0
+            for previous in reversed(window):
+                t = _token_cost(previous)
+                if carried_tokens + t > overlap_tokens or carried_tokens + t + tokens > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += t
+            window, window_tokens = carried, carried_tokens
+        window.append(unit)
+        window_tokens += tokens
+    if window:
+        pieces.append(''.join(window))
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+class Chunker:
+    """조항 제목 기준 streaming chunker"""
+
+    def __init__(self, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 min_chars: int = MIN_CHUNK_CHARS,
+                 window_tokens: int = DEFAULT_WINDOW_TOKENS,
+                 overlap_tokens: int = DEFAULT_OVERLAP_TOKENS):
+        """
+        Args:
+            max_tokens: chunk 1개의 최대 추정 토큰 수 (넘으면 같은 rule_id 로 나눔)
+            min_chars: 이보다 짧은 조항(목차 항목 등)은 버림
+            window_tokens: 제목이 없는 문서를 나눌 window 크기
+            overlap_tokens: window 사이에 반복할 토큰 수
+        """
+        self.max_tokens = max_tokens
+        self.min_chars = min_chars
+        self.window_tokens = min(window_tokens, max_tokens)
+        self.overlap_tokens = overlap_tokens
+
+    def chunk_text(self, text: str, source: str = '') -> List[Chunk]:
+        return list(self.iter_chunks([text], source))
+
+    def iter_chunks(self, pages: Iterable[str], source: str = '') -> Iterator[Chunk]:
+        """
+        페이지 텍스트 stream → Chunk stream
+
+        제목은 한 줄 안에 있으므로, 완성된 줄까지만 검색하고 나머지는 다음 페이지와 이어서 검색합니다.
+        버퍼에는 현재 조항(또는 첫 제목 이전 텍스트)만 남습니다.
+        """
+        buffer = ''
+        scanned = 0                     # buffer 에서 제목 검색을 끝낸 위치 (줄 시작)
+        title: Optional[str] = None     # 현재 조항 제목 (None: 첫 제목 이전)
+        index = 0
+
+        def sections(end: int) -> Iterator[Chunk]:
+            nonlocal buffer, scanned, title, index
+            start = 0
+            for match in HEADING_PATTERN.finditer(buffer, scanned, end):
+                for chunk in self._emit(title, buffer[start:match.start()], index):
+                    index += 1
+                    yield chunk
+                heading = match.group('md') or match.group('plain') or match.group('article')
+                title = re.sub(r'\s+', ' ', heading.strip())
+                if title.startswith('APPENDIX '):
+                    # PDF 추출 시 로마 숫자 사이에 생기는 공백 (APPENDIX V II → APPENDIX VII)
+                    title = 'APPENDIX ' + title[len('APPENDIX '):].replace(' ', '')
+                start = match.start()
+            buffer = buffer[start:]
+            scanned = end - start
+
+        for page_text in pages:
+            buffer += page_text + '\n'
+            yield from sections(buffer.rfind('\n') + 1)
+
+        if title is None:
+            # 제목을 하나도 찾지 못함 → 토큰 window 로 나눔
+            logger.warning(f"⚠️  조항 패턴을 찾지 못함. 크기 기반 chunking 사용: {source}")
+            for n, piece in enumerate(split_by_tokens(buffer.strip(), self.window_tokens,
+                                                      self.overlap_tokens)):
+                yield Chunk(f"Section {n + 1}", piece, 'other', n)
+            return
+
+        yield from sections(len(buffer))
+        yield from self._emit(title, buffer, index)
+
+    def _emit(self, title: Optional[str], text: str, index: int) -> Iterator[Chunk]:
+        content = text.strip()
+        if len(content) <= self.min_chars:
+            return
+        rule_id = title if title is not None else INTRO_RULE_ID
+        section_type = classify_section(rule_id) if title is not None else 'foreword'
+        pieces = split_by_tokens(content, self.max_tokens)
+        for part, piece in enumerate(pieces, 1):
+            yield Chunk(rule_id, piece, section_type, index + part - 1, part if len(pieces) > 1 else 0)
+
+
+def add_chunking_arguments(parser) -> None:
+    """두 ETL 스크립트 공용 chunking 옵션"""
+    parser.add_argument(
+        '--max-chunk-tokens',
+        type=int,
+        default=DEFAULT_MAX_TOKENS,
+        help=f'chunk 1개의 최대 추정 토큰 수 (기본값: {DEFAULT_MAX_TOKENS})'
+    )
+
+
+def chunker_from_args(args) -> Chunker:
+    return Chunker(max_tokens=args.max_chunk_tokens)
+
+
+def _iter_input_pages(path: Path, text_cache=None) -> Iterator[str]:
+    """텍스트 파일은 통째로, PDF 는 페이지별 텍스트 (추출 텍스트 캐시 → 없으면 PyPDF2)"""
+    if path.suffix.lower() == '.pdf':
+        from .text_cache import iter_cached_pages
+
+        for _, page in iter_cached_pages([path], text_cache):
+            yield page.text
+    else:
+        yield path.read_text(encoding='utf-8').rstrip('\n')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Chunk tennis rules text or PDFs without embedding')
+    parser.add_argument('input', nargs='+', help='텍스트 / PDF 파일 또는 PDF 디렉토리')
+    parser.add_argument('--source', help='source_file 이름 (기본값: 입력 파일 이름)')
+    parser.add_argument('--output', help='chunk 를 JSONL 로 저장 (없으면 요약만 출력)')
+    add_chunking_arguments(parser)
+    from .text_cache import add_text_cache_arguments, text_cache_from_args
+    add_text_cache_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    chunker = chunker_from_args(args)
+    paths: List[Path] = []
+    for path in map(Path, args.input):
+        paths.extend(sorted(path.glob('*.pdf')) if path.is_dir() else [path])
+    text_cache = text_cache_from_args(args) if any(p.suffix.lower() == '.pdf' for p in paths) else None
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else None
+    total = 0
+    try:
+        for path in paths:
+            source = args.source or path.name
+            print(f"\n📄 {source}")
+            for chunk in chunker.iter_chunks(_iter_input_pages(path, text_cache), source):
+                total += 1
+                tokens = estimate_tokens(chunk.content)
+                print(f"  {total:4d}. [{tokens:5d} tok] [{chunk.section_type:12s}] {chunk.rule_id[:60]}")
+                if out is not None:
+                    out.write(json.dumps({'source_file': source, **chunk._asdict(), 'tokens': tokens},
+                                         ensure_ascii=False) + '\n')
+    finally:
+        if out is not None:
+            out.close()
+        if text_cache is not None:
+            text_cache.close()
+
+    print(f"\nTotal: {total} chunks" + (f" → {args.output}" if args.output else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
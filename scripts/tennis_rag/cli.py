@@ -0,0 +1,58 @@
+"""
+tennis_rag CLI
+--------------
+ETL 단계별 subcommand 를 하나로 묶은 진입점입니다 (scripts/ 에서 실행).
+
+    python -m tennis_rag <command> [options]
+    python -m tennis_rag <command> --help
+
+subcommand 이름만 먼저 읽고 해당 모듈만 import 하므로, supabase / google.generativeai /
+numpy 같은 backend 는 그 backend 가 필요한 명령을 실행할 때만 로드됩니다.
+(extract, chunk, embed --dry-run 은 SDK 없이 바로 시작)
+"""
+
+import argparse
+import importlib
+import sys
+from typing import List, Optional
+
+# 이름 → (모듈, 설명). 모듈은 실행할 때 import
+COMMANDS = {
+    'extract': ('pdf_extract', 'PDF → 텍스트 (PyPDF2)'),
+    'chunk': ('chunker', '텍스트 / PDF → 조항 chunk (임베딩 없음)'),
+    'embed': ('gen_sql', '텍스트 → 임베딩 → SQL + artifact (기존 gen_sql_bilingual.py)'),
+    'export-sql': ('sql_export', 'artifact → SQL / COPY CSV (임베딩 재호출 없음)'),
+    'upload': ('upload', 'PDF 디렉토리 → 임베딩 → Supabase (기존 upload_tennis_rules.py)'),
+    'search': ('search', 'artifact 오프라인 벡터 / BM25 / hybrid 검색'),
+    'bench': ('bench', '검색 backend 벤치마크 / golden set 평가'),
+    'quantize': ('quantize', '양자화 / 차원 축소 recall-메모리 보고서'),
+    'query-cache': ('query_cache', '자주 묻는 질문 캐시 빌드'),
+    'reembed': ('reembed', '새 모델 / 차원으로 무중단 재임베딩 후 교체 (blue/green)'),
+    'index': ('index_build', 'HNSW 인덱스 생성 / ef_search 탐색 (bulk load 후)'),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    width = max(len(name) for name in COMMANDS)
+    parser = argparse.ArgumentParser(
+        prog='python -m tennis_rag',
+        description='Tennis Rules RAG ETL',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(
+            f"  {name:{width}s}  {help_text}" for name, (_, help_text) in COMMANDS.items()
+        ),
+    )
+    parser.add_argument('command', choices=COMMANDS, metavar='command', help='실행할 단계 (아래 목록)')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='subcommand 옵션 (<command> --help 참고)')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(f'.{module_name}', __package__)
+
+    # subcommand 의 argparse usage 에 "python -m tennis_rag <command>" 가 보이도록
+    sys.argv[0] = f'python -m tennis_rag {args.command}'
+    result = module.main(args.args)
+    return result if isinstance(result, int) else 0
@@ -0,0 +1,154 @@
+"""
+Near-duplicate Detection
+------------------------
+chunking 과 임베딩 사이에서 완전히 같거나 거의 같은 chunk 를 찾습니다.
+(예: 연도별 개정판 사이에 바뀌지 않은 조항)
+
+- 완전 중복: 정규화한 텍스트의 hash 비교
+- 근사 중복: 단어 shingle 의 64-bit SimHash + banding LSH
+  similarity = 1 - hamming / 64 가 threshold 이상이면 중복으로 판단합니다.
+  band 수를 (허용 hamming 거리 + 1) 로 잡아, 허용 거리 안의 쌍은 반드시 같은 band 를 공유합니다.
+"""
+
+import hashlib
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .embedding_cache import normalize_text, text_hash
+from .rate_limit import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEDUP_MODES = ('off', 'reuse', 'drop')
+DEFAULT_DEDUP_MODE = 'reuse'
+DEFAULT_SIMILARITY = 0.9
+REUSE_WINDOW = 1024    # reuse 모드에서 메모리에 보관하는 대표 chunk 임베딩 수 (LRU)
+SIMHASH_BITS = 64
+SIMHASH_MASK = (1 << SIMHASH_BITS) - 1
+SHINGLE_SIZE = 3
+
+WORD_PATTERN = re.compile(r'\w+')
+_BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+class Duplicate(NamedTuple):
+    key: str            # 먼저 나온 (대표) chunk 의 key
+    similarity: float   # SimHash 유사도
+    exact: bool         # 정규화한 텍스트까지 같은 완전 중복
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    words = WORD_PATTERN.findall(normalize_text(text).lower())
+    if len(words) <= size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text: str) -> int:
+    """단어 shingle 빈도를 가중치로 한 64-bit SimHash"""
+    counts = Counter(shingles(text))
+    if not counts:
+        return 0
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+         for s in counts),
+        dtype=np.uint64, count=len(counts),
+    )
+    weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    bits = ((hashes[:, np.newaxis] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.float64)
+    score = weights @ (bits * 2 - 1)
+    return sum(1 << int(i) for i in np.flatnonzero(score > 0))
+
+
+class NearDuplicateIndex:
+    """지금까지 본 chunk 중 완전/근사 중복을 찾는 in-memory 인덱스"""
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY):
+        if not 0.5 <= threshold <= 1.0:
+            raise ValueError(f"threshold 는 0.5 ~ 1.0 사이여야 합니다: {threshold}")
+        self.threshold = threshold
+        self.max_distance = int(round((1 - threshold) * SIMHASH_BITS))
+        bands = self.max_distance + 1
+        # Python int 로 변환 (numpy int64 로 shift 하면 63 bit 를 넘는 값이 overflow)
+        edges = np.linspace(0, SIMHASH_BITS, bands + 1).astype(int).tolist()
+        self._bands = [((1 << (end - start)) - 1, start) for start, end in zip(edges[:-1], edges[1:])]
+        self._exact: Dict[str, str] = {}
+        self._buckets: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in self._bands]
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def find_or_add(self, key: str, text: str) -> Optional[Duplicate]:
+        """중복이면 대표 chunk 를 반환하고, 아니면 인덱스에 추가한 뒤 None"""
+        digest = text_hash(text)
+        if digest in self._exact:
+            return Duplicate(self._exact[digest], 1.0, True)
+
+        fingerprint = simhash(text)
+        best: Optional[Duplicate] = None
+        for (mask, shift), buckets in zip(self._bands, self._buckets):
+            for other, other_key in buckets.get((fingerprint >> shift) & mask, ()):
+                distance = bin((fingerprint ^ other) & SIMHASH_MASK).count('1')
+                if distance <= self.max_distance:
+                    similarity = 1 - distance / SIMHASH_BITS
+                    if best is None or similarity > best.similarity:
+                        best = Duplicate(other_key, similarity, False)
+        if best is not None:
+            return best
+
+        self._exact[digest] = key
+        for (mask, shift), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault((fingerprint >> shift) & mask, []).append((fingerprint, key))
+        return None
+
+
+@dataclass
+class DedupStats:
+    checked: int = 0
+    exact: int = 0
+    near: int = 0
+    saved_tokens: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.exact + self.near
+
+    def record(self, text: str, duplicate: Optional[Duplicate]) -> None:
+        self.checked += 1
+        if duplicate is None:
+            return
+        if duplicate.exact:
+            self.exact += 1
+        else:
+            self.near += 1
+        self.saved_tokens += estimate_tokens(text)
+
+    def log(self, mode: str, batch_size: int) -> None:
+        if not self.checked:
+            return
+        saved_requests = -(-self.duplicates // max(1, batch_size))
+        action = '임베딩 재사용' if mode == 'reuse' else '제외'
+        logger.info(
+            f"✓ 중복 제거: {self.checked}개 중 완전 중복 {self.exact}개, 근사 중복 {self.near}개 {action} "
+            f"(임베딩 {self.duplicates}건 / 약 {saved_requests}회 요청 / ~{self.saved_tokens:,} 토큰 절약)"
+        )
+
+
+def add_dedup_arguments(parser) -> None:
+    parser.add_argument(
+        '--dedup',
+        choices=DEDUP_MODES,
+        default=DEFAULT_DEDUP_MODE,
+        help='중복 chunk 처리 (reuse: 대표 chunk 임베딩 재사용, drop: 업로드하지 않음, off: 사용 안 함)'
+    )
+    parser.add_argument(
+        '--dedup-threshold',
+        type=float,
+        default=DEFAULT_SIMILARITY,
+        help=f'근사 중복으로 볼 SimHash 유사도 (기본값: {DEFAULT_SIMILARITY}, 1.0 이면 완전 중복만)'
+    )
@@ -0,0 +1,217 @@
+"""
+Embedding Cache
+---------------
+(model, output_dimensionality, task_type, 정규화된 텍스트 해시) 를 키로 하는
+디스크 기반 임베딩 캐시입니다. 내용이 바뀌지 않은 chunk 는 Gemini API 를
+다시 호출하지 않고 캐시된 벡터를 재사용합니다.
+
+저장소는 SQLite 파일 하나이며, 항목 수가 max_entries 를 넘으면
+가장 오래 사용되지 않은 항목부터 제거합니다 (LRU).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(os.getenv('TENNIS_RAG_CACHE_DIR', '.cache/tennis_rag'))
+DEFAULT_MAX_ENTRIES = 50_000
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """유니코드 NFC 정규화 + 연속 공백 축약 (PDF 추출 시 생기는 공백 차이 무시)"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def text_hash(text: str) -> str:
+    """정규화된 텍스트의 SHA-256 해시"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def cache_key(model: str, output_dimensionality: Optional[int], task_type: str, text: str) -> str:
+    """캐시 키: 모델/차원/task_type 과 텍스트 해시를 결합"""
+    dim = output_dimensionality or 0
+    return f"{model}|{dim}|{task_type}|{text_hash(text)}"
+
+
+class EmbeddingCache:
+    """SQLite 기반 LRU 임베딩 캐시 (스레드 안전)"""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, enabled: bool = True):
+        """
+        Args:
+            cache_dir: 캐시 파일을 저장할 디렉토리
+            max_entries: 보관할 최대 임베딩 개수 (초과 시 LRU 제거)
+            enabled: False 이면 조회/저장을 모두 건너뜀 (--no-cache)
+        """
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if enabled:
+            cache_dir = Path(cache_dir)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self.path = cache_dir / 'embeddings.sqlite3'
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                ' key TEXT PRIMARY KEY,'
+                ' vector BLOB NOT NULL,'
+                ' last_used REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS embeddings_last_used_idx ON embeddings(last_used)'
+            )
+            self._conn.commit()
+
+    def get(self, model: str, output_dimensionality: Optional[int],
+            task_type: str, text: str) -> Optional[List[float]]:
+        """캐시된 임베딩 조회. 없으면 None"""
+        if not self.enabled:
+            return None
+
+        key = cache_key(model, output_dimensionality, task_type, text)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT vector FROM embeddings WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                'UPDATE embeddings SET last_used = ? WHERE key = ?', (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        vector = array('f')
+        vector.frombytes(row[0])
+        return vector.tolist()
+
+    def put(self, model: str, output_dimensionality: Optional[int],
+            task_type: str, text: str, embedding: List[float]) -> None:
+        """임베딩 저장 (float32) 후 필요하면 LRU 제거"""
+        if not self.enabled:
+            return
+
+        key = cache_key(model, output_dimensionality, task_type, text)
+        blob = array('f', embedding).tobytes()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)',
+                (key, blob, time.time())
+            )
+            self.writes += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        """max_entries 초과분을 last_used 오래된 순으로 삭제"""
+        count = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM embeddings WHERE key IN ('
+                ' SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)',
+                (excess,)
+            )
+            self.evictions += excess
+
+    def clear(self) -> None:
+        """캐시 전체 삭제 (--clear-cache)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute('DELETE FROM embeddings')
+            self._conn.commit()
+        logger.info(f"✓ 임베딩 캐시 삭제 완료: {self.path}")
+
+    def __len__(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        """hit/miss 통계"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        if not self.enabled:
+            logger.info("임베딩 캐시: 사용 안 함 (--no-cache)")
+            return
+        s = self.stats()
+        logger.info(
+            f"임베딩 캐시: hit {s['hits']} / miss {s['misses']} "
+            f"(hit rate {s['hit_rate']:.1%}), 저장 {s['writes']}, LRU 제거 {s['evictions']}"
+        )
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+
+def add_cache_arguments(parser) -> None:
+    """두 ETL 스크립트가 공유하는 캐시 관련 argparse 옵션"""
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default=str(DEFAULT_CACHE_DIR),
+        help=f'임베딩 캐시 디렉토리 (기본값: {DEFAULT_CACHE_DIR}, 환경변수 TENNIS_RAG_CACHE_DIR)'
+    )
+    parser.add_argument(
+        '--cache-max-entries',
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help=f'캐시에 보관할 최대 임베딩 수 (기본값: {DEFAULT_MAX_ENTRIES})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='임베딩 캐시를 사용하지 않고 항상 API 호출'
+    )
+    parser.add_argument(
+        '--clear-cache',
+        action='store_true',
+        help='실행 전에 임베딩 캐시를 비움'
+    )
+
+
+def cache_from_args(args) -> EmbeddingCache:
+    """argparse 결과로 EmbeddingCache 생성 (--clear-cache 처리 포함)"""
+    cache = EmbeddingCache(
+        cache_dir=Path(args.cache_dir),
+        max_entries=args.cache_max_entries,
+        enabled=not args.no_cache,
+    )
+    if args.clear_cache:
+        cache.clear()
+    return cache
@@ -0,0 +1,265 @@
+"""
+Embedding Client
+----------------
+두 ETL 스크립트가 공유하는 Gemini 임베딩 클라이언트입니다.
+
+- 여러 chunk 를 한 번의 요청(batch embed)으로 전송
+- 429 발생 시 batch 크기를 줄이고, 연속 성공 시 다시 키우는 adaptive batch
+- RPM / TPM token bucket 으로 quota 안에서 최대한 빠르게 전송
+- Retry-After 존중 + jitter 가 들어간 지수 backoff
+- 재시도할 수 없는 오류는 batch 를 반씩 나눠 다시 보내 문제 chunk 만 실패 처리
+- 스레드 풀로 최대 concurrency 개의 batch 요청을 동시에 전송
+- 임베딩 캐시(EmbeddingCache) 우선 조회
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .embedding_cache import EmbeddingCache
+from .rate_limit import (
+    RateLimiter, backoff_delay, estimate_tokens, is_rate_limit_error,
+    is_transient_error, retry_after_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RPM = 100
+DEFAULT_TPM = 300_000
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 1
+MAX_BATCH_SIZE = 100          # batchEmbedContents 최대 입력 수
+MAX_BATCH_TOKENS = 20_000     # 요청 1건에 담을 추정 토큰 상한
+
+Embedding = List[float]
+
+
+class EmbeddingClient:
+    """캐시 + batch + rate limit 을 적용한 임베딩 클라이언트"""
+
+    def __init__(self, model: str, task_type: str = 'retrieval_document',
+                 output_dimensionality: Optional[int] = None,
+                 cache: Optional[EmbeddingCache] = None,
+                 limiter: Optional[RateLimiter] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_retries: int = 5,
+                 embed_fn: Optional[Callable] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Args:
+            model: 임베딩 모델 이름 (예: models/gemini-embedding-001)
+            task_type: Gemini task_type
+            output_dimensionality: 출력 차원 (None 이면 모델 기본값)
+            cache: 임베딩 캐시 (None 이면 사용 안 함)
+            limiter: RPM/TPM rate limiter (None 이면 기본값 사용)
+            batch_size: 초기 batch 크기 (429 발생 시 자동 조정)
+            max_retries: batch 당 최대 재시도 횟수
+            embed_fn: genai.embed_content 호환 함수 (기본값: google.generativeai)
+            concurrency: 동시에 보낼 최대 batch 요청 수 (rate limiter 는 모든 요청이 공유)
+        """
+        self.model = model
+        self.task_type = task_type
+        self.output_dimensionality = output_dimensionality
+        self.cache = cache if cache is not None else EmbeddingCache(enabled=False)
+        self.limiter = limiter or RateLimiter(DEFAULT_RPM, DEFAULT_TPM)
+        self.max_batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.batch_size = self.max_batch_size
+        self.max_retries = max_retries
+        self.concurrency = max(1, concurrency)
+
+        if embed_fn is None:
+            import google.generativeai as genai
+            embed_fn = genai.embed_content
+        self._embed_fn = embed_fn
+
+        self._lock = threading.Lock()
+        self._success_streak = 0
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.embedded = 0
+        self.tokens_sent = 0
+        self.elapsed = 0.0
+
+    def embed(self, texts: Sequence[str]) -> List[Optional[Embedding]]:
+        """
+        texts 순서 그대로 임베딩 리스트를 반환합니다.
+        캐시에 있는 항목은 API 를 호출하지 않으며, 실패한 항목은 None 입니다.
+        """
+        started = time.monotonic()
+        results: List[Optional[Embedding]] = [None] * len(texts)
+        pending: List[int] = []
+
+        for i, text in enumerate(texts):
+            cached = self.cache.get(self.model, self.output_dimensionality, self.task_type, text)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+
+        done = len(texts) - len(pending)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            inflight = {}
+            while pending or inflight:
+                # batch 크기는 429 여부에 따라 바뀌므로 제출 직전에 구성
+                while pending and len(inflight) < self.concurrency:
+                    batch = self._next_batch(pending, texts)
+                    pending = pending[len(batch):]
+                    future = pool.submit(self._embed_batch, [texts[i] for i in batch])
+                    inflight[future] = batch
+
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch = inflight.pop(future)
+                    for i, embedding in zip(batch, future.result()):
+                        results[i] = embedding
+                        if embedding is not None:
+                            self.cache.put(self.model, self.output_dimensionality,
+                                           self.task_type, texts[i], embedding)
+
+                    done += len(batch)
+                    logger.info(f"  Embeddings: {done}/{len(texts)} 완료 (batch {len(batch)})")
+
+        self.elapsed += time.monotonic() - started
+        return results
+
+    def _next_batch(self, pending: List[int], texts: Sequence[str]) -> List[int]:
+        """현재 batch 크기와 토큰 상한을 넘지 않도록 다음 batch 구성"""
+        batch: List[int] = []
+        tokens = 0
+        for i in pending[:self.batch_size]:
+            t = estimate_tokens(texts[i])
+            if batch and tokens + t > MAX_BATCH_TOKENS:
+                break
+            batch.append(i)
+            tokens += t
+        return batch
+
+    def _embed_batch(self, contents: List[str]) -> List[Optional[Embedding]]:
+        """
+        batch 1건 전송 (재시도 포함). 최종 실패 시 None 리스트
+
+        재시도할 수 없는 오류(잘못된 입력 등)는 batch 를 반으로 나눠 다시 보내므로
+        문제 chunk 만 None 이 됩니다.
+        """
+        token_count = sum(estimate_tokens(c) for c in contents)
+        kwargs = {'model': self.model, 'task_type': self.task_type}
+        if self.output_dimensionality:
+            kwargs['output_dimensionality'] = self.output_dimensionality
+
+        for attempt in range(self.max_retries):
+            self.limiter.acquire(token_count)
+            with self._lock:
+                self.requests += 1
+            try:
+                result = self._embed_fn(content=contents, **kwargs)
+                embeddings = result['embedding']
+                if len(contents) == 1 and embeddings and not isinstance(embeddings[0], list):
+                    embeddings = [embeddings]
+                with self._lock:
+                    self._on_success()
+                    self.embedded += len(contents)
+                    self.tokens_sent += token_count
+                return list(embeddings)
+
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                if not (rate_limited or is_transient_error(e)) and len(contents) > 1:
+                    middle = len(contents) // 2
+                    logger.warning(f"⚠️  Embedding batch 실패 ({len(contents)} chunks), "
+                                   f"{middle} / {len(contents) - middle} 로 나눠 재시도: {e}")
+                    return self._embed_batch(contents[:middle]) + self._embed_batch(contents[middle:])
+                if not (rate_limited or is_transient_error(e)) or attempt == self.max_retries - 1:
+                    logger.error(f"❌ Embedding batch 실패 ({len(contents)} chunks): {e}")
+                    break
+
+                delay = backoff_delay(attempt)
+                with self._lock:
+                    self.retries += 1
+                    if rate_limited:
+                        self.rate_limited += 1
+                        self._on_rate_limited()
+                if rate_limited:
+                    # 다른 스레드의 요청도 함께 멈춰 429 가 연쇄적으로 터지지 않도록 함
+                    retry_after = retry_after_seconds(e)
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+                    self.limiter.pause(delay)
+                logger.warning(
+                    f"⚠️  Embedding 재시도 {attempt + 1}/{self.max_retries - 1} "
+                    f"({delay:.1f}초 후, batch 크기 {self.batch_size}): {e}"
+                )
+                time.sleep(delay)
+
+        with self._lock:
+            self.failed += len(contents)
+        return [None] * len(contents)
+
+    def _on_success(self) -> None:
+        """(lock 보유 상태에서 호출) 연속 성공 시 batch 크기를 점진적으로 키움 (additive increase)"""
+        self._success_streak += 1
+        if self._success_streak >= 3 and self.batch_size < self.max_batch_size:
+            self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+            self._success_streak = 0
+
+    def _on_rate_limited(self) -> None:
+        """(lock 보유 상태에서 호출) 429 발생 시 batch 크기를 절반으로 (multiplicative decrease)"""
+        self._success_streak = 0
+        self.batch_size = max(1, self.batch_size // 2)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'embedded': self.embedded,
+            'failed': self.failed,
+            'requests': self.requests,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'tokens_sent': self.tokens_sent,
+            'rate_limit_wait_seconds': self.limiter.waited_seconds,
+            'elapsed_seconds': self.elapsed,
+            'chunks_per_second': self.embedded / self.elapsed if self.elapsed else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        s = self.stats()
+        logger.info(
+            f"Embedding client: {s['embedded']} chunks / {s['requests']} 요청, "
+            f"재시도 {s['retries']} (429: {s['rate_limited']}), 실패 {s['failed']}, "
+            f"{s['chunks_per_second']:.2f} chunks/sec"
+        )
+        self.cache.log_stats()
+
+
+def add_rate_limit_arguments(parser) -> None:
+    """batch / rate limit 관련 argparse 옵션"""
+    parser.add_argument(
+        '--rpm',
+        type=float,
+        default=DEFAULT_RPM,
+        help=f'임베딩 API 분당 요청 수 제한 (기본값: {DEFAULT_RPM})'
+    )
+    parser.add_argument(
+        '--tpm',
+        type=float,
+        default=DEFAULT_TPM,
+        help=f'임베딩 API 분당 토큰 수 제한 (기본값: {DEFAULT_TPM})'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'요청 1건당 최대 chunk 수 (기본값: {DEFAULT_BATCH_SIZE}, 최대 {MAX_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'동시에 보낼 임베딩 요청 수 (기본값: {DEFAULT_CONCURRENCY}, RPM/TPM 제한은 공유)'
+    )
+
+
+def limiter_from_args(args) -> RateLimiter:
+    return RateLimiter(args.rpm, args.tpm)
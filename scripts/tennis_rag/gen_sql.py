@@ -0,0 +1,365 @@
+"""
+Tennis Rules ETL - Bilingual SQL Generator
+==========================================
+Generates SQL INSERT statements from extracted tennis rules text (Korean/English).
+Based on Tennis_Rules_RAG/gen_sql_from_txt.py with bilingual support + metadata.
+numpy, tqdm, dotenv and the Gemini SDK are imported only once embedding starts, and
+--dry-run writes nothing (no output, artifact, journal, caches, metrics or profile),
+so it only needs the standard library.
+
+Usage (run from scripts/; `python scripts/gen_sql_bilingual.py ...` still works):
+  python -m tennis_rag embed --input full_rules_text.txt --source "테니스규정집.pdf" --language ko
+  python -m tennis_rag embed --input english_rules.txt --source "2026-rules-of-tennis-english.pdf" --language en
+  python -m tennis_rag embed --input english_rules.txt --source "2026-rules-of-tennis-english.pdf" --language en --dry-run
+  python -m tennis_rag embed --input english_rules.txt --source "2026-rules-of-tennis-english.pdf" --language en --embedding-provider local
+  python -m tennis_rag embed --from-artifact insert_rules.artifact --sql-format copy --output rules.csv --float-precision 7
+  python -m tennis_rag embed --input english_rules.txt --source "2026-rules-of-tennis-english.pdf" --language en --resume
+  python -m tennis_rag embed --input 2026-rules-of-tennis-english.pdf --language en
+
+A PDF given as --input is read through the extracted-text cache (tennis_rag.text_cache),
+so only the first run on an unchanged PDF parses it.
+"""
+import os
+import logging
+import argparse
+from pathlib import Path
+
+from .chunker import Chunker, add_chunking_arguments, chunker_from_args
+from .embedding_cache import add_cache_arguments, cache_from_args
+from .manifest import chunk_hash, file_sha256
+from .index_build import add_index_arguments, index_settings_from_args, write_bulk_load_script
+from .journal import RunJournal, add_journal_arguments
+from .pipeline import batched
+from .pdf_extract import join_pages
+from .text_cache import add_text_cache_arguments, extract_pages_cached, text_cache_from_args
+from .sql_export import (
+    DEFAULT_ROWS_PER_STATEMENT, SQL_FORMATS, check_sql_dim, copy_command, export_artifact, write_rows,
+)
+from .embedding_client import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, EmbeddingClient,
+    add_rate_limit_arguments, limiter_from_args,
+)
+from .providers import (
+    MATRYOSHKA_DIMS, add_provider_arguments, add_quantization_arguments, embed_fn_from_args, provider_model,
+)
+from .metrics import PipelineMetrics, add_metrics_arguments, profiled
+
+
+class BilingualSQLGen:
+    def __init__(self, dry_run=False, cache=None, limiter=None, batch_size=DEFAULT_BATCH_SIZE,
+                 concurrency=DEFAULT_CONCURRENCY, embed_fn=None, embedding_provider="gemini",
+                 chunker=None, metrics=None, embedding_dim=768):
+        self.dry_run = dry_run
+        self.metrics = metrics or PipelineMetrics("gen_sql")
+        self.chunker = chunker or Chunker()
+        self.embedding_model = provider_model(embedding_provider, "models/gemini-embedding-001")
+        self.embedding_dim = embedding_dim
+
+        if not dry_run:
+            if embed_fn is None:
+                from dotenv import load_dotenv
+                load_dotenv()
+                self.gemini_key = os.getenv("GEMINI_API_KEY")
+                if not self.gemini_key:
+                    raise ValueError("GEMINI_API_KEY not found in environment variables")
+                from .providers import gemini_embed_fn
+                embed_fn = gemini_embed_fn(self.gemini_key)
+            self.embedder = EmbeddingClient(
+                model=self.embedding_model,
+                task_type="retrieval_document",
+                output_dimensionality=self.embedding_dim,
+                cache=cache,
+                limiter=limiter,
+                batch_size=batch_size,
+                embed_fn=embed_fn,
+                concurrency=concurrency,
+            )
+
+    def load_text(self, txt_path, text_cache=None):
+        """Read a text file, or a PDF's pages (through text_cache when given)."""
+        with self.metrics.timed("load", items=1):
+            if Path(txt_path).suffix.lower() == ".pdf":
+                pdf_path = Path(txt_path)
+                text = join_pages(extract_pages_cached([pdf_path], text_cache)[pdf_path])
+            else:
+                with open(txt_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+        self.metrics.add("load", bytes=len(text.encode("utf-8")))
+        return text
+
+    def split_into_chunks(self, text, source_name, language):
+        """Split text into rule chunks (same rules as upload.py, see tennis_rag.chunker)."""
+        chunks = []
+        for chunk in self.metrics.iterate(self.chunker.iter_chunks([text], source_name), "chunk",
+                                          size=lambda c: len(c.content.encode("utf-8"))):
+            chunks.append({
+                "source_file": source_name,
+                "rule_id": chunk.rule_id,
+                "content": chunk.content,
+                "metadata": {
+                    "language": language,
+                    "section_type": chunk.section_type,
+                    "original_len": len(chunk.content),
+                }
+            })
+        return chunks
+
+    def generate_sql(self, chunks, output_file, sql_format="insert",
+                     rows_per_statement=DEFAULT_ROWS_PER_STATEMENT, artifact_dir=None, precision=None,
+                     journal=None):
+        """
+        Generate SQL INSERT statements (or a COPY-compatible CSV) with embeddings and metadata.
+
+        Rows are embedded and appended to the output one window at a time. Each finished window
+        is committed to the journal (chunk hashes, embeddings and the output size), so a run that
+        stops halfway can be continued with --resume: journaled chunks are skipped, the output is
+        cut back to the last committed size and new rows are appended after it.
+
+        Embeddings are also stored as a float32 artifact in artifact_dir
+        (default: <output>.artifact) so the SQL can be regenerated with --from-artifact.
+        """
+        print(f"Generating SQL for {len(chunks)} chunks...")
+
+        if self.dry_run:
+            print("\n[DRY RUN] Skipping embedding generation. Showing chunk summary:\n")
+            for i, item in enumerate(chunks):
+                print(f"  {i + 1:3d}. [{item['metadata']['original_len']:5d} chars] "
+                      f"[{item['metadata']['section_type']:12s}] {item['rule_id'][:60]}")
+            print(f"\nTotal: {len(chunks)} chunks")
+            return
+
+        import numpy as np
+        from tqdm import tqdm
+
+        from .artifact import normalize_rows, write_artifact
+
+        rows = []
+        seen_hashes = set()
+        for item in chunks:
+            hash_value = chunk_hash(item["source_file"], item["rule_id"], item["content"])
+            if hash_value in seen_hashes:
+                # identical chunks would make a multi-row upsert fail
+                continue
+            seen_hashes.add(hash_value)
+            rows.append({
+                "source_file": item["source_file"],
+                "rule_id": item["rule_id"],
+                "language": item["metadata"]["language"],
+                "content": item["content"],
+                "metadata": item["metadata"],
+                "chunk_hash": hash_value,
+            })
+
+        vectors = {}
+        if journal is not None:
+            vectors = {row["chunk_hash"]: journal.completed[row["chunk_hash"]]["embedding"]
+                       for row in rows if row["chunk_hash"] in journal}
+        pending = [row for row in rows if row["chunk_hash"] not in vectors]
+        if vectors:
+            print(f"Resuming: {len(vectors)} chunks already written, {len(pending)} left")
+
+        written = len(vectors)
+        window = self.embedder.max_batch_size * self.embedder.concurrency
+        with open_output(output_file, journal) as f, tqdm(total=len(pending)) as progress:
+            for group in batched(pending, window):
+                texts = [row["content"] for row in group]
+                with self.metrics.timed("embed", items=len(texts),
+                                        bytes=sum(len(t.encode("utf-8")) for t in texts)):
+                    embeddings = self.embedder.embed(texts)
+                progress.update(len(group))
+
+                done = []
+                for row, embedding in zip(group, embeddings):
+                    if embedding is None:
+                        print(f"\nError processing {row['rule_id']}: embedding failed")
+                        continue
+                    vectors[row["chunk_hash"]] = embedding
+                    done.append(row)
+                if not done:
+                    continue
+
+                # same float32 normalized values that the artifact (and --from-artifact) produces
+                matrix = normalize_rows(np.asarray([vectors[row["chunk_hash"]] for row in done],
+                                                   dtype=np.float32))
+                with self.metrics.timed("export", items=len(done)):
+                    written += write_rows([{**row, "embedding": vector} for row, vector in zip(done, matrix)],
+                                          f, sql_format, rows_per_statement, precision)
+                    f.flush()
+                if journal is not None:
+                    for row in done:
+                        journal.record(row["chunk_hash"], "written", embedding=vectors[row["chunk_hash"]])
+                    journal.commit(output_bytes=os.fstat(f.fileno()).st_size)
+
+        # float32 matrix + sidecar for every row in the output (including resumed ones)
+        artifact_dir = artifact_dir or default_artifact_dir(output_file)
+        stored = [row for row in rows if row["chunk_hash"] in vectors]
+        with self.metrics.timed("export"):
+            write_artifact(artifact_dir, stored, [vectors[row["chunk_hash"]] for row in stored],
+                           self.embedding_model)
+        self.metrics.add("export", bytes=os.path.getsize(output_file))
+
+        stats = self.embedder.stats()
+        self.metrics.add("embed", retries=stats["retries"], errors=stats["failed"],
+                         requests=stats["requests"], rate_limited=stats["rate_limited"],
+                         tokens=stats["tokens_sent"],
+                         cache_hits=self.embedder.cache.stats()["hits"])
+        print(f"Embedded {stats['embedded']} chunks in {stats['requests']} requests "
+              f"({stats['retries']} retries, {stats['chunks_per_second']:.2f} chunks/sec)")
+        cache_stats = self.embedder.cache.stats()
+        print(f"Embedding cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+              f"(hit rate {cache_stats['hit_rate']:.1%})")
+        print(f"Artifact saved to {artifact_dir}")
+        report_written(output_file, written, sql_format)
+
+
+def open_output(output_file, journal=None):
+    """
+    Open the SQL/CSV output for writing.
+
+    When the journal has a committed output size (resumed run), the file is cut back to that
+    size (dropping rows from a window that never reached the journal) and opened for append.
+    """
+    size = journal.state.get("output_bytes") if journal is not None else None
+    if size is None:
+        return open(output_file, "w", encoding="utf-8", newline="")
+    if not os.path.exists(output_file) or os.path.getsize(output_file) < size:
+        raise ValueError(f"{output_file} is shorter than the journal says ({size} bytes); "
+                         "run again without --resume")
+    os.truncate(output_file, size)
+    return open(output_file, "a", encoding="utf-8", newline="")
+
+
+def default_artifact_dir(output_file):
+    return Path(output_file).with_suffix(".artifact")
+
+
+def report_written(output_file, written, sql_format):
+    print(f"Done! {written} rows saved to {output_file} ({sql_format})")
+    if sql_format == "copy":
+        print(f"Load with psql: {copy_command(output_file)}")
+
+
+def report_bulk_load(output_file, sql_format, settings):
+    script = write_bulk_load_script(output_file, sql_format, settings)
+    print(f"Bulk load script (drop index, load, build index, tune ef_search): psql -f {script}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bilingual Tennis Rules SQL Generator")
+    parser.add_argument("--input", help="Path to extracted text file, or the PDF itself")
+    parser.add_argument("--source", help="Source PDF filename (default: the --input name for a PDF)")
+    parser.add_argument("--language", choices=["ko", "en"], help="Language of the text")
+    parser.add_argument("--output", default="insert_rules.sql", help="Output SQL file")
+    parser.add_argument("--dry-run", action="store_true", help="Only show chunks, skip embedding generation")
+    parser.add_argument("--sql-format", default="insert", choices=SQL_FORMATS,
+                        help="insert: one upsert per row, multirow: multi-row INSERT ... VALUES, "
+                             "copy: COPY-compatible CSV (full reloads only)")
+    parser.add_argument("--rows-per-statement", type=int, default=DEFAULT_ROWS_PER_STATEMENT,
+                        help="Rows per INSERT statement for --sql-format multirow")
+    parser.add_argument("--artifact-dir", help="Embedding artifact directory (default: <output>.artifact)")
+    parser.add_argument("--from-artifact", metavar="DIR",
+                        help="Regenerate SQL/COPY output from an existing artifact without re-embedding")
+    parser.add_argument("--float-precision", type=int, default=None,
+                        help="Significant digits per vector component (default: shortest exact float32)")
+    parser.add_argument("--embedding-dim", type=int, default=768, choices=MATRYOSHKA_DIMS,
+                        help="output_dimensionality (Matryoshka). SQL/COPY output requires 768 (the "
+                             "tennis_rules schema is VECTOR(768)); reduced dims are only usable with --dry-run. "
+                             "See tennis_rag.quantize for offline reduced-dim search from a 768 artifact")
+    add_quantization_arguments(parser)
+    add_chunking_arguments(parser)
+    add_provider_arguments(parser)
+    add_cache_arguments(parser)
+    add_text_cache_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_metrics_arguments(parser)
+    add_journal_arguments(parser)
+    add_index_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        index_settings = index_settings_from_args(args) if args.bulk_load else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    # stage summary / profiler output goes through the tennis_rag.metrics logger
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("tennis_rag.metrics").setLevel(logging.INFO)
+    logging.getLogger("tennis_rag.text_cache").setLevel(logging.INFO)
+
+    if args.from_artifact:
+        try:
+            written = export_artifact(args.from_artifact, args.output, args.sql_format,
+                                      args.rows_per_statement, args.float_precision)
+        except ValueError as e:
+            parser.error(str(e))
+        report_written(args.output, written, args.sql_format)
+        if index_settings is not None:
+            report_bulk_load(args.output, args.sql_format, index_settings)
+        return
+
+    if args.input and not args.source and Path(args.input).suffix.lower() == ".pdf":
+        args.source = Path(args.input).name
+    if not (args.input and args.source and args.language):
+        parser.error("--input, --source and --language are required unless --from-artifact is given")
+    if not args.dry_run:
+        try:
+            check_sql_dim(args.embedding_dim)
+        except ValueError as e:
+            parser.error(str(e))
+
+    # a dry run only prints the chunk summary: no embedding / text cache is opened or created
+    cache = None if args.dry_run else cache_from_args(args)
+    embed_fn = None
+    if not args.dry_run and args.embedding_provider != "gemini":
+        embed_fn = embed_fn_from_args(args)
+    etl = BilingualSQLGen(dry_run=args.dry_run, cache=cache,
+                          limiter=limiter_from_args(args), batch_size=args.batch_size,
+                          concurrency=args.concurrency, embed_fn=embed_fn,
+                          embedding_provider=args.embedding_provider,
+                          chunker=chunker_from_args(args), embedding_dim=args.embedding_dim)
+
+    journal = None
+    if not args.dry_run:
+        # a resumed run must produce the same rows in the same format as the one it continues
+        run = {"job": "gen_sql", "input": file_sha256(Path(args.input)), "source": args.source,
+               "language": args.language, "model": etl.embedding_model, "dim": etl.embedding_dim,
+               "max_chunk_tokens": args.max_chunk_tokens, "sql_format": args.sql_format,
+               "rows_per_statement": args.rows_per_statement, "float_precision": args.float_precision}
+        try:
+            journal = RunJournal(Path(args.journal or Path(args.output).with_suffix(".journal")),
+                                 run, resume=args.resume)
+        except ValueError as e:
+            parser.error(str(e))
+
+    profile = None if args.dry_run else args.profile
+    with profiled(profile, args.profile_top, Path(args.metrics_dir), job="gen_sql"):
+        is_pdf = Path(args.input).suffix.lower() == ".pdf"
+        text_cache = text_cache_from_args(args) if is_pdf and not args.dry_run else None
+        text = etl.load_text(args.input, text_cache)
+        if text_cache is not None:
+            text_cache.log_stats()
+            text_cache.close()
+        print(f"Loaded {len(text)} chars from {args.input}")
+
+        chunks = etl.split_into_chunks(text, args.source, args.language)
+        print(f"Found {len(chunks)} chunks.")
+
+        etl.generate_sql(chunks, args.output, args.sql_format, args.rows_per_statement,
+                         args.artifact_dir, args.float_precision, journal)
+    if not args.dry_run:
+        cache.close()
+        journal.close()
+        if index_settings is not None:
+            report_bulk_load(args.output, args.sql_format, index_settings)
+        if args.quantize:
+            from .quantize import write_quantized
+            write_quantized(args.artifact_dir or default_artifact_dir(args.output), args.quantize, args.quantize_dim)
+
+    etl.metrics.log_summary()
+    if args.dry_run:
+        return
+    outputs = etl.metrics.write(Path(args.metrics_dir))
+    print(f"Metrics saved to {outputs['json']} and {outputs['prometheus']}")
+
+
+if __name__ == "__main__":
+    main()
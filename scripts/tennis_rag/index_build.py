@@ -0,0 +1,256 @@
+"""
+HNSW Index Build / Tuning
+-------------------------
+전체 재적재 때는 벡터 인덱스(tennis_rules_embedding_cosine_idx)를 먼저 지우고 적재가 끝난 뒤
+한 번에 다시 만듭니다 (마이그레이션 20261017_add_tennis_rules_index_tuning.sql).
+행마다 HNSW 그래프를 갱신하지 않으므로 적재가 빠르고, 인덱스는 전체 데이터로 한 번 만들어집니다.
+
+- build: m / ef_construction / maintenance_work_mem / 병렬 worker 수를 지정해 인덱스 생성 + ANALYZE
+         (언어별 partial 인덱스도 같은 설정으로 생성, 20261017_add_tennis_rules_language.sql)
+- tune:  sample 행 벡터를 질문으로 ef_search 값마다 HNSW 결과와 전수 검색 결과의 recall@k 와
+         DB 안 실행 시간(avg / p95)을 측정. min_recall 을 넘는 가장 작은 ef_search 를 선택해
+         tennis_rules_index_tuning 테이블에 기록
+- upload --bulk-load:             Supabase RPC 로 drop → 적재 → build → tune
+- embed / export-sql --bulk-load: 출력 파일과 함께 psql 적재 스크립트(<output>.bulk.sql) 작성
+                                  (로컬 Postgres + pgvector 컨테이너에서 그대로 실행 가능)
+
+사용법:
+    python -m tennis_rag index --build --tune --hnsw-m 16 --hnsw-ef-construction 128
+    python -m tennis_rag export-sql --artifact insert_rules.artifact --sql-format copy --output rules.csv --bulk-load
+    psql "$DATABASE_URL" -f rules.csv.bulk.sql
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .metrics import PipelineMetrics
+from .sql_export import SQL_FORMATS, copy_command
+
+logger = logging.getLogger(__name__)
+
+VECTOR_INDEX = 'tennis_rules_embedding_cosine_idx'
+DEFAULT_HNSW_M = 16
+DEFAULT_HNSW_EF_CONSTRUCTION = 64
+DEFAULT_MAINTENANCE_WORK_MEM = '1GB'
+DEFAULT_PARALLEL_WORKERS = 2
+DEFAULT_EF_SEARCH_VALUES = (20, 40, 80, 160)
+DEFAULT_TUNING_SAMPLE = 100
+DEFAULT_TUNING_K = 10
+DEFAULT_MIN_RECALL = 0.95
+
+# Postgres 메모리 설정 형식 (예: 512MB, 1GB)
+_MEMORY_PATTERN = re.compile(r'^\d+(kB|MB|GB)$')
+
+
+@dataclass
+class IndexSettings:
+    """HNSW 인덱스 생성 / ef_search 탐색 설정"""
+    m: int = DEFAULT_HNSW_M
+    ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION
+    maintenance_work_mem: str = DEFAULT_MAINTENANCE_WORK_MEM
+    parallel_workers: int = DEFAULT_PARALLEL_WORKERS
+    ef_search_values: Tuple[int, ...] = DEFAULT_EF_SEARCH_VALUES
+    tuning_sample: int = DEFAULT_TUNING_SAMPLE
+    tuning_k: int = DEFAULT_TUNING_K
+    min_recall: float = DEFAULT_MIN_RECALL
+
+    def __post_init__(self):
+        if not _MEMORY_PATTERN.match(self.maintenance_work_mem):
+            raise ValueError(f"maintenance_work_mem 형식이 잘못되었습니다: {self.maintenance_work_mem} (예: 512MB, 1GB)")
+        if self.ef_construction < 2 * self.m:
+            raise ValueError(f"ef_construction({self.ef_construction}) 은 2 * m({2 * self.m}) 이상이어야 합니다")
+
+    def build_params(self) -> Dict:
+        return {
+            'm': self.m,
+            'ef_construction': self.ef_construction,
+            'maintenance_work_mem': self.maintenance_work_mem,
+            'parallel_workers': self.parallel_workers,
+        }
+
+    def tune_params(self) -> Dict:
+        return {
+            'ef_search_values': list(self.ef_search_values),
+            'sample_size': self.tuning_sample,
+            'match_count': self.tuning_k,
+            'min_recall': self.min_recall,
+        }
+
+    def build_sql(self) -> str:
+        return (f"SELECT build_tennis_rules_vector_index({self.m}, {self.ef_construction}, "
+                f"'{self.maintenance_work_mem}', {self.parallel_workers}) AS build_seconds;")
+
+    def tune_sql(self) -> str:
+        values = ', '.join(str(v) for v in self.ef_search_values)
+        return (f"SELECT * FROM tune_tennis_rules_hnsw(ARRAY[{values}], {self.tuning_sample}, "
+                f"{self.tuning_k}, {self.min_recall});")
+
+
+def bulk_load_script(data_file: Path, sql_format: str, settings: IndexSettings) -> str:
+    """psql 스크립트: 인덱스 삭제 → 적재 → 인덱스 생성 → ef_search 탐색"""
+    if sql_format == 'copy':
+        load = copy_command(str(Path(data_file).resolve()))
+    else:
+        load = f"\\ir {Path(data_file).name}"
+    return '\n'.join([
+        '-- tennis_rules bulk load: drop the HNSW index, load, build it once, sweep ef_search',
+        f'-- Usage: psql "$DATABASE_URL" -f {Path(data_file).name}.bulk.sql',
+        '\\set ON_ERROR_STOP on',
+        '\\timing on',
+        'SELECT drop_tennis_rules_vector_index();',
+        load,
+        settings.build_sql(),
+        settings.tune_sql(),
+        '',
+    ])
+
+
+def write_bulk_load_script(data_file, sql_format: str, settings: IndexSettings) -> Path:
+    """<data_file>.bulk.sql 작성 (data_file 과 같은 디렉토리)"""
+    script = Path(f"{data_file}.bulk.sql")
+    script.write_text(bulk_load_script(Path(data_file), sql_format, settings), encoding='utf-8')
+    return script
+
+
+class SupabaseIndexBuilder:
+    """Supabase RPC 로 벡터 인덱스 삭제 / 생성 / ef_search 탐색"""
+
+    def __init__(self, supabase, settings: Optional[IndexSettings] = None,
+                 metrics: Optional[PipelineMetrics] = None):
+        self.supabase = supabase
+        self.settings = settings or IndexSettings()
+        self.metrics = metrics or PipelineMetrics('index')
+
+    def drop(self) -> None:
+        logger.info(f"⏭  {VECTOR_INDEX} 삭제 (적재 후 다시 생성)")
+        self.supabase.rpc('drop_tennis_rules_vector_index', {}).execute()
+
+    def build(self) -> float:
+        s = self.settings
+        logger.info(f"🔨 {VECTOR_INDEX} 생성 (m={s.m}, ef_construction={s.ef_construction}, "
+                    f"maintenance_work_mem={s.maintenance_work_mem}, workers={s.parallel_workers})")
+        with self.metrics.timed('index'):
+            seconds = self.supabase.rpc('build_tennis_rules_vector_index', s.build_params()).execute().data
+        logger.info(f"✓ 인덱스 생성 완료 ({float(seconds or 0):.1f}초, DB 기준)")
+        return float(seconds or 0)
+
+    def tune(self) -> List[Dict]:
+        s = self.settings
+        logger.info(f"📏 ef_search {list(s.ef_search_values)} 탐색 (sample {s.tuning_sample}, recall@{s.tuning_k})")
+        with self.metrics.timed('validate', items=s.tuning_sample * len(s.ef_search_values)):
+            return self.supabase.rpc('tune_tennis_rules_hnsw', s.tune_params()).execute().data or []
+
+
+def log_tuning(results: Sequence[Dict], min_recall: float = DEFAULT_MIN_RECALL) -> Optional[Dict]:
+    """ef_search 탐색 결과를 출력하고 선택된 행을 반환"""
+    chosen = None
+    for row in results:
+        mark = ' ← 선택' if row['chosen'] else ''
+        logger.info(f"   ef_search {row['ef_search']:4d}: recall {row['recall']:.3f}, "
+                    f"avg {row['avg_ms']:.2f}ms, p95 {row['p95_ms']:.2f}ms{mark}")
+        if row['chosen']:
+            chosen = row
+    if chosen is None:
+        logger.warning("⚠️  ef_search 탐색 결과가 없습니다 (임베딩이 있는 행이 없음)")
+        return None
+    if chosen['recall'] < min_recall:
+        logger.warning(f"⚠️  recall {min_recall} 에 도달한 ef_search 가 없습니다. "
+                       f"--hnsw-m / --hnsw-ef-construction 을 늘려 다시 생성하세요")
+    logger.info(f"✓ 적용: ALTER DATABASE postgres SET hnsw.ef_search = {chosen['ef_search']};")
+    return chosen
+
+
+def add_index_arguments(parser, bulk_load: bool = True) -> None:
+    if bulk_load:
+        parser.add_argument(
+            '--bulk-load',
+            action='store_true',
+            help='벡터 인덱스를 지우고 적재한 뒤 한 번에 다시 생성 + ef_search 탐색 (전체 재적재용)'
+        )
+    parser.add_argument('--hnsw-m', type=int, default=DEFAULT_HNSW_M,
+                        help=f'HNSW m (기본값: {DEFAULT_HNSW_M})')
+    parser.add_argument('--hnsw-ef-construction', type=int, default=DEFAULT_HNSW_EF_CONSTRUCTION,
+                        help=f'HNSW ef_construction (기본값: {DEFAULT_HNSW_EF_CONSTRUCTION})')
+    parser.add_argument('--maintenance-work-mem', default=DEFAULT_MAINTENANCE_WORK_MEM,
+                        help=f'인덱스 생성 시 maintenance_work_mem (기본값: {DEFAULT_MAINTENANCE_WORK_MEM})')
+    parser.add_argument('--parallel-workers', type=int, default=DEFAULT_PARALLEL_WORKERS,
+                        help=f'max_parallel_maintenance_workers (기본값: {DEFAULT_PARALLEL_WORKERS})')
+    parser.add_argument('--ef-search', type=int, nargs='+', default=list(DEFAULT_EF_SEARCH_VALUES),
+                        help=f'탐색할 hnsw.ef_search 값 (기본값: {" ".join(map(str, DEFAULT_EF_SEARCH_VALUES))})')
+    parser.add_argument('--tuning-sample', type=int, default=DEFAULT_TUNING_SAMPLE,
+                        help=f'ef_search 탐색 sample 행 수 (기본값: {DEFAULT_TUNING_SAMPLE})')
+    parser.add_argument('--tuning-k', type=int, default=DEFAULT_TUNING_K,
+                        help=f'recall@k 의 k (기본값: {DEFAULT_TUNING_K})')
+    parser.add_argument('--min-recall', type=float, default=DEFAULT_MIN_RECALL,
+                        help=f'선택할 ef_search 의 최소 recall (기본값: {DEFAULT_MIN_RECALL})')
+
+
+def index_settings_from_args(args) -> IndexSettings:
+    return IndexSettings(
+        m=args.hnsw_m,
+        ef_construction=args.hnsw_ef_construction,
+        maintenance_work_mem=args.maintenance_work_mem,
+        parallel_workers=args.parallel_workers,
+        ef_search_values=tuple(sorted(set(args.ef_search))),
+        tuning_sample=args.tuning_sample,
+        tuning_k=args.tuning_k,
+        min_recall=args.min_recall,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Build and tune the tennis_rules HNSW index')
+    parser.add_argument('--drop', action='store_true', help='벡터 인덱스 삭제 (bulk load 전)')
+    parser.add_argument('--build', action='store_true', help='벡터 인덱스 생성')
+    parser.add_argument('--tune', action='store_true', help='ef_search 탐색 후 결과 기록')
+    parser.add_argument('--script', metavar='DATA_FILE',
+                        help='DB 접속 없이 DATA_FILE (embed / export-sql 출력) 의 psql 적재 스크립트만 작성')
+    parser.add_argument('--sql-format', default='insert', choices=SQL_FORMATS,
+                        help='--script 의 DATA_FILE 형식 (기본값: insert)')
+    parser.add_argument('--supabase-url', help='Supabase URL (또는 환경변수 SUPABASE_URL)')
+    parser.add_argument('--supabase-key', help='Supabase Service Role Key (또는 환경변수 SUPABASE_SERVICE_KEY)')
+    add_index_arguments(parser, bulk_load=False)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        settings = index_settings_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.script:
+        script = write_bulk_load_script(args.script, args.sql_format, settings)
+        logger.info(f"✓ psql 적재 스크립트 저장: {script}")
+        return 0
+    if not (args.drop or args.build or args.tune):
+        parser.error('--drop, --build, --tune, --script 중 하나 이상이 필요합니다')
+
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    url = args.supabase_url or os.getenv('SUPABASE_URL')
+    key = args.supabase_key or os.getenv('SUPABASE_SERVICE_KEY')
+    if not (url and key):
+        logger.error("❌ SUPABASE_URL / SUPABASE_SERVICE_KEY 가 필요합니다")
+        return 1
+
+    builder = SupabaseIndexBuilder(create_client(url, key), settings)
+    if args.drop:
+        builder.drop()
+    if args.build:
+        builder.build()
+    if args.tune and log_tuning(builder.tune(), settings.min_recall) is None:
+        return 1
+    builder.metrics.log_summary()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Run Journal
+-----------
+긴 임베딩/업로드 실행을 중간에서 이어가기(--resume) 위한 append-only 작업 기록입니다.
+
+    {"run": {...}}                                   첫 줄: 실행 설정 (다른 설정으로는 이어가지 않음)
+    {"chunk": "<chunk_hash>", "status": "uploaded"}  chunk 1개 완료 (gen_sql 은 embedding 도 기록)
+    {"commit": {...}}                                앞의 chunk 기록을 확정 (+ 출력 파일 offset 등)
+
+chunk 기록은 다음 commit 줄이 쓰여야 완료로 인정됩니다. commit 때마다 flush + fsync 하므로
+프로세스가 어느 시점에 죽어도 마지막 commit 까지의 작업은 남고, 이어서 실행할 때
+마지막 commit 뒤의 기록(반쯤 쓴 줄 포함)은 잘라내고 그 위치부터 다시 씁니다.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .embedding_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPLOAD_JOURNAL_PATH = DEFAULT_CACHE_DIR / 'upload_journal.jsonl'
+
+
+class RunJournal:
+    """완료된 chunk 와 마지막 commit 상태를 JSONL 파일로 기록"""
+
+    def __init__(self, path: Path, run: Dict, resume: bool = False):
+        """
+        Args:
+            path: journal 파일 경로
+            run: 실행 설정 (모델, 출력 형식 등). resume 시 journal 의 설정과 같아야 함
+            resume: True 면 기존 journal 을 읽어 이어서 기록, False 면 새로 시작
+        """
+        self.path = Path(path)
+        self.run = run
+        self.completed: Dict[str, Dict] = {}
+        self.state: Dict = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        end = self._load() if resume and self.path.exists() else None
+        if end is None:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._write({'run': run})
+            self._sync()
+        else:
+            self._file = open(self.path, 'r+', encoding='utf-8')
+            self._file.seek(end)
+            self._file.truncate()
+            logger.info(f"↩️  journal 이어서 실행: 완료된 chunk {len(self.completed)}개 ({self.path})")
+
+    def _load(self) -> Optional[int]:
+        """마지막 commit 까지 읽고 그 끝 위치(byte offset)를 반환"""
+        completed: Dict[str, Dict] = {}
+        pending: Dict[str, Dict] = {}
+        end = None
+        with open(self.path, 'rb') as f:
+            for raw in f:
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    break   # 쓰다가 중단된 마지막 줄
+                if 'run' in entry:
+                    if entry['run'] != self.run:
+                        raise ValueError(
+                            f"journal 의 실행 설정이 현재와 다릅니다: {self.path}\n"
+                            f"  journal: {entry['run']}\n  현재:    {self.run}\n"
+                            "--resume 없이 처음부터 실행하세요"
+                        )
+                    end = f.tell()
+                elif 'chunk' in entry:
+                    pending[entry['chunk']] = entry
+                elif 'commit' in entry:
+                    completed.update(pending)
+                    pending.clear()
+                    self.state = entry['commit']
+                    # commit 뒤에서만 자르므로 확정되지 않은 chunk 기록은 다음 실행에서 지워짐
+                    end = f.tell()
+        if end is None:
+            return None
+        self.completed = completed
+        return end
+
+    def __contains__(self, chunk_hash: str) -> bool:
+        return chunk_hash in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def _write(self, entry: Dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, chunk_hash: str, status: str, **fields) -> None:
+        """chunk 1개 완료 기록 (다음 commit 에서 확정)"""
+        entry = {'chunk': chunk_hash, 'status': status, **fields}
+        with self._lock:
+            self._write(entry)
+            self.completed[chunk_hash] = entry
+            self._pending += 1
+
+    def record_many(self, chunk_hashes: Iterable[str], status: str) -> None:
+        for chunk_hash in chunk_hashes:
+            self.record(chunk_hash, status)
+        self.commit()
+
+    def commit(self, **state) -> None:
+        """지금까지의 기록을 디스크에 확정. state 는 이어서 실행할 때 journal.state 로 돌려받음"""
+        with self._lock:
+            if not self._pending and not state:
+                return
+            self.state = {**self.state, **state}
+            self._write({'commit': self.state})
+            self._sync()
+            self._pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._file.close()
+
+
+def add_journal_arguments(parser, default_path: Optional[Path] = None) -> None:
+    """--resume / --journal 옵션 (default_path 가 None 이면 스크립트가 출력 경로로 정함)"""
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='journal 에 완료로 기록된 chunk 는 건너뛰고 이전 실행을 이어서 진행'
+    )
+    parser.add_argument(
+        '--journal',
+        type=str,
+        default=str(default_path) if default_path else None,
+        help=f'작업 journal 경로 (기본값: {default_path or "<output>.journal"})'
+    )
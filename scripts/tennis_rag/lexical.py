@@ -0,0 +1,272 @@
+"""
+Lexical (BM25) Index
+--------------------
+chunk 의 rule_id / content 로 만든 역색인입니다. "Rule 12", "제5조", "Appendix IV" 같은
+조항 번호 질문이나 키워드 질문은 임베딩 API 를 부르지 않고 바로 찾습니다.
+
+- 토큰화: NFKC + 소문자, 영어/숫자는 단어 단위, 한글은 글자 bigram (한 글자 단어는 unigram)
+- 조항 참조: Rule/Article/Section N, 제N조, N. (rule_id 첫머리) → 같은 참조 토큰 (§N),
+  제N장 → §chN, Appendix IV / 부록 4 → §appiv.
+  rule_id 에 있는 참조와 일치하면 REFERENCE_BOOST 를 더해 해당 조항이 맨 위로 옵니다.
+- 점수: BM25 (k1=1.2, b=0.75), rule_id 토큰은 RULE_ID_WEIGHT 배로 계산
+- HybridIndex: BM25 순위와 벡터 검색 순위를 Reciprocal Rank Fusion 으로 합침.
+  조항 번호만 있는 질문(is_reference_query)은 벡터 검색을 건너뜀
+
+ETL 의 ArtifactWriter 가 행을 쓰면서 함께 만들고, artifact 디렉토리에 lexical.json.gz 로 저장합니다.
+DB 쪽은 마이그레이션 20261017_add_tennis_rules_lexical_search.sql 의 tsvector / trigram 인덱스와
+search_tennis_rules_lexical, match_tennis_rules_hybrid 함수가 같은 역할을 합니다.
+
+사용법:
+    python -m tennis_rag search --artifact insert_rules.artifact --mode lexical --query "Rule 12"
+    python -m tennis_rag search --artifact insert_rules.artifact --mode hybrid --query "서브 순서"
+"""
+
+import gzip
+import json
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_FILE = 'lexical.json.gz'
+LEXICAL_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+RULE_ID_WEIGHT = 3
+REFERENCE_BOOST = 100.0
+DEFAULT_RRF_K = 60
+
+_HANGUL = 'ㄱ-ㅎㅏ-ㅣ가-힣'
+_TOKEN = re.compile(rf'[{_HANGUL}]+|[^\W_{_HANGUL}]+')
+_ROMAN = {'i': 1, 'v': 5, 'x': 10}
+# 본문/질문 어디서나 인식하는 참조
+_REFERENCES = (
+    (re.compile(r'\b(?:rule|article|section)\s*(\d+)\b'), '§{}'),
+    (re.compile(r'제\s*(\d+)\s*조'), '§{}'),
+    (re.compile(r'제\s*(\d+)\s*장'), '§ch{}'),
+    (re.compile(r'\bappendix\s+([ivx]+|\d+)\b'), '§app{}'),
+    (re.compile(r'부록\s*([ivx]+|\d+)'), '§app{}'),
+)
+# rule_id 첫머리의 "12. BALL IN PLAY" 형식
+_LEADING_NUMBER = re.compile(r'^\s*(\d+)\.')
+# 조항 번호만 있는 질문에서 무시할 단어
+_FILLER = {'rule', 'rules', 'article', 'section', 'appendix', 'the', 'of', 'what', 'is', 'says', 'say',
+           'show', 'me', '규칙', '조항', '내용', '부록', '알려줘', '무엇', '뭐야'}
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def _roman_to_int(value: str) -> int:
+    total = 0
+    for current, following in zip(value, value[1:] + ' '):
+        number = _ROMAN[current]
+        total += -number if _ROMAN.get(following, 0) > number else number
+    return total
+
+
+def reference_tokens(text: str, rule_id: bool = False) -> List[str]:
+    """텍스트 안의 조항 참조 토큰 (rule_id=True 이면 "12. ..." 도 인식)"""
+    text = _normalize(text)
+    refs = []
+    for pattern, template in _REFERENCES:
+        for match in pattern.finditer(text):
+            value = match.group(1)
+            if template == '§app{}' and not value.isdigit():
+                value = str(_roman_to_int(value))
+            refs.append(template.format(value))
+    if rule_id:
+        match = _LEADING_NUMBER.match(text)
+        if match:
+            refs.append(f'§{match.group(1)}')
+    return refs
+
+
+def tokenize(text: str) -> List[str]:
+    """영어/숫자 단어 + 한글 글자 bigram"""
+    tokens = []
+    for word in _TOKEN.findall(_normalize(text)):
+        if '가' <= word[0] <= '힣' or 'ㄱ' <= word[0] <= 'ㅣ':
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def is_reference_query(question: str) -> bool:
+    """조항 번호만 있는 질문인지 ("Rule 12", "제5조", "Appendix IV 내용")"""
+    normalized = _normalize(question)
+    if not reference_tokens(normalized):
+        return False
+    remainder = normalized
+    for pattern, _ in _REFERENCES:
+        remainder = pattern.sub(' ', remainder)
+    return all(word in _FILLER for word in _TOKEN.findall(remainder))
+
+
+class LexicalIndexBuilder:
+    """행을 하나씩 받아 역색인을 만듦 (ArtifactWriter 가 사용)"""
+
+    def __init__(self):
+        self.postings: Dict[str, List[int]] = defaultdict(list)   # term → [doc, tf, doc, tf, ...]
+        self.rule_refs: Dict[str, List[int]] = defaultdict(list)  # 참조 토큰 → rule_id 가 그 조항인 doc
+        self.doc_len: List[int] = []
+
+    def add(self, rule_id: str, content: str) -> None:
+        doc = len(self.doc_len)
+        counts = Counter(tokenize(content) + reference_tokens(content))
+        for token in tokenize(rule_id):
+            counts[token] += RULE_ID_WEIGHT
+        refs = set(reference_tokens(rule_id, rule_id=True))
+        for ref in refs:
+            counts[ref] += RULE_ID_WEIGHT
+            self.rule_refs[ref].append(doc)
+        for term, tf in counts.items():
+            self.postings[term].extend((doc, tf))
+        self.doc_len.append(sum(counts.values()))
+
+    def build(self) -> 'LexicalIndex':
+        return LexicalIndex(dict(self.postings), self.doc_len, dict(self.rule_refs))
+
+
+class LexicalIndex:
+    """BM25 검색 (postings 는 term → [doc, tf, doc, tf, ...])"""
+
+    def __init__(self, postings: Dict[str, List[int]], doc_len: Sequence[int],
+                 rule_refs: Dict[str, List[int]], rows: Optional[Sequence[Dict]] = None):
+        self.postings = postings
+        self.doc_len = doc_len
+        self.rule_refs = rule_refs
+        self.rows = rows
+        self.avg_len = (sum(doc_len) / len(doc_len)) if doc_len else 0.0
+        n = len(doc_len)
+        self.idf = {
+            term: math.log(1 + (n - len(plist) // 2 + 0.5) / (len(plist) // 2 + 0.5))
+            for term, plist in postings.items()
+        }
+
+    @classmethod
+    def build(cls, rows: Iterable[Dict]) -> 'LexicalIndex':
+        rows = list(rows)
+        builder = LexicalIndexBuilder()
+        for row in rows:
+            builder.add(row['rule_id'], row['content'])
+        index = builder.build()
+        index.rows = rows
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def save(self, directory: Path) -> Path:
+        path = Path(directory) / LEXICAL_FILE
+        data = {'version': LEXICAL_VERSION, 'k1': BM25_K1, 'b': BM25_B,
+                'doc_len': list(self.doc_len), 'postings': self.postings, 'rule_refs': self.rule_refs}
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        return path
+
+    @classmethod
+    def from_artifact(cls, artifact_dir: Path, rows: Optional[Sequence[Dict]] = None) -> 'LexicalIndex':
+        """artifact 의 lexical.json.gz 를 읽고, 없으면 (예전 artifact) sidecar 로 만들어서 저장"""
+        if rows is None:
+            from .artifact import EmbeddingArtifact
+            rows = EmbeddingArtifact(artifact_dir).rows
+        path = Path(artifact_dir) / LEXICAL_FILE
+        if path.exists():
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == LEXICAL_VERSION:
+                return cls(data['postings'], data['doc_len'], data['rule_refs'], rows)
+            logger.warning(f"⚠️  lexical 인덱스 버전이 달라 다시 만듭니다: {path}")
+        else:
+            logger.info(f"lexical 인덱스가 없어 sidecar 로 만듭니다: {artifact_dir}")
+        index = cls.build(rows)
+        index.save(artifact_dir)
+        return index
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """doc → BM25 점수 (+ rule_id 참조 일치 시 REFERENCE_BOOST)"""
+        refs = reference_tokens(query)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query) + refs):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for i in range(0, len(plist), 2):
+                doc, tf = plist[i], plist[i + 1]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc] / self.avg_len)
+                scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        for ref in set(refs):
+            for doc in self.rule_refs.get(ref, ()):
+                scores[doc] += REFERENCE_BOOST
+        return scores
+
+    def top(self, query: str, match_count: int) -> List[Tuple[int, float]]:
+        ranked = sorted(self.scores(query).items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:match_count]
+
+    def search(self, query: str, match_threshold: float = 0.0, match_count: int = 10):
+        """SearchResult 리스트 (similarity = BM25 점수)"""
+        from .search import SearchResult
+
+        results = []
+        for doc, score in self.top(query, match_count):
+            if score <= match_threshold:
+                break
+            row = self.rows[doc]
+            results.append(SearchResult(doc, row['source_file'], row['rule_id'], row['content'],
+                                        row.get('metadata') or {}, score))
+        return results
+
+
+class HybridIndex:
+    """BM25 + 벡터 검색 Reciprocal Rank Fusion (similarity = RRF 점수)"""
+
+    def __init__(self, vector_index, lexical_index: LexicalIndex, rrf_k: int = DEFAULT_RRF_K,
+                 candidate_factor: int = 4):
+        self.vector_index = vector_index
+        self.lexical_index = lexical_index
+        self.rrf_k = rrf_k
+        self.candidate_factor = candidate_factor
+
+    def __len__(self) -> int:
+        return len(self.lexical_index)
+
+    def search(self, query: str, query_vector=None, match_threshold: float = 0.3,
+               match_count: int = 10):
+        """
+        query_vector 가 None 이면 (조항 번호 질문 등) BM25 결과를 그대로 반환합니다 (similarity = BM25 점수).
+        벡터 결과에는 match_threshold 를 적용하고, 각 목록에서 match_count x candidate_factor 개 후보를 합칩니다.
+        """
+        from .search import SearchResult
+
+        if query_vector is None:
+            return self.lexical_index.search(query, match_count=match_count)
+
+        candidates = match_count * self.candidate_factor
+        ranked = [
+            [doc for doc, _ in self.lexical_index.top(query, candidates)],
+            [m.id for m in self.vector_index.search(query_vector, match_threshold, candidates)],
+        ]
+
+        fused: Dict[int, float] = defaultdict(float)
+        for docs in ranked:
+            for rank, doc in enumerate(docs, 1):
+                fused[doc] += 1.0 / (self.rrf_k + rank)
+        results = []
+        for doc, score in sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:match_count]:
+            row = self.lexical_index.rows[doc]
+            results.append(SearchResult(doc, row['source_file'], row['rule_id'], row['content'],
+                                        row.get('metadata') or {}, score))
+        return results
@@ -0,0 +1,82 @@
+"""
+Chunk Manifest
+--------------
+증분 재적재(--incremental)를 위해 마지막으로 업로드한 상태를 기록합니다.
+
+- PDF 파일별 SHA-256: 바뀌지 않은 파일은 추출부터 건너뜀
+- chunk 별 content hash (source_file + rule_id + content): 새로 생기거나 바뀐 chunk 만
+  임베딩/업서트하고, 사라진 chunk 는 tennis_rules 에서 삭제
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .embedding_cache import DEFAULT_CACHE_DIR, normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST_PATH = DEFAULT_CACHE_DIR / 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """파일 전체의 SHA-256 (1MB 단위로 읽음)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(source_file: str, rule_id: str, content: str) -> str:
+    """chunk 식별용 content hash (tennis_rules.chunk_hash)"""
+    key = '\x1f'.join((source_file, rule_id.strip(), normalize_text(content)))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class ChunkManifest:
+    """파일/chunk hash 를 JSON 파일로 보관"""
+
+    def __init__(self, path: Path = DEFAULT_MANIFEST_PATH):
+        self.path = Path(path)
+        self.files: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.files = data.get('files', {})
+            else:
+                logger.warning(f"⚠️  manifest 버전이 달라 무시합니다: {self.path}")
+
+    def is_unchanged(self, source_file: str, sha256: str) -> bool:
+        """이전에 모든 chunk 가 성공적으로 업로드된 동일 파일인지"""
+        entry = self.files.get(source_file)
+        return bool(entry) and entry.get('sha256') == sha256
+
+    def known_hashes(self, source_file: str) -> Set[str]:
+        return set(self.files.get(source_file, {}).get('chunks', []))
+
+    def update(self, source_file: str, sha256: Optional[str], hashes: Iterable[str]) -> None:
+        """
+        파일 상태 기록. 일부 chunk 가 실패했다면 sha256=None 으로 저장해
+        다음 실행에서 파일을 다시 처리하게 합니다.
+        """
+        self.files[source_file] = {'sha256': sha256, 'chunks': sorted(hashes)}
+
+    def missing_files(self, present: Iterable[str]) -> List[str]:
+        """manifest 에는 있지만 현재 디렉토리에 없는 파일"""
+        present = set(present)
+        return sorted(name for name in self.files if name not in present)
+
+    def save(self) -> None:
+        """임시 파일에 쓴 뒤 교체 (중간에 중단돼도 manifest 가 깨지지 않음)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, f,
+                      ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
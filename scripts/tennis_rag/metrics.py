@@ -0,0 +1,294 @@
+"""
+Pipeline Metrics
+----------------
+ETL 단계별 (extract / chunk / dedup / embed / upload ...) 계측값을 모아
+JSON 과 Prometheus textfile 형식으로 저장하고, --profile 로 cProfile / tracemalloc 을 켭니다.
+
+단계별 기록 항목:
+- seconds:      그 단계가 실제로 일한 시간 (앞 단계를 기다린 시간 제외)
+- wait_seconds: 앞 단계(queue)를 기다린 시간
+- items, bytes, retries, errors, 그리고 단계별 추가 값 (requests, tokens ...)
+
+streaming 단계는 iterate() / waiting() 으로 감싸면, 같은 스레드 안에서 중첩된 단계의 시간을
+빼고 자기 시간(self time)만 기록합니다.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .embedding_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_DIR = DEFAULT_CACHE_DIR / 'metrics'
+PROFILE_MODES = ('cpu', 'memory')
+DEFAULT_PROFILE_TOP = 25
+METRIC_PREFIX = 'tennis_rag'
+
+_local = threading.local()
+
+
+def _child_stack() -> List[float]:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    seconds: float = 0.0
+    wait_seconds: float = 0.0
+    items: int = 0
+    bytes: int = 0
+    retries: int = 0
+    errors: int = 0
+    extra: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        data = {
+            'seconds': round(self.seconds, 4),
+            'wait_seconds': round(self.wait_seconds, 4),
+            'items': self.items,
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'errors': self.errors,
+            'items_per_second': round(self.items / self.seconds, 2) if self.seconds else 0.0,
+        }
+        data.update(self.extra)
+        return data
+
+
+class PipelineMetrics:
+    """단계별 계측값 모음 (여러 스레드에서 동시에 기록 가능)"""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.monotonic()
+        self._stages: Dict[str, StageMetrics] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> StageMetrics:
+        with self._lock:
+            if name not in self._stages:
+                self._stages[name] = StageMetrics(name)
+            return self._stages[name]
+
+    def add(self, name: str, seconds: float = 0.0, items: int = 0, bytes: int = 0,
+            retries: int = 0, errors: int = 0, wait_seconds: float = 0.0, **extra: float) -> None:
+        stage = self.stage(name)
+        with self._lock:
+            stage.seconds += seconds
+            stage.wait_seconds += wait_seconds
+            stage.items += items
+            stage.bytes += bytes
+            stage.retries += retries
+            stage.errors += errors
+            for key, value in extra.items():
+                stage.extra[key] = stage.extra.get(key, 0) + value
+
+    @contextmanager
+    def timed(self, name: str, items: int = 0, bytes: int = 0) -> Iterator[None]:
+        """블록 실행 시간을 단계 시간으로 기록 (중첩된 iterate/waiting 시간은 제외)"""
+        stack = _child_stack()
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            child = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.add(name, seconds=elapsed - child, items=items, bytes=bytes)
+
+    def iterate(self, iterable: Iterable, name: str,
+                size: Optional[Callable[[object], int]] = None) -> Iterator:
+        """iterable 의 항목을 만드는 데 쓴 시간/개수/크기를 name 단계로 기록"""
+        iterator = iter(iterable)
+        stack = _child_stack()
+        while True:
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - started
+                child = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.add(name, seconds=elapsed - child)
+            self.add(name, items=1, bytes=size(item) if size else 0)
+            yield item
+
+    def waiting(self, iterable: Iterable, name: str) -> Iterator:
+        """name 단계가 앞 단계 출력을 기다린 시간 (감싼 단계의 self time 에서 빠짐)"""
+        stack = _child_stack()
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - started
+                if stack:
+                    stack[-1] += elapsed
+                self.add(name, wait_seconds=elapsed)
+            yield item
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = {name: stage.to_dict() for name, stage in self._stages.items()}
+        return {
+            'job': self.job,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.monotonic() - self._started, 4),
+            'stages': stages,
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus textfile collector 형식"""
+        summary = self.to_dict()
+        series: Dict[str, List[str]] = {}
+        for stage, values in summary['stages'].items():
+            for key, value in values.items():
+                name = f"{METRIC_PREFIX}_stage_{key}"
+                series.setdefault(name, []).append(
+                    f'{name}{{job="{self.job}",stage="{stage}"}} {value}'
+                )
+
+        lines = [
+            f"# HELP {METRIC_PREFIX}_run_wall_seconds Wall time of the last ETL run",
+            f"# TYPE {METRIC_PREFIX}_run_wall_seconds gauge",
+            f'{METRIC_PREFIX}_run_wall_seconds{{job="{self.job}"}} {summary["wall_seconds"]}',
+            f"# HELP {METRIC_PREFIX}_run_timestamp_seconds Start time of the last ETL run",
+            f"# TYPE {METRIC_PREFIX}_run_timestamp_seconds gauge",
+            f'{METRIC_PREFIX}_run_timestamp_seconds{{job="{self.job}"}} {self.started_at.timestamp():.0f}',
+        ]
+        for name, samples in sorted(series.items()):
+            lines.append(f"# HELP {name} ETL stage metric ({name[len(METRIC_PREFIX) + 7:]})")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory: Path = DEFAULT_METRICS_DIR) -> Dict[str, Path]:
+        """<job>.json 과 <job>.prom 저장 (임시 파일 후 rename 이라 collector 가 반쯤 쓴 파일을 읽지 않음)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        outputs = {
+            'json': (directory / f"{self.job}.json",
+                     json.dumps(self.to_dict(), ensure_ascii=False, indent=2) + '\n'),
+            'prometheus': (directory / f"{self.job}.prom", self.to_prometheus()),
+        }
+        for path, content in outputs.values():
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+            tmp_path.write_text(content, encoding='utf-8')
+            os.replace(tmp_path, path)
+        return {kind: path for kind, (path, _) in outputs.items()}
+
+    def log_summary(self) -> None:
+        summary = self.to_dict()
+        logger.info(f"⏱  단계별 계측 (전체 {summary['wall_seconds']:.2f}초)")
+        for name, values in summary['stages'].items():
+            logger.info(
+                f"  {name:<8} {values['seconds']:8.2f}초 (대기 {values['wait_seconds']:.2f}초) "
+                f"items {values['items']}, bytes {values['bytes']:,}, "
+                f"retries {values['retries']}, errors {values['errors']}"
+            )
+
+
+@contextmanager
+def profiled(mode: Optional[str], top: int = DEFAULT_PROFILE_TOP,
+             output_dir: Path = DEFAULT_METRICS_DIR, job: str = 'etl') -> Iterator[None]:
+    """
+    mode='cpu': 모든 스레드에 cProfile 을 걸고 tottime / cumtime 상위 함수 출력 (.prof 저장)
+    mode='memory': tracemalloc 으로 할당 상위 위치와 peak 메모리 출력
+    """
+    if not mode:
+        yield
+        return
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if mode == 'memory':
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            logger.info(f"🧠 tracemalloc: 현재 {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB")
+            for stat in snapshot.statistics('lineno')[:top]:
+                logger.info(f"  {stat}")
+        return
+
+    # 스레드마다 별도 Profile 을 만들고 끝난 뒤 합침 (cProfile 은 자기 스레드만 기록)
+    profiles: List[cProfile.Profile] = []
+
+    def start_thread_profile(frame, event, arg):
+        profile = cProfile.Profile()
+        profiles.append(profile)
+        profile.enable()
+
+    main = cProfile.Profile()
+    profiles.append(main)
+    threading.setprofile(start_thread_profile)
+    main.enable()
+    try:
+        yield
+    finally:
+        main.disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(main)
+        for profile in profiles[1:]:
+            stats.add(profile)
+
+        prof_path = output_dir / f"{job}.prof"
+        stats.dump_stats(str(prof_path))
+        for sort_key in ('tottime', 'cumulative'):
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats(sort_key).print_stats(top)
+            logger.info(f"🔥 cProfile 상위 {top}개 ({sort_key}):\n{stream.getvalue()}")
+        logger.info(f"✓ cProfile 결과 저장: {prof_path} (snakeviz / pstats 로 확인)")
+
+
+def add_metrics_arguments(parser) -> None:
+    """두 ETL 스크립트 공용 계측/프로파일링 옵션"""
+    parser.add_argument(
+        '--metrics-dir',
+        type=str,
+        default=str(DEFAULT_METRICS_DIR),
+        help=f'단계별 계측 JSON / Prometheus textfile 저장 디렉토리 (기본값: {DEFAULT_METRICS_DIR})'
+    )
+    parser.add_argument(
+        '--profile',
+        choices=PROFILE_MODES,
+        help='cpu: cProfile (모든 스레드), memory: tracemalloc 으로 실행 전체를 프로파일링'
+    )
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=DEFAULT_PROFILE_TOP,
+        help=f'출력할 hot spot 개수 (기본값: {DEFAULT_PROFILE_TOP})'
+    )
@@ -0,0 +1,191 @@
+"""
+PDF Text Extraction
+-------------------
+PyPDF2 페이지 추출은 CPU 작업이므로, 페이지 범위를 나눠 프로세스 풀에서 병렬로
+처리합니다. 여러 PDF 의 페이지 범위를 하나의 풀에 함께 넣기 때문에 파일 단위와
+페이지 단위 병렬화가 동시에 이뤄집니다.
+
+페이지 결과는 페이지 번호 순서로 다시 모은 뒤 한 번의 join 으로 합칩니다.
+
+사용법 (scripts/ 에서):
+    python -m tennis_rag extract ./tennis-rules-pdfs --output-dir ./texts --extract-workers 0
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGES_PER_TASK = 8
+EXTRACTOR_VERSION = 1   # _extract_page_range 의 출력이 바뀌면 올림 (추출 텍스트 캐시 무효화)
+
+
+class PageText(NamedTuple):
+    """추출된 페이지 1장 (page_number 는 1부터 시작)"""
+    page_number: int
+    text: str
+    seconds: float
+
+
+def extractor_version() -> str:
+    """추출 텍스트 캐시 key 의 일부 (PyPDF2 버전 + EXTRACTOR_VERSION, PyPDF2 는 import 하지 않음)"""
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        pypdf_version = version('PyPDF2')
+    except PackageNotFoundError:
+        pypdf_version = 'unknown'
+    return f"PyPDF2-{pypdf_version}/{EXTRACTOR_VERSION}"
+
+
+def page_count(pdf_path: Path) -> int:
+    import PyPDF2
+    return len(PyPDF2.PdfReader(str(pdf_path)).pages)
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[PageText]:
+    """[start, end) 페이지 추출 (프로세스 풀 worker 에서 실행)"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(pdf_path)
+    pages = []
+    for index in range(start, end):
+        started = time.perf_counter()
+        text = reader.pages[index].extract_text() or ''
+        pages.append(PageText(index + 1, text, time.perf_counter() - started))
+    return pages
+
+
+def join_pages(pages: Sequence[PageText]) -> str:
+    """페이지 텍스트를 순서대로 합침 (페이지마다 줄바꿈 1개)"""
+    return ''.join(f"{page.text}\n" for page in pages)
+
+
+def resolve_workers(workers: int) -> int:
+    """0 이하는 CPU 코어 수로 해석"""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def extract_pages(pdf_paths: Sequence[Path], executor: Optional[Executor] = None,
+                  pages_per_task: int = DEFAULT_PAGES_PER_TASK) -> Dict[Path, List[PageText]]:
+    """
+    여러 PDF 의 페이지를 추출합니다.
+
+    Args:
+        pdf_paths: 추출할 PDF 목록
+        executor: 프로세스 풀 (None 이면 현재 프로세스에서 순차 처리)
+        pages_per_task: 작업 1건에 포함할 페이지 수
+
+    Returns:
+        {pdf_path: 페이지 번호 순으로 정렬된 PageText 리스트}. 읽기 실패한 파일은 빈 리스트
+    """
+    results: Dict[Path, List[PageText]] = {}
+    tasks = []
+
+    for pdf_path in pdf_paths:
+        results[pdf_path] = []
+        try:
+            total = page_count(pdf_path)
+        except Exception as e:
+            logger.error(f"❌ PDF 읽기 실패 ({pdf_path}): {e}")
+            continue
+
+        for start in range(0, total, pages_per_task):
+            end = min(start + pages_per_task, total)
+            if executor is None:
+                task = (_extract_page_range, str(pdf_path), start, end)
+            else:
+                task = executor.submit(_extract_page_range, str(pdf_path), start, end)
+            tasks.append((pdf_path, start, task))
+
+    # 제출 순서 = (파일, 페이지) 순서이므로 그대로 모으면 페이지 순서가 유지됨
+    failed = set()
+    for pdf_path, start, task in tasks:
+        if pdf_path in failed:
+            continue
+        try:
+            pages = task[0](*task[1:]) if executor is None else task.result()
+        except Exception as e:
+            logger.error(f"❌ PDF 읽기 실패 ({pdf_path}, {start + 1}페이지~): {e}")
+            failed.add(pdf_path)
+            results[pdf_path] = []
+            continue
+        results[pdf_path].extend(pages)
+
+    return results
+
+
+def log_page_timings(pdf_name: str, pages: Sequence[PageText], top: int = 3) -> None:
+    """문서별 추출 시간과 가장 느린 페이지 출력"""
+    if not pages:
+        return
+    total = sum(page.seconds for page in pages)
+    slowest = sorted(pages, key=lambda page: page.seconds, reverse=True)[:top]
+    slowest_str = ', '.join(f"p{page.page_number} {page.seconds * 1000:.0f}ms" for page in slowest)
+    logger.info(
+        f"  {pdf_name}: 페이지 추출 {total:.2f}초 "
+        f"(평균 {total / len(pages) * 1000:.0f}ms/페이지, 느린 페이지: {slowest_str})"
+    )
+
+
+def open_extract_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """workers > 1 이면 프로세스 풀 생성, 아니면 None (순차 처리)"""
+    workers = resolve_workers(workers)
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+
+def iter_pdf_paths(paths: Sequence[str]) -> List[Path]:
+    """파일은 그대로, 디렉토리는 안의 *.pdf (이름순)"""
+    pdf_paths: List[Path] = []
+    for path in map(Path, paths):
+        pdf_paths.extend(sorted(path.glob('*.pdf')) if path.is_dir() else [path])
+    return pdf_paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Extract text from tennis rules PDFs')
+    parser.add_argument('pdf', nargs='+', help='PDF 파일 또는 PDF 가 있는 디렉토리')
+    parser.add_argument('--output-dir', help='<PDF 이름>.txt 로 저장할 디렉토리 (없으면 stdout 출력)')
+    parser.add_argument('--extract-workers', type=int, default=1,
+                        help='PDF 텍스트 추출 프로세스 수 (기본값: 1 순차, 0: CPU 코어 수)')
+    from .text_cache import add_text_cache_arguments, extract_pages_cached, text_cache_from_args
+    add_text_cache_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    pdf_paths = iter_pdf_paths(args.pdf)
+    if not pdf_paths:
+        parser.error('PDF 파일을 찾을 수 없습니다')
+
+    text_cache = text_cache_from_args(args)
+    pool = open_extract_pool(args.extract_workers)
+    try:
+        pages_by_file = extract_pages_cached(pdf_paths, text_cache, executor=pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        text_cache.close()
+
+    output_dir = Path(args.output_dir) if args.output_dir else None
+    if output_dir is not None:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    for pdf_path, pages in pages_by_file.items():
+        text = join_pages(pages)
+        if output_dir is None:
+            sys.stdout.write(text)
+            continue
+        output_path = output_dir / f"{pdf_path.stem}.txt"
+        output_path.write_text(text, encoding='utf-8')
+        log_page_timings(pdf_path.name, pages)
+        logger.info(f"✓ {pdf_path.name}: {len(pages)} 페이지, {len(text)} 글자 → {output_path}")
+    return 0 if all(pages_by_file.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
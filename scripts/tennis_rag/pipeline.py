@@ -0,0 +1,125 @@
+"""
+Streaming Pipeline
+------------------
+PDF 페이지 → chunk → 임베딩된 chunk → 업로드 batch 로 이어지는 ETL 단계를
+generator 로 연결하기 위한 도구입니다.
+
+각 단계는 필요한 만큼만 앞 단계에서 가져오며(pull), threaded() 로 감싼 단계는
+별도 스레드에서 크기가 제한된 queue 를 채웁니다. queue 가 가득 차면 생산자가
+멈추므로(backpressure) 디렉토리 크기와 관계없이 메모리 사용량이 일정합니다.
+"""
+
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .pdf_extract import DEFAULT_PAGES_PER_TASK, PageText, _extract_page_range, page_count
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def threaded(iterable: Iterable[T], maxsize: int = 8) -> Iterator[T]:
+    """
+    iterable 을 백그라운드 스레드에서 소비해 크기 maxsize 의 queue 로 전달합니다.
+    생산자에서 발생한 예외는 소비자 쪽에서 다시 발생합니다.
+    """
+    items: 'queue.Queue' = queue.Queue(maxsize=maxsize)
+
+    def produce():
+        try:
+            for item in iterable:
+                items.put(item)
+        except BaseException as e:
+            items.put(_StageError(e))
+        else:
+            items.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    while True:
+        item = items.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _StageError):
+            raise item.exc
+        yield item
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """size 개씩 묶어서 반환 (마지막 batch 는 더 작을 수 있음)"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_pages(pdf_paths: Sequence[Path], executor: Optional[Executor] = None,
+               pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+               max_pending: int = 8,
+               on_error: Optional[Callable[[Path, Exception], None]] = None) -> Iterator[Tuple[Path, PageText]]:
+    """
+    (pdf_path, PageText) 를 파일 순서/페이지 순서대로 생성합니다.
+
+    executor 가 있으면 최대 max_pending 개의 페이지 범위를 미리 제출해 두고,
+    앞선 결과를 소비해야 다음 범위를 제출합니다. 읽기에 실패한 파일은 on_error 로 알립니다.
+    """
+    def ranges():
+        for pdf_path in pdf_paths:
+            try:
+                total = page_count(pdf_path)
+            except Exception as e:
+                logger.error(f"❌ PDF 읽기 실패 ({pdf_path}): {e}")
+                if on_error is not None:
+                    on_error(pdf_path, e)
+                continue
+            for start in range(0, total, pages_per_task):
+                yield pdf_path, start, min(start + pages_per_task, total)
+
+    def run(pdf_path, start, end):
+        if executor is None:
+            return lambda: _extract_page_range(str(pdf_path), start, end)
+        return executor.submit(_extract_page_range, str(pdf_path), start, end).result
+
+    tasks = ranges()
+    pending: deque = deque(
+        (pdf_path, start, run(pdf_path, start, end))
+        for pdf_path, start, end in islice(tasks, max_pending if executor else 1)
+    )
+    failed = set()
+
+    while pending:
+        pdf_path, start, result = pending.popleft()
+        next_task = next(tasks, None)
+        if next_task is not None:
+            path, next_start, end = next_task
+            pending.append((path, next_start, run(path, next_start, end)))
+
+        if pdf_path in failed:
+            continue
+        try:
+            pages = result()
+        except Exception as e:
+            # 실패한 파일의 나머지 페이지는 건너뜀
+            logger.error(f"❌ PDF 읽기 실패 ({pdf_path}, {start + 1}페이지~): {e}")
+            failed.add(pdf_path)
+            if on_error is not None:
+                on_error(pdf_path, e)
+            continue
+        for page in pages:
+            yield pdf_path, page
@@ -0,0 +1,346 @@
+"""
+Embedding Providers
+-------------------
+EmbeddingClient 의 embed_fn (genai.embed_content 호환 함수) 구현체 모음입니다.
+
+- gemini:    google.generativeai (실제 API)
+- local:     hashed n-gram 을 고정 차원으로 투영하는 결정적 로컬 임베딩 (네트워크 없음)
+- mock-http: 로컬 HTTP 서버 (batchEmbedContents 형태) + 클라이언트.
+             latency, 429 / 5xx 비율을 지정해 rate limit / 재시도 / 동시성 부하 테스트에 사용
+
+local / mock-http 로 만든 임베딩은 모델 이름 앞에 provider 를 붙여 ("local:models/...")
+임베딩 캐시와 artifact 에서 실제 Gemini 임베딩과 섞이지 않게 합니다.
+
+사용법 (mock 서버 단독 실행):
+    python -m tennis_rag.providers --port 8089 --latency-ms 120 --rate-limit-rate 0.05
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from .embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_PROVIDERS = ('gemini', 'local', 'mock-http')
+DEFAULT_LOCAL_DIM = 768
+DEFAULT_MOCK_LATENCY_MS = 80.0
+# output_dimensionality (Matryoshka) 와 artifact 양자화 형식. ETL 옵션에서 쓰므로 numpy 없이 import 되는 여기에 둠
+MATRYOSHKA_DIMS = (256, 512, 768)
+STORAGE_TYPES = ('float32', 'float16', 'int8', 'binary')
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def provider_model(provider: str, model: str) -> str:
+    """캐시/artifact 에 기록할 모델 이름 (gemini 외 provider 는 접두어를 붙임)"""
+    return model if provider == 'gemini' else f"{provider}:{model}"
+
+
+def provider_for_model(model: str) -> str:
+    """provider_model() 로 만든 이름에서 provider 를 역으로 찾음"""
+    prefix = model.split(':', 1)[0]
+    return prefix if ':' in model and prefix in EMBEDDING_PROVIDERS else 'gemini'
+
+
+def _wrap(vectors: List[List[float]], content) -> Dict:
+    """genai.embed_content 와 같은 형태로 반환 (단일 문자열이면 벡터 1개)"""
+    return {'embedding': vectors[0] if isinstance(content, str) else vectors}
+
+
+def gemini_embed_fn(api_key: Optional[str] = None) -> Callable:
+    """google.generativeai 의 embed_content (api_key 가 없으면 GEMINI_API_KEY 사용)"""
+    import os
+    import google.generativeai as genai
+
+    if not api_key:
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_key = os.getenv('GEMINI_API_KEY')
+    genai.configure(api_key=api_key)
+    return genai.embed_content
+
+
+class LocalHashEmbedder:
+    """
+    결정적 로컬 임베딩 (hashing trick)
+
+    단어와 단어별 문자 n-gram (한국어 음절 포함)을 crc32 로 차원에 투영하고,
+    부호도 hash 로 정해 충돌을 상쇄합니다. 같은 텍스트는 항상 같은 벡터가 됩니다.
+    """
+
+    def __init__(self, dim: int = DEFAULT_LOCAL_DIM, ngram_range=(2, 4)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        low, high = self.ngram_range
+        for word in WORD_PATTERN.findall(normalize_text(text).lower()):
+            features.append(word)
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def vector(self, text: str, dim: Optional[int] = None) -> 'np.ndarray':
+        """dim 이 기본 차원보다 작으면 Gemini 처럼 앞쪽 dim 개만 잘라 다시 정규화 (Matryoshka)"""
+        import numpy as np
+
+        dim = dim or self.dim
+        full_dim = max(dim, self.dim)
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in self._features(text)),
+                             dtype=np.uint64)
+        if len(hashes) == 0:
+            return np.zeros(dim, dtype=np.float32)
+        signs = np.where(hashes & (1 << 31), -1.0, 1.0)
+        vector = np.bincount((hashes % full_dim).astype(np.int64), weights=signs, minlength=full_dim)[:dim]
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def __call__(self, content: Union[str, Sequence[str]], model: str = '', task_type: str = '',
+                 output_dimensionality: Optional[int] = None, **kwargs) -> Dict:
+        texts = [content] if isinstance(content, str) else content
+        return _wrap([self.vector(t, output_dimensionality).tolist() for t in texts], content)
+
+
+class HTTPEmbeddingError(Exception):
+    """HTTP 오류 (메시지에 상태 코드, response.headers 에 Retry-After)"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict] = None):
+        super().__init__(f"{status} {message}")
+        self.status = status
+        self.response = SimpleNamespace(headers=dict(headers or {}))
+
+
+class HTTPEmbedFn:
+    """batchEmbedContents 형태의 HTTP 엔드포인트를 호출하는 embed_fn"""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def __call__(self, content: Union[str, Sequence[str]], model: str, task_type: str = '',
+                 output_dimensionality: Optional[int] = None, **kwargs) -> Dict:
+        texts = [content] if isinstance(content, str) else list(content)
+        request = {'model': model, 'taskType': task_type.upper()}
+        if output_dimensionality:
+            request['outputDimensionality'] = output_dimensionality
+        body = {'requests': [dict(request, content={'parts': [{'text': t}]}) for t in texts]}
+
+        req = urllib.request.Request(
+            f"{self.base_url}/v1beta/{model}:batchEmbedContents",
+            data=json.dumps(body).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise HTTPEmbeddingError(e.code, e.read().decode('utf-8', 'replace'), e.headers) from None
+        return _wrap([item['values'] for item in payload['embeddings']], content)
+
+
+class MockEmbeddingServer:
+    """
+    로컬 mock 임베딩 서버
+
+    요청마다 latency_ms (±jitter) 만큼 지연한 뒤, rate_limit_rate 확률로 429 (Retry-After 포함),
+    error_rate 확률로 503, 나머지는 LocalHashEmbedder 벡터를 반환합니다.
+    """
+
+    def __init__(self, latency_ms: float = DEFAULT_MOCK_LATENCY_MS, jitter: float = 0.2,
+                 rate_limit_rate: float = 0.0, error_rate: float = 0.0, retry_after: float = 1.0,
+                 host: str = '127.0.0.1', port: int = 0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.embedder = LocalHashEmbedder()
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                status, payload, headers = server.respond(body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def respond(self, body: Dict):
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            spread = 1 + self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, self.latency_ms * spread) / 1000)
+
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.rate_limited += 1
+            error = {'code': 429, 'status': 'RESOURCE_EXHAUSTED', 'message': 'Resource exhausted (mock)'}
+            return 429, {'error': error}, {'Retry-After': str(self.retry_after)}
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            error = {'code': 503, 'status': 'UNAVAILABLE', 'message': 'Service unavailable (mock)'}
+            return 503, {'error': error}, {}
+
+        embeddings = []
+        for request in body['requests']:
+            text = ''.join(part['text'] for part in request['content']['parts'])
+            vector = self.embedder.vector(text, request.get('outputDimensionality'))
+            embeddings.append({'values': vector.tolist()})
+        return 200, {'embeddings': embeddings}, {}
+
+    def start(self) -> 'MockEmbeddingServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Mock 임베딩 서버 시작: {self.url} (latency {self.latency_ms:.0f}ms, "
+                    f"429 {self.rate_limit_rate:.0%}, 5xx {self.error_rate:.0%})")
+        return self
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        logger.info(f"  Mock 서버: 요청 {self.requests}건, 429 {self.rate_limited}건, 5xx {self.errors}건")
+
+    def __enter__(self) -> 'MockEmbeddingServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def add_provider_arguments(parser, default: Optional[str] = 'gemini') -> None:
+    """두 ETL 스크립트 공용 embedding provider 옵션"""
+    parser.add_argument(
+        '--embedding-provider',
+        choices=EMBEDDING_PROVIDERS,
+        default=default,
+        help='임베딩 backend (gemini: 실제 API, local: 결정적 hashed n-gram, '
+             'mock-http: 로컬 mock 서버)'
+    )
+    parser.add_argument(
+        '--mock-url',
+        type=str,
+        help='이미 실행 중인 mock 서버 주소 (없으면 프로세스 안에서 서버를 띄움)'
+    )
+    parser.add_argument(
+        '--mock-latency-ms',
+        type=float,
+        default=DEFAULT_MOCK_LATENCY_MS,
+        help=f'mock 서버 요청당 지연 (기본값: {DEFAULT_MOCK_LATENCY_MS:.0f}ms)'
+    )
+    parser.add_argument(
+        '--mock-rate-limit-rate',
+        type=float,
+        default=0.0,
+        help='mock 서버가 429 를 반환할 확률 (0~1)'
+    )
+    parser.add_argument(
+        '--mock-error-rate',
+        type=float,
+        default=0.0,
+        help='mock 서버가 503 을 반환할 확률 (0~1)'
+    )
+
+
+def add_quantization_arguments(parser) -> None:
+    """ETL 스크립트용: artifact 에 1차 검색용 양자화 벡터도 저장 (tennis_rag.quantize)"""
+    parser.add_argument(
+        '--quantize',
+        action='append',
+        choices=STORAGE_TYPES[1:],
+        default=[],
+        help='artifact 에 1차 검색용 벡터도 저장 (여러 번 지정 가능: float16 / int8 / binary)'
+    )
+    parser.add_argument(
+        '--quantize-dim',
+        type=int,
+        action='append',
+        default=[],
+        help='양자화 벡터의 Matryoshka 차원 (여러 번 지정 가능, 기본값: artifact 차원)'
+    )
+
+
+def embed_fn_from_args(args, api_key: Optional[str] = None,
+                       provider: Optional[str] = None) -> Callable:
+    """add_provider_arguments 로 받은 옵션으로 embed_fn 생성"""
+    provider = provider or args.embedding_provider
+    if provider == 'local':
+        return LocalHashEmbedder()
+    if provider == 'mock-http':
+        url = args.mock_url
+        if not url:
+            # daemon 스레드이므로 프로세스 종료 시 함께 정리됨
+            url = MockEmbeddingServer(
+                latency_ms=args.mock_latency_ms,
+                rate_limit_rate=args.mock_rate_limit_rate,
+                error_rate=args.mock_error_rate,
+            ).start().url
+        return HTTPEmbedFn(url)
+    return gemini_embed_fn(api_key)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Local mock embedding server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=DEFAULT_MOCK_LATENCY_MS)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = MockEmbeddingServer(args.latency_ms, rate_limit_rate=args.rate_limit_rate,
+                                 error_rate=args.error_rate, retry_after=args.retry_after,
+                                 host=args.host, port=args.port)
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
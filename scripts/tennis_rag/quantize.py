@@ -0,0 +1,348 @@
+"""
+Quantized / Reduced-dimension Embeddings
+----------------------------------------
+검색 인덱스 메모리를 줄이기 위한 1차 검색(first pass)용 벡터와, full precision 재정렬(rerank)입니다.
+
+- Matryoshka 차원 축소: gemini-embedding-001 의 output_dimensionality=256/512 결과는 768 차원
+  벡터의 앞부분을 자른 것과 같으므로 (다시 정규화 필요), 768 artifact 에서 재임베딩 없이 만듭니다.
+- 저장 형식 (벡터 1개당 byte, dim=768 기준)
+
+    float32  4 x dim  (3072)   원본
+    float16  2 x dim  (1536)   pgvector halfvec 와 같은 정밀도
+    int8     1 x dim  (768)    차원별 scale 로 -127..127 scalar quantization
+    binary   dim / 8  (96)     부호 bit (pgvector binary_quantize 와 같음), hamming 거리
+
+- QuantizedIndex: 1차 검색으로 match_count x rerank_factor 개 후보를 고른 뒤,
+  artifact 의 float32 벡터(memmap, 디스크)로 정확한 cosine 을 다시 계산해 순위를 정합니다.
+
+양자화 벡터는 artifact 의 quantized/<형식>-<차원>.npz 에 저장됩니다 (없으면 만들어서 저장).
+
+사용법 (recall vs 메모리 보고서):
+    python -m tennis_rag.quantize --artifact ../insert_rules.artifact --output quantize_report.json
+    python -m tennis_rag.quantize --artifact a.artifact --dims 256 --storage int8 --storage binary --rerank-factor 8
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .artifact import NORMALIZE_BLOCK_ROWS, QUANTIZED_DIR, EmbeddingArtifact, load_derived, normalize_rows
+from .embedding_cache import add_cache_arguments, cache_from_args
+from .providers import MATRYOSHKA_DIMS, STORAGE_TYPES, add_provider_arguments, add_quantization_arguments
+from .search import DEFAULT_MATCH_COUNT, DEFAULT_MATCH_THRESHOLD, SearchResult, VectorIndex, _as_query_matrix, _top_k
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_FACTOR = 4
+INT8_MAX = 127
+
+_DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8, 'binary': np.uint8}
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+
+def truncate_dims(matrix: np.ndarray, dim: int) -> np.ndarray:
+    """앞쪽 dim 개 차원만 남기고 다시 L2 정규화 (Matryoshka)"""
+    if dim >= matrix.shape[1]:
+        return np.asarray(matrix, dtype=np.float32)
+    return normalize_rows(np.array(matrix[:, :dim], dtype=np.float32))
+
+
+def bytes_per_vector(storage: str, dim: int) -> int:
+    return {'float32': 4 * dim, 'float16': 2 * dim, 'int8': dim, 'binary': (dim + 7) // 8}[storage]
+
+
+class QuantizedVectors:
+    """1차 검색용으로 줄인 벡터 (코드 행렬 + 근사 cosine 계산)"""
+
+    def __init__(self, storage: str, dim: int, codes: np.ndarray, scale: Optional[np.ndarray] = None):
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"지원하지 않는 저장 형식: {storage} ({', '.join(STORAGE_TYPES)})")
+        self.storage = storage
+        self.dim = dim
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def encode(cls, embeddings: np.ndarray, storage: str, dim: Optional[int] = None) -> 'QuantizedVectors':
+        """L2 정규화된 float32 행렬 → storage 형식 (dim 이 작으면 먼저 Matryoshka 축소)"""
+        dim = min(dim or embeddings.shape[1], embeddings.shape[1])
+        n = len(embeddings)
+        width = (dim + 7) // 8 if storage == 'binary' else dim
+        codes = np.empty((n, width), dtype=_DTYPES[storage])
+        scale = None
+        if storage == 'int8':
+            # 차원별 최대 절댓값을 127 로 (블록 단위로 먼저 구함)
+            peak = np.zeros(dim, dtype=np.float32)
+            for start in range(0, n, NORMALIZE_BLOCK_ROWS):
+                block = truncate_dims(embeddings[start:start + NORMALIZE_BLOCK_ROWS], dim)
+                np.maximum(peak, np.abs(block).max(axis=0), out=peak)
+            scale = np.where(peak > 0, peak / INT8_MAX, 1.0).astype(np.float32)
+
+        for start in range(0, n, NORMALIZE_BLOCK_ROWS):
+            block = truncate_dims(embeddings[start:start + NORMALIZE_BLOCK_ROWS], dim)
+            end = start + len(block)
+            if storage == 'int8':
+                codes[start:end] = np.clip(np.rint(block / scale), -INT8_MAX, INT8_MAX)
+            elif storage == 'binary':
+                codes[start:end] = np.packbits(block > 0, axis=1)
+            else:
+                codes[start:end] = block
+        return cls(storage, dim, codes, scale)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0))
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        질문 [Q, dim(full)] 과 모든 행의 근사 cosine [Q, N]
+
+        질문은 양자화하지 않고 (binary 제외) float32 그대로 계산합니다 (asymmetric).
+        binary 는 hamming 거리 h 를 cos(pi * h / dim) 으로 바꿔 similarity 와 같은 범위로 맞춥니다.
+        """
+        queries = truncate_dims(queries, self.dim)
+        n = len(self.codes)
+        result = np.empty((len(queries), n), dtype=np.float32)
+        if self.storage == 'binary':
+            query_bits = np.packbits(queries > 0, axis=1)
+            for i, bits in enumerate(query_bits):
+                hamming = _POPCOUNT[np.bitwise_xor(self.codes, bits)].sum(axis=1)
+                result[i] = np.cos(np.pi * hamming / self.dim)
+            return result
+
+        weights = queries * self.scale if self.storage == 'int8' else queries
+        for start in range(0, n, NORMALIZE_BLOCK_ROWS):
+            block = np.asarray(self.codes[start:start + NORMALIZE_BLOCK_ROWS], dtype=np.float32)
+            result[:, start:start + len(block)] = weights @ block.T
+        return result
+
+    def save(self, path: Path, fingerprint: str = '') -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {'codes': self.codes, 'storage': np.array(self.storage), 'dim': np.array(self.dim),
+                  'fingerprint': np.array(fingerprint)}
+        if self.scale is not None:
+            arrays['scale'] = self.scale
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def from_arrays(cls, data: Dict[str, np.ndarray]) -> 'QuantizedVectors':
+        return cls(str(data['storage']), int(data['dim']), data['codes'], data.get('scale'))
+
+
+def quantized_path(artifact_dir: Path, storage: str, dim: int) -> Path:
+    return Path(artifact_dir) / QUANTIZED_DIR / f"{storage}-{dim}.npz"
+
+
+def load_quantized(artifact_dir: Path, storage: str, dim: Optional[int] = None,
+                   artifact: Optional[EmbeddingArtifact] = None) -> QuantizedVectors:
+    """artifact 에 저장된 양자화 벡터를 읽고, 없거나 artifact 가 바뀌었으면 만들어서 저장"""
+    if artifact is None:
+        artifact = EmbeddingArtifact(artifact_dir)
+    dim = min(dim or artifact.dim, artifact.dim)
+    if storage == 'float32' and dim == artifact.dim:
+        return QuantizedVectors(storage, dim, artifact.embeddings)   # 원본 그대로
+    path = quantized_path(artifact_dir, storage, dim)
+    data = load_derived(path, artifact.fingerprint)
+    if data is not None:
+        return QuantizedVectors.from_arrays(data)
+    quantized = QuantizedVectors.encode(artifact.embeddings, storage, dim)
+    quantized.save(path, artifact.fingerprint)
+    return quantized
+
+
+def write_quantized(artifact_dir: Path, storages: Sequence[str], dims: Sequence[int] = ()) -> List[Path]:
+    """ETL 이 artifact 를 쓴 뒤 호출: storage x dim 조합마다 quantized/<형식>-<차원>.npz 저장"""
+    artifact = EmbeddingArtifact(artifact_dir)
+    paths = []
+    for storage in storages:
+        for dim in dims or [artifact.dim]:
+            dim = min(dim, artifact.dim)
+            quantized = QuantizedVectors.encode(artifact.embeddings, storage, dim)
+            paths.append(quantized.save(quantized_path(artifact_dir, storage, dim), artifact.fingerprint))
+            logger.info(f"✓ 양자화 벡터 저장: {paths[-1]} ({storage}, {dim}차원, "
+                        f"{quantized.nbytes / 2**20:.2f} MiB)")
+    return paths
+
+
+class QuantizedIndex(VectorIndex):
+    """양자화/축소 벡터로 후보를 고르고 float32 벡터로 재정렬"""
+
+    def __init__(self, embeddings: np.ndarray, rows: Sequence[Dict], quantized: QuantizedVectors,
+                 rerank_factor: int = DEFAULT_RERANK_FACTOR, rerank: bool = True):
+        """
+        Args:
+            embeddings: full precision float32 행렬 (rerank 용, memmap 이면 후보 행만 읽음)
+            quantized: 1차 검색용 벡터
+            rerank_factor: 1차 검색 후보 수 = match_count x rerank_factor
+            rerank: False 면 1차 검색의 근사 similarity 그대로 반환
+        """
+        super().__init__(embeddings, rows)
+        self.quantized = quantized
+        self.rerank_factor = max(1, rerank_factor)
+        self.rerank = rerank
+
+    @classmethod
+    def from_artifact(cls, artifact_dir: Path, storage: str = 'int8', dim: Optional[int] = None,
+                      rerank_factor: int = DEFAULT_RERANK_FACTOR, rerank: bool = True) -> 'QuantizedIndex':
+        artifact = EmbeddingArtifact(artifact_dir)
+        quantized = load_quantized(artifact_dir, storage, dim, artifact)
+        return cls(artifact.embeddings, artifact.rows, quantized, rerank_factor, rerank)
+
+    def search_batch(self, queries, match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+                     match_count: int = DEFAULT_MATCH_COUNT) -> List[List[SearchResult]]:
+        query_matrix = _as_query_matrix(queries)
+        approx = self.quantized.scores(query_matrix)
+        if not self.rerank:
+            return [[self._result(i, row_scores[i]) for i in indices]
+                    for row_scores, indices in zip(approx, _top_k(approx, match_count, match_threshold))]
+
+        results: List[List[SearchResult]] = []
+        for query, candidates in zip(query_matrix, _top_k(approx, match_count * self.rerank_factor, -np.inf)):
+            candidates = np.sort(candidates)     # memmap 을 순서대로 읽도록
+            scores = (np.asarray(self.embeddings[candidates]) @ query)[np.newaxis, :]
+            top = _top_k(scores, match_count, match_threshold)[0]
+            results.append([self._result(candidates[i], scores[0, i]) for i in top])
+        return results
+
+
+def _overlap(found: Sequence[SearchResult], expected: Sequence[SearchResult], k: int) -> float:
+    expected_ids = {m.id for m in expected[:k]}
+    if not expected_ids:
+        return 1.0
+    return len(expected_ids.intersection(m.id for m in found[:k])) / len(expected_ids)
+
+
+def tradeoff_report(artifact_dir: Path, query_vectors: np.ndarray, golden: Optional[Dict] = None,
+                    dims: Sequence[int] = (), storages: Sequence[str] = STORAGE_TYPES,
+                    rerank_factor: int = DEFAULT_RERANK_FACTOR, k: int = DEFAULT_MATCH_COUNT,
+                    repeat: int = 3) -> Dict:
+    """
+    차원 x 저장 형식 x rerank 조합마다 recall 과 메모리 측정
+
+    - overlap@k: full precision (float32, 원래 차원) 전수 검색 top-k 중 찾은 비율
+    - golden: golden set 기대 rule 기준 recall@k / MRR (tennis_rag.bench 와 같은 계산)
+    - index_bytes: 1차 검색 벡터 크기 (메모리에 올려야 하는 부분).
+      rerank 는 float32 벡터가 디스크(memmap / 테이블)에 있어야 하며 후보 행만 읽습니다.
+    순위만 비교하므로 match_threshold 는 적용하지 않습니다.
+    """
+    from .bench import percentile, rule_key, score_question, summarize
+
+    artifact = EmbeddingArtifact(artifact_dir)
+    full_dim = artifact.dim
+    exact = VectorIndex(artifact.embeddings, artifact.rows)
+    baseline = exact.search_batch(query_vectors, -1.0, k)
+    keys = [rule_key(row['rule_id']) for row in artifact.rows]
+
+    settings = []
+    for dim in sorted(set(min(d, full_dim) for d in (dims or MATRYOSHKA_DIMS))):
+        for storage in storages:
+            quantized = load_quantized(artifact_dir, storage, dim, artifact)
+            exact_setting = storage == 'float32' and dim == full_dim
+            for rerank in ((False,) if exact_setting else (False, True)):
+                index = QuantizedIndex(artifact.embeddings, artifact.rows, quantized, rerank_factor, rerank)
+                latencies = []
+                for _ in range(repeat):
+                    for vector in query_vectors:
+                        started = time.perf_counter()
+                        index.search(vector, -1.0, k)
+                        latencies.append((time.perf_counter() - started) * 1000)
+                found = index.search_batch(query_vectors, -1.0, k)
+
+                setting = {
+                    'dim': dim,
+                    'storage': storage,
+                    'rerank': rerank,
+                    'bytes_per_vector': bytes_per_vector(storage, dim),
+                    'index_bytes': quantized.nbytes,
+                    'memory_ratio': round(quantized.nbytes / (4 * full_dim * max(1, len(artifact))), 4),
+                    f"overlap@{k}": round(float(np.mean([_overlap(f, b, k) for f, b in zip(found, baseline)])), 4),
+                    'latency_ms_p50': round(percentile(latencies, 50), 4),
+                }
+                if golden is not None:
+                    scores = [score_question(item['expected'], [keys[m.id] for m in matches], (1, k))
+                              for item, matches in zip(golden['questions'], found)]
+                    setting['golden'] = summarize(scores, (1, k))
+                settings.append(setting)
+
+    return {
+        'artifact': str(artifact_dir),
+        'model': artifact.model,
+        'chunks': len(artifact),
+        'full_dim': full_dim,
+        'k': k,
+        'rerank_factor': rerank_factor,
+        'settings': settings,
+    }
+
+
+def print_tradeoff(report: Dict) -> None:
+    k = report['k']
+    print(f"\n📐 {report['artifact']} ({report['model']}, {report['chunks']} chunks, {report['full_dim']}차원)")
+    print(f"   {'dim':>4} {'storage':<8} {'rerank':<6} {'B/vec':>6} {'index':>10} {'mem':>6} "
+          f"{f'overlap@{k}':>11} {f'recall@{k}':>9} {'MRR':>6} {'p50 ms':>8}")
+    for s in report['settings']:
+        golden = s.get('golden', {})
+        recall = f"{golden[f'recall@{k}']:.3f}" if golden else '-'
+        mrr = f"{golden['mrr']:.3f}" if golden else '-'
+        print(f"   {s['dim']:>4} {s['storage']:<8} {'yes' if s['rerank'] else 'no':<6} "
+              f"{s['bytes_per_vector']:>6} {s['index_bytes'] / 2**10:>8.1f}KB {s['memory_ratio']:>6.1%} "
+              f"{s[f'overlap@{k}']:>11.3f} {recall:>9} {mrr:>6} {s['latency_ms_p50']:>8.3f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .bench import DEFAULT_GOLDEN_SET, golden_query_vectors, load_golden_set
+
+    parser = argparse.ArgumentParser(description='Recall vs memory report for quantized embeddings')
+    parser.add_argument('--artifact', required=True, help='full precision embedding artifact 디렉토리')
+    parser.add_argument('--dims', type=int, action='append',
+                        help=f'Matryoshka 차원 (여러 번 지정 가능, 기본값: {" ".join(map(str, MATRYOSHKA_DIMS))})')
+    parser.add_argument('--storage', action='append', choices=STORAGE_TYPES,
+                        help='저장 형식 (여러 번 지정 가능, 기본값: 전부)')
+    parser.add_argument('--rerank-factor', type=int, default=DEFAULT_RERANK_FACTOR,
+                        help=f'1차 검색 후보 수 = k x rerank_factor (기본값: {DEFAULT_RERANK_FACTOR})')
+    parser.add_argument('--k', type=int, default=DEFAULT_MATCH_COUNT)
+    parser.add_argument('--golden-set', default=str(DEFAULT_GOLDEN_SET), help='질문으로 쓸 golden set JSON')
+    parser.add_argument('--query-vectors', help='golden set 대신 쓸 질문 임베딩 .npy (golden 지표 없음)')
+    parser.add_argument('--online', action='store_true',
+                        help='캐시에 없는 질문은 artifact 를 만든 provider 로 임베딩')
+    parser.add_argument('--output', default='quantize_report.json', help='결과 JSON 경로')
+    add_cache_arguments(parser)
+    add_provider_arguments(parser, default=None)
+    args = parser.parse_args(argv)
+
+    artifact_dir = Path(args.artifact)
+    golden = None
+    if args.query_vectors:
+        query_vectors = np.load(args.query_vectors)
+    else:
+        golden = load_golden_set(Path(args.golden_set))
+        cache = cache_from_args(args)
+        try:
+            query_vectors = golden_query_vectors(artifact_dir, [q['question'] for q in golden['questions']],
+                                                 args, cache)
+        except RuntimeError as e:
+            logger.error(f"❌ {e}")
+            return 1
+        finally:
+            cache.close()
+
+    report = tradeoff_report(artifact_dir, query_vectors, golden, args.dims or (),
+                             args.storage or STORAGE_TYPES, args.rerank_factor, args.k)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print_tradeoff(report)
+    print(f"\n✓ 결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
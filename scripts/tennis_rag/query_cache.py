@@ -0,0 +1,341 @@
+"""
+Query Cache Builder
+-------------------
+자주 묻는 질문의 질문 임베딩과 검색 결과를 한 번에 미리 계산해
+tennis_rules_query_cache 테이블에 저장합니다 (마이그레이션 20261017_create_tennis_rules_query_cache.sql).
+
+tennis-rag-query edge function 은 정규화한 질문이 캐시에 있으면 Gemini 임베딩 호출과
+match_tennis_rules 검색을 건너뛰고, 같은 모델로 만든 답변이 있으면 답변 생성도 건너뜁니다.
+
+- 질문 정규화: NFKC → 소문자 → 문장부호 제거 → 공백 정리 (edge function 의 normalizeQuestion 과 동일)
+- 입력: 질문 목록 (한 줄에 하나) 또는 과거 질문 로그 (JSONL 의 "question" 필드)
+  → 정규화한 질문별 빈도를 세고 가장 많이 쓰인 원문을 대표로 사용
+- 임베딩: edge function 과 같은 모델 / task_type(retrieval_query) / 차원, batch 요청 + 임베딩 캐시
+- 검색: 질문 언어의 rulebook 만 (Supabase match_tennis_rules_by_language 기본, 또는 --artifact 의 로컬 인덱스)
+- 출력: Supabase 테이블을 통째로 교체하거나, --output-sql 로 SQL 파일 작성
+
+tennis_rules 가 바뀌면 DB trigger 가 캐시를 비우므로, ETL 을 실행한 뒤 다시 빌드하세요.
+
+사용법:
+    python -m tennis_rag.query_cache --questions faq.txt
+    python -m tennis_rag.query_cache --log question_log.jsonl --min-count 3 --top 200
+    python -m tennis_rag.query_cache --questions faq.txt --artifact ../insert_rules.artifact --output-sql query_cache.sql
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .embedding_cache import add_cache_arguments, cache_from_args
+from .embedding_client import EmbeddingClient, add_rate_limit_arguments, limiter_from_args
+from .pipeline import batched
+from .providers import add_provider_arguments, embed_fn_from_args, provider_for_model
+from .search import DEFAULT_MATCH_THRESHOLD, embed_queries
+from .sql_export import format_vector, sql_quote
+
+logger = logging.getLogger(__name__)
+
+CACHE_TABLE = 'tennis_rules_query_cache'
+QUERY_MODEL = 'models/gemini-embedding-001'     # tennis-rag-query edge function 과 같은 모델
+QUERY_DIM = 768
+DEFAULT_CACHE_MATCH_COUNT = 10
+UPLOAD_BATCH_SIZE = 100
+
+_PUNCTUATION = re.compile(r'[\W_]+')
+_HANGUL = re.compile(r'[ㄱ-ㅎㅏ-ㅣ가-힣]')
+
+
+def normalize_question(text: str) -> str:
+    """캐시 key (edge function 의 normalizeQuestion 과 같은 규칙)"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    return _PUNCTUATION.sub(' ', text).strip()
+
+
+def detect_language(text: str) -> str:
+    return 'ko' if _HANGUL.search(text) else 'en'
+
+
+def read_questions(paths: Iterable[Path]) -> Iterator[str]:
+    """질문 파일 읽기 (.jsonl 은 줄마다 {"question": ...}, 그 외는 한 줄에 질문 하나, # 주석)"""
+    for path in paths:
+        path = Path(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or (path.suffix != '.jsonl' and line.startswith('#')):
+                    continue
+                if path.suffix == '.jsonl':
+                    try:
+                        line = json.loads(line).get('question') or ''
+                    except (ValueError, AttributeError):
+                        logger.warning(f"⚠️  질문 로그 줄을 읽지 못함: {line[:80]}")
+                        continue
+                if line.strip():
+                    yield line.strip()
+
+
+def collect_questions(questions: Iterable[str], min_count: int = 1,
+                      top: Optional[int] = None) -> List[Dict]:
+    """정규화한 질문별로 묶어 빈도순으로 정렬 (대표 원문은 가장 많이 쓰인 형태)"""
+    forms: Dict[str, Counter] = {}
+    for question in questions:
+        key = normalize_question(question)
+        if key:
+            forms.setdefault(key, Counter())[question] += 1
+
+    entries = []
+    for key, counter in forms.items():
+        frequency = sum(counter.values())
+        if frequency < min_count:
+            continue
+        question = counter.most_common(1)[0][0]
+        entries.append({
+            'normalized_question': key,
+            'question': question,
+            'language': detect_language(question),
+            'frequency': frequency,
+        })
+    entries.sort(key=lambda e: (-e['frequency'], e['normalized_question']))
+    return entries[:top] if top else entries
+
+
+def corpus_version(chunk_hashes: Iterable[str]) -> str:
+    """tennis_rules 내용 식별자 (정렬한 chunk_hash 목록의 SHA-256)"""
+    digest = hashlib.sha256()
+    for value in sorted(h for h in chunk_hashes if h):
+        digest.update(value.encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+
+class ArtifactRetriever:
+    """embedding artifact 의 전수 검색 (오프라인)"""
+
+    def __init__(self, artifact_dir: Path):
+        from .artifact import EmbeddingArtifact
+        from .search import VectorIndex
+
+        artifact = EmbeddingArtifact(artifact_dir)
+        self.model = artifact.model
+        self.dim = artifact.dim
+        self.index = VectorIndex(artifact.embeddings, artifact.rows)
+        self.version = corpus_version(row['chunk_hash'] for row in artifact.rows)
+
+        # 언어별 부분 인덱스 (match_tennis_rules_by_language 와 같은 검색 범위)
+        positions: Dict[str, List[int]] = {}
+        for i, row in enumerate(artifact.rows):
+            if row.get('language'):
+                positions.setdefault(row['language'], []).append(i)
+        self.indexes = {
+            language: VectorIndex(artifact.embeddings[indices], [artifact.rows[i] for i in indices])
+            for language, indices in positions.items()
+        }
+
+    def search(self, vectors, match_threshold: float, match_count: int,
+               languages: Optional[Sequence[Optional[str]]] = None) -> List[List[Dict]]:
+        languages = list(languages) if languages is not None else [None] * len(vectors)
+        results: List[List[Dict]] = [[] for _ in languages]
+        for language in set(languages):
+            positions = [i for i, value in enumerate(languages) if value == language]
+            index = self.indexes.get(language, self.index)
+            batch = index.search_batch([vectors[i] for i in positions], match_threshold, match_count)
+            for i, matches in zip(positions, batch):
+                found_index = index
+                if not matches and index is not self.index:
+                    # edge function 처럼 언어 결과가 없으면 전체 검색
+                    found_index = self.index
+                    matches = self.index.search(vectors[i], match_threshold, match_count)
+                results[i] = [
+                    {'chunk_hash': found_index.rows[m.id]['chunk_hash'], 'rule_id': m.rule_id,
+                     'source_file': m.source_file, 'similarity': round(m.similarity, 6)}
+                    for m in matches
+                ]
+        return results
+
+
+class SupabaseRetriever:
+    """운영 DB 의 match_tennis_rules_by_language (edge function 과 같은 검색)"""
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.model = QUERY_MODEL
+        self.dim = QUERY_DIM
+        hashes = []
+        offset = 0
+        while True:
+            page = (self.supabase.table('tennis_rules').select('chunk_hash')
+                    .order('id').range(offset, offset + 999).execute().data)
+            hashes.extend(row['chunk_hash'] for row in page)
+            if len(page) < 1000:
+                break
+            offset += 1000
+        self.version = corpus_version(hashes)
+
+    def search(self, vectors, match_threshold: float, match_count: int,
+               languages: Optional[Sequence[Optional[str]]] = None) -> List[List[Dict]]:
+        results = []
+        languages = list(languages) if languages is not None else [None] * len(vectors)
+        for vector, language in zip(vectors, languages):
+            params = {
+                'query_embedding': [float(v) for v in vector],
+                'match_threshold': match_threshold,
+                'match_count': match_count,
+            }
+            matches = self.supabase.rpc('match_tennis_rules_by_language',
+                                        dict(params, filter_language=language)).execute().data or []
+            if not matches and language:
+                # edge function 처럼 언어 결과가 없으면 전체 검색
+                matches = self.supabase.rpc('match_tennis_rules', params).execute().data or []
+            ids = [m['id'] for m in matches]
+            hashes = {}
+            if ids:
+                rows = self.supabase.table('tennis_rules').select('id,chunk_hash').in_('id', ids).execute().data
+                hashes = {row['id']: row['chunk_hash'] for row in rows}
+            results.append([
+                {'chunk_hash': hashes.get(m['id']), 'rule_id': m['rule_id'],
+                 'source_file': m['source_file'], 'similarity': round(m['similarity'], 6)}
+                for m in matches
+            ])
+        return results
+
+
+def build_cache_rows(entries: Sequence[Dict], client: EmbeddingClient, retriever,
+                     match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+                     match_count: int = DEFAULT_CACHE_MATCH_COUNT) -> List[Dict]:
+    """질문 임베딩 (batch) → 검색 → tennis_rules_query_cache 행"""
+    if not entries:
+        return []
+    vectors = embed_queries([e['question'] for e in entries], client)
+    results = retriever.search(vectors, match_threshold, match_count, [e['language'] for e in entries])
+    return [
+        dict(entry, embedding=vector, results=found, match_threshold=match_threshold,
+             match_count=match_count, corpus_version=retriever.version)
+        for entry, vector, found in zip(entries, vectors, results)
+    ]
+
+
+def _row_values(row: Dict) -> str:
+    return (
+        f"({sql_quote(row['normalized_question'])}, {sql_quote(row['question'])}, "
+        f"{sql_quote(row['language'])}, {row['frequency']}, '{format_vector(row['embedding'])}'::vector, "
+        f"{sql_quote(json.dumps(row['results'], ensure_ascii=False))}::jsonb, "
+        f"{row['match_threshold']}, {row['match_count']}, {sql_quote(row['corpus_version'])})"
+    )
+
+
+def write_cache_sql(rows: Sequence[Dict], f) -> int:
+    """캐시 전체를 한 transaction 으로 교체하는 SQL"""
+    columns = ('normalized_question', 'question', 'language', 'frequency', 'embedding',
+               'results', 'match_threshold', 'match_count', 'corpus_version')
+    f.write("BEGIN;\n")
+    f.write(f"DELETE FROM {CACHE_TABLE};\n")
+    for group in batched(rows, UPLOAD_BATCH_SIZE):
+        values = ',\n'.join(_row_values(row) for row in group)
+        f.write(f"INSERT INTO {CACHE_TABLE} ({', '.join(columns)}) VALUES\n{values};\n")
+    f.write("COMMIT;\n")
+    return len(rows)
+
+
+def upload_cache(supabase, rows: Sequence[Dict]) -> int:
+    """Supabase 의 캐시 테이블을 통째로 교체"""
+    supabase.table(CACHE_TABLE).delete().neq('normalized_question', '').execute()
+    for group in batched(rows, UPLOAD_BATCH_SIZE):
+        records = [dict(row, embedding=[float(v) for v in row['embedding']]) for row in group]
+        supabase.table(CACHE_TABLE).upsert(records, on_conflict='normalized_question').execute()
+    return len(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Build the precomputed query cache for frequent questions')
+    parser.add_argument('--questions', action='append', default=[],
+                        help='질문 목록 파일 (한 줄에 하나, 여러 번 지정 가능)')
+    parser.add_argument('--log', action='append', default=[],
+                        help='과거 질문 로그 (.jsonl 의 "question" 필드 또는 한 줄에 하나)')
+    parser.add_argument('--min-count', type=int, default=1, help='로그에서 이 횟수 이상 나온 질문만 캐시')
+    parser.add_argument('--top', type=int, help='빈도 상위 N개 질문만 캐시')
+    parser.add_argument('--match-threshold', type=float, default=DEFAULT_MATCH_THRESHOLD)
+    parser.add_argument('--match-count', type=int, default=DEFAULT_CACHE_MATCH_COUNT,
+                        help=f'질문별로 저장할 검색 결과 수 (기본값: {DEFAULT_CACHE_MATCH_COUNT}, '
+                             'edge function 요청의 match_count 가 이보다 크면 캐시를 쓰지 않음)')
+    parser.add_argument('--artifact', help='Supabase 대신 검색할 embedding artifact (오프라인)')
+    parser.add_argument('--output-sql', help='Supabase 에 쓰지 않고 캐시 교체 SQL 파일로 저장')
+    parser.add_argument('--supabase-url', help='Supabase URL (또는 환경변수 SUPABASE_URL)')
+    parser.add_argument('--supabase-key', help='Supabase Service Role Key (또는 환경변수 SUPABASE_SERVICE_KEY)')
+    add_provider_arguments(parser, default=None)
+    add_cache_arguments(parser)
+    add_rate_limit_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not (args.questions or args.log):
+        parser.error('--questions 또는 --log 가 필요합니다')
+    # --questions 는 빈도와 상관없이 모두 캐시, --log 는 --min-count 이상만
+    entries = {e['normalized_question']: e for e in collect_questions(read_questions(args.log),
+                                                                       min_count=args.min_count)}
+    for entry in collect_questions(read_questions(args.questions)):
+        if entry['normalized_question'] in entries:
+            entries[entry['normalized_question']]['frequency'] += entry['frequency']
+        else:
+            entries[entry['normalized_question']] = entry
+    entries = sorted(entries.values(), key=lambda e: (-e['frequency'], e['normalized_question']))
+    entries = entries[:args.top] if args.top else entries
+    logger.info(f"✓ 캐시할 질문 {len(entries)}개 (정규화 후)")
+
+    supabase = None
+    if not (args.artifact and args.output_sql):
+        from dotenv import load_dotenv
+        from supabase import create_client
+
+        load_dotenv()
+        url = args.supabase_url or os.getenv('SUPABASE_URL')
+        key = args.supabase_key or os.getenv('SUPABASE_SERVICE_KEY')
+        if not (url and key):
+            logger.error("❌ SUPABASE_URL / SUPABASE_SERVICE_KEY 가 필요합니다 (--artifact 와 --output-sql 을 함께 주면 불필요)")
+            return 1
+        supabase = create_client(url, key)
+
+    retriever = ArtifactRetriever(Path(args.artifact)) if args.artifact else SupabaseRetriever(supabase)
+    # 질문은 검색 대상과 같은 provider / 모델 / 차원으로 임베딩해야 같은 벡터 공간이 됨
+    provider = args.embedding_provider or provider_for_model(retriever.model)
+    if provider != provider_for_model(retriever.model):
+        logger.warning(f"⚠️  --embedding-provider {provider} 가 검색 대상 모델({retriever.model})과 다릅니다")
+
+    cache = cache_from_args(args)
+    client = EmbeddingClient(
+        model=retriever.model,
+        task_type='retrieval_query',
+        output_dimensionality=retriever.dim,
+        cache=cache,
+        limiter=limiter_from_args(args),
+        batch_size=args.batch_size,
+        embed_fn=embed_fn_from_args(args, provider=provider),
+        concurrency=args.concurrency,
+    )
+    try:
+        rows = build_cache_rows(entries, client, retriever, args.match_threshold, args.match_count)
+    except RuntimeError as e:
+        logger.error(f"❌ {e}")
+        return 1
+    finally:
+        cache.close()
+    client.log_stats()
+
+    if args.output_sql:
+        with open(args.output_sql, 'w', encoding='utf-8') as f:
+            written = write_cache_sql(rows, f)
+        logger.info(f"✓ 캐시 SQL 저장: {args.output_sql} ({written}개 질문)")
+    else:
+        written = upload_cache(supabase, rows)
+        logger.info(f"✓ {CACHE_TABLE} 교체 완료: {written}개 질문 (corpus {retriever.version[:12]})")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
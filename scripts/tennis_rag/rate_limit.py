@@ -0,0 +1,131 @@
+"""
+Rate Limiter
+------------
+Gemini 임베딩 API 의 분당 요청 수(RPM)와 분당 토큰 수(TPM) 제한을 지키기 위한
+token bucket 구현입니다. 고정 sleep 대신 남은 예산만큼 바로 요청을 보내고,
+예산이 바닥났을 때만 필요한 시간만큼 기다립니다.
+"""
+
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """분당 rate 만큼 채워지는 token bucket (스레드 안전)"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            per_minute: 분당 충전량 (예: RPM 또는 TPM)
+            capacity: 최대 누적량 (기본값: per_minute, 즉 1분치 burst 허용)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill_locked(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """amount 만큼 예약하고, 사용 가능해질 때까지 기다려야 할 초를 반환"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill_locked(now)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def drain(self) -> None:
+        """남은 토큰을 비움 (서버가 429 를 돌려준 경우 예산을 0 으로 맞춤)"""
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class RateLimiter:
+    """RPM / TPM 두 개의 token bucket 과 Retry-After 일시정지를 함께 관리"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self, token_count: int) -> None:
+        """요청 1건 + token_count 토큰을 사용할 수 있을 때까지 대기"""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(token_count))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+            if wait > 0:
+                self.waited_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Retry-After 동안 모든 요청을 멈춤"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.requests.drain()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    임베딩 입력 토큰 수 추정치
+
+    영문은 약 4글자당 1토큰, 한글 등 비 ASCII 문자는 글자당 약 1토큰으로 계산합니다.
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return max(1, (len(text) - non_ascii) // 4 + non_ascii)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """지수 backoff + full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_RETRY_PATTERNS = (
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)'),
+    re.compile(r'[Rr]etry in\s+([\d.]+)\s*s'),
+    re.compile(r'"retryDelay":\s*"([\d.]+)s"'),
+)
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """예외에서 서버가 지정한 재시도 대기 시간(Retry-After)을 추출"""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    message = str(exc)
+    for pattern in _RETRY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    message = str(exc)
+    return '429' in message or 'Resource exhausted' in message or 'RESOURCE_EXHAUSTED' in message
+
+
+def is_transient_error(exc: Exception) -> bool:
+    message = str(exc)
+    return any(code in message for code in ('500', '502', '503', '504', 'UNAVAILABLE', 'Deadline'))
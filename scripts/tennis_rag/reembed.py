@@ -0,0 +1,428 @@
+"""
+Blue/Green Re-embedding
+-----------------------
+임베딩 모델이나 차원을 바꿀 때 운영 데이터를 지우고 다시 적재하지 않고,
+그림자 컬럼(embedding_next)을 채운 뒤 검증을 통과하면 한 번에 교체합니다
+(마이그레이션 20261017_add_tennis_rules_reembedding.sql).
+
+1. prepare:  embedding_next VECTOR(dim) 컬럼 추가 (카탈로그만 변경, 검색 영향 없음)
+2. backfill: embedding_next 가 비어 있는 행을 id 순서(keyset)로 page 단위로 읽어 새 모델로 동시 임베딩,
+             이전 page 의 DB 갱신과 다음 page 의 임베딩을 겹쳐서 실행. 진행률 / 처리량 / ETA 를 계속 출력
+             중단되면 다시 실행할 때 남은 행부터 이어감 (실행 중 새로 적재된 행도 포함)
+3. index:    embedding_next HNSW 인덱스 생성
+4. validate: (a) sample 행 벡터로 HNSW 결과와 전수 검색 결과를 비교한 recall@k
+             (b) golden set recall@k: 현재 컬럼(현재 모델) vs 새 컬럼(새 모델)
+5. swap:     --swap 이면 검증 통과 시 한 transaction 에서 컬럼 / 인덱스 이름 교체.
+             match_tennis_rules 는 바로 새 벡터를 읽고, 이전 벡터는 embedding_previous 로 남음
+             (--rollback 으로 되돌리기, --drop-previous 로 삭제)
+             교체 / 되돌리기 후 언어별 partial HNSW 인덱스는 새 컬럼으로 다시 생성
+
+교체 후에는 ETL(upload / embed)과 edge function 의 질문 임베딩도 새 모델 / 차원을 써야 합니다.
+현재 모델은 tennis_rules_embedding_model 테이블의 'current' 행에 기록됩니다.
+
+사용법:
+    python -m tennis_rag reembed --model models/gemini-embedding-001 --dim 768 --concurrency 4
+    python -m tennis_rag reembed --model models/gemini-embedding-001 --dim 768 --swap
+    python -m tennis_rag reembed --rollback
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .bench import DEFAULT_GOLDEN_SET, load_golden_set, rule_key, score_question, summarize
+from .embedding_cache import add_cache_arguments, cache_from_args
+from .embedding_client import EmbeddingClient, add_rate_limit_arguments, limiter_from_args
+from .index_build import DEFAULT_HNSW_EF_CONSTRUCTION, DEFAULT_HNSW_M
+from .metrics import PipelineMetrics, add_metrics_arguments, profiled
+from .providers import add_provider_arguments, embed_fn_from_args, provider_for_model, provider_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGET_MODEL = 'models/gemini-embedding-001'
+DEFAULT_TARGET_DIM = 768
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_SAMPLE_SIZE = 50
+DEFAULT_RECALL_K = 10
+DEFAULT_MIN_INDEX_RECALL = 0.9
+DEFAULT_MAX_RECALL_DROP = 0.05
+MAX_PASSES = 3
+PROGRESS_INTERVAL = 5.0
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+def parse_vector(value) -> List[float]:
+    """PostgREST 가 문자열('[0.1,...]')로 돌려주는 vector 값"""
+    return json.loads(value) if isinstance(value, str) else list(value)
+
+
+class Progress:
+    """진행률 / 처리량 / ETA 로그 (PROGRESS_INTERVAL 초마다, 끝날 때 한 번)"""
+
+    def __init__(self, total: int, label: str = '재임베딩'):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.failed = 0
+        self._started = time.monotonic()
+        self._logged = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self._started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def update(self, done: int, failed: int = 0) -> None:
+        self.done += done
+        self.failed += failed
+        now = time.monotonic()
+        if now - self._logged >= PROGRESS_INTERVAL:
+            self._logged = now
+            self.log()
+
+    def log(self) -> None:
+        rate = self.rows_per_second
+        remaining = max(self.total - self.done - self.failed, 0)
+        eta = format_duration(remaining / rate) if rate else '?'
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+        logger.info(f"  {self.label}: {self.done:,}/{self.total:,} ({percent:.1f}%), "
+                    f"{rate:.1f} rows/sec, 실패 {self.failed}, ETA {eta}")
+
+
+class ReembeddingJob:
+    """tennis_rules 의 그림자 컬럼을 새 모델로 채우고 검증 / 교체"""
+
+    def __init__(self, supabase, client: EmbeddingClient, page_size: int = DEFAULT_PAGE_SIZE,
+                 metrics: Optional[PipelineMetrics] = None):
+        """
+        Args:
+            supabase: service role key 로 만든 Supabase client
+            client: 새 모델 / 차원 / retrieval_document 로 설정한 임베딩 클라이언트
+            page_size: 한 번에 읽고 갱신할 행 수
+            metrics: 단계별 계측 (None 이면 새로 생성)
+        """
+        self.supabase = supabase
+        self.client = client
+        self.page_size = page_size
+        self.metrics = metrics or PipelineMetrics('reembed')
+
+    def prepare(self, reset: bool = False) -> Tuple[int, int]:
+        """embedding_next 준비 후 (전체 행 수, 남은 행 수)"""
+        rows = self.supabase.rpc('prepare_tennis_rules_reembedding', {
+            'target_model': self.client.model,
+            'target_dim': self.client.output_dimensionality,
+            'reset': reset,
+        }).execute().data
+        return int(rows[0]['total']), int(rows[0]['remaining'])
+
+    def remaining(self) -> int:
+        """embedding_next 가 비어 있는 행 수"""
+        return (self.supabase.table('tennis_rules').select('id', count='exact')
+                .is_('embedding_next', 'null').limit(1).execute().count or 0)
+
+    def iter_pages(self) -> Iterator[List[Dict]]:
+        """embedding_next 가 비어 있는 행 (id 순서 keyset pagination)"""
+        last_id = 0
+        while True:
+            with self.metrics.timed('fetch'):
+                page = (self.supabase.table('tennis_rules').select('id,content')
+                        .is_('embedding_next', 'null').gt('id', last_id)
+                        .order('id').limit(self.page_size).execute().data)
+            if not page:
+                return
+            self.metrics.add('fetch', items=len(page))
+            last_id = page[-1]['id']
+            yield page
+
+    def _write(self, rows: List[Dict]) -> int:
+        with self.metrics.timed('write', items=len(rows)):
+            return self.supabase.rpc('set_tennis_rules_embedding_next', {'rows': rows}).execute().data
+
+    def backfill(self, remaining: int) -> int:
+        """
+        남은 행을 모두 임베딩해 embedding_next 에 기록하고, 그래도 남은 행 수를 반환합니다.
+        실패한 행은 다음 pass 에서 다시 시도합니다 (최대 MAX_PASSES).
+        """
+        for attempt in range(1, MAX_PASSES + 1):
+            if remaining == 0:
+                return 0
+            logger.info(f"🔄 pass {attempt}: {remaining:,}개 행 재임베딩 ({self.client.model}, {self.client.output_dimensionality}차원)")
+            progress = Progress(remaining)
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                pending: Optional[Future] = None
+                for page in self.iter_pages():
+                    texts = [row['content'] for row in page]
+                    with self.metrics.timed('embed', items=len(texts),
+                                            bytes=sum(len(t.encode('utf-8')) for t in texts)):
+                        embeddings = self.client.embed(texts)
+                    rows = [{'id': row['id'], 'embedding': [float(v) for v in embedding]}
+                            for row, embedding in zip(page, embeddings) if embedding is not None]
+                    # 이전 page 의 DB 갱신이 끝나야 다음 갱신 제출 (동시에 최대 1개)
+                    if pending is not None:
+                        pending.result()
+                    pending = writer.submit(self._write, rows) if rows else None
+                    progress.update(len(rows), failed=len(page) - len(rows))
+                if pending is not None:
+                    pending.result()
+            progress.log()
+            self.metrics.add('embed', errors=progress.failed)
+
+            remaining = self.remaining()
+            if progress.done == 0:
+                break
+        return remaining
+
+    def build_index(self, m: int = DEFAULT_HNSW_M, ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION) -> None:
+        logger.info(f"🔨 embedding_next HNSW 인덱스 생성 (m={m}, ef_construction={ef_construction})")
+        with self.metrics.timed('index'):
+            self.supabase.rpc('build_tennis_rules_embedding_next_index',
+                              {'m': m, 'ef_construction': ef_construction}).execute()
+
+    def _search_next(self, vector: Sequence[float], k: int, exact: bool = False) -> List[Dict]:
+        return self.supabase.rpc('match_tennis_rules_next', {
+            'query_embedding': [float(v) for v in vector], 'match_count': k, 'exact': exact,
+        }).execute().data or []
+
+    def index_recall(self, sample_size: int = DEFAULT_SAMPLE_SIZE, k: int = DEFAULT_RECALL_K,
+                     seed: int = 0) -> float:
+        """sample 행 벡터를 질문으로 HNSW 결과와 전수 검색 결과의 평균 overlap@k"""
+        ids = []
+        offset = 0
+        while True:
+            page = (self.supabase.table('tennis_rules').select('id').order('id')
+                    .range(offset, offset + 999).execute().data)
+            ids.extend(row['id'] for row in page)
+            if len(page) < 1000:
+                break
+            offset += 1000
+        sample = random.Random(seed).sample(ids, min(sample_size, len(ids)))
+        if not sample:
+            return 0.0
+
+        rows = (self.supabase.table('tennis_rules').select('id,embedding_next')
+                .in_('id', sample).execute().data)
+        recalls = []
+        with self.metrics.timed('validate', items=len(rows)):
+            for row in rows:
+                vector = parse_vector(row['embedding_next'])
+                approx = {m['id'] for m in self._search_next(vector, k)}
+                exact = {m['id'] for m in self._search_next(vector, k, exact=True)}
+                recalls.append(len(approx & exact) / len(exact) if exact else 1.0)
+        return sum(recalls) / len(recalls)
+
+    def golden_recall(self, golden: Dict, k: int, next_client: EmbeddingClient,
+                      current_client: Optional[EmbeddingClient] = None) -> Dict[str, Dict]:
+        """
+        golden set recall@k / MRR
+        'next': 새 컬럼 (next_client 로 질문 임베딩), 'current': 현재 컬럼 (current_client, 없으면 생략)
+        """
+        questions = [item['question'] for item in golden['questions']]
+        k_values = sorted({1, 3, k})
+
+        def evaluate(client: EmbeddingClient, search) -> Dict:
+            scores = []
+            for item, vector in zip(golden['questions'], client.embed(questions)):
+                if vector is None:
+                    raise RuntimeError(f"질문 임베딩 실패: {item['question']}")
+                ranked = [rule_key(m['rule_id']) for m in search(vector)]
+                scores.append(score_question(item['expected'], ranked, k_values))
+            return summarize(scores, k_values)
+
+        def search_current(vector) -> List[Dict]:
+            return self.supabase.rpc('match_tennis_rules', {
+                'query_embedding': [float(v) for v in vector], 'match_threshold': -1.0, 'match_count': k,
+            }).execute().data or []
+
+        reports = {}
+        with self.metrics.timed('validate', items=len(questions)):
+            reports['next'] = evaluate(next_client, lambda vector: self._search_next(vector, k))
+            if current_client is not None:
+                try:
+                    reports['current'] = evaluate(current_client, search_current)
+                except Exception as e:
+                    logger.warning(f"⚠️  현재 모델({current_client.model}) golden 평가 실패: {e}")
+        return reports
+
+    def swap(self) -> Dict:
+        with self.metrics.timed('swap'):
+            return self.supabase.rpc('swap_tennis_rules_embedding', {}).execute().data[0]
+
+    def build_language_indexes(self, m: int = DEFAULT_HNSW_M,
+                               ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION) -> None:
+        """교체 후 언어별 partial HNSW 인덱스를 새 embedding 컬럼으로 다시 생성"""
+        build_language_indexes(self.supabase, m, ef_construction, self.metrics)
+
+
+def build_language_indexes(supabase, m: int = DEFAULT_HNSW_M,
+                           ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION,
+                           metrics: Optional[PipelineMetrics] = None) -> None:
+    """
+    언어별 partial HNSW 인덱스 (20261017_add_tennis_rules_language.sql) 는 컬럼 이름 교체 때
+    이전 컬럼을 따라가므로, 교체 / 되돌리기 후 현재 embedding 컬럼으로 다시 만듭니다.
+    다시 만드는 동안 언어 필터 검색은 전체 인덱스 / 전수 검색으로 동작합니다.
+    """
+    logger.info(f"🔨 언어별 HNSW 인덱스 재생성 (m={m}, ef_construction={ef_construction})")
+    metrics = metrics or PipelineMetrics('reembed')
+    with metrics.timed('index'):
+        supabase.rpc('build_tennis_rules_language_indexes',
+                     {'m': m, 'ef_construction': ef_construction}).execute()
+
+
+def current_model(supabase) -> Optional[Dict]:
+    """tennis_rules_embedding_model 의 'current' 행 (model, dim)"""
+    rows = (supabase.table('tennis_rules_embedding_model').select('model,dim')
+            .eq('slot', 'current').execute().data)
+    return rows[0] if rows else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Blue/green re-embedding of tennis_rules')
+    parser.add_argument('--model', default=DEFAULT_TARGET_MODEL,
+                        help=f'새 임베딩 모델 (기본값: {DEFAULT_TARGET_MODEL})')
+    parser.add_argument('--dim', type=int, default=DEFAULT_TARGET_DIM,
+                        help=f'새 임베딩 차원 (output_dimensionality, 기본값: {DEFAULT_TARGET_DIM})')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'한 번에 읽고 갱신할 행 수 (기본값: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--reset', action='store_true', help='embedding_next 를 비우고 처음부터 다시 임베딩')
+    parser.add_argument('--hnsw-m', type=int, default=DEFAULT_HNSW_M)
+    parser.add_argument('--hnsw-ef-construction', type=int, default=DEFAULT_HNSW_EF_CONSTRUCTION)
+    parser.add_argument('--skip-index', action='store_true',
+                        help='인덱스를 만들지 않음 (SQL Editor 에서 CREATE INDEX CONCURRENTLY 로 만든 경우)')
+    parser.add_argument('--sample-size', type=int, default=DEFAULT_SAMPLE_SIZE,
+                        help=f'HNSW recall 검증 sample 행 수 (기본값: {DEFAULT_SAMPLE_SIZE})')
+    parser.add_argument('--recall-k', type=int, default=DEFAULT_RECALL_K)
+    parser.add_argument('--min-index-recall', type=float, default=DEFAULT_MIN_INDEX_RECALL,
+                        help=f'HNSW vs 전수 검색 최소 recall@k (기본값: {DEFAULT_MIN_INDEX_RECALL})')
+    parser.add_argument('--golden', default=str(DEFAULT_GOLDEN_SET), help='golden set JSON (tennis_rag.bench 형식)')
+    parser.add_argument('--max-recall-drop', type=float, default=DEFAULT_MAX_RECALL_DROP,
+                        help=f'현재 모델 대비 허용할 golden recall@k 하락폭 (기본값: {DEFAULT_MAX_RECALL_DROP})')
+    parser.add_argument('--swap', action='store_true', help='검증을 통과하면 match_tennis_rules 가 새 컬럼을 읽도록 교체')
+    parser.add_argument('--force', action='store_true', help='검증에 실패해도 --swap 실행')
+    parser.add_argument('--rollback', action='store_true', help='직전 교체를 되돌림 (embedding_previous 로 복귀)')
+    parser.add_argument('--drop-previous', action='store_true', help='교체 후 남은 embedding_previous 컬럼 삭제')
+    parser.add_argument('--supabase-url', help='Supabase URL (또는 환경변수 SUPABASE_URL)')
+    parser.add_argument('--supabase-key', help='Supabase Service Role Key (또는 환경변수 SUPABASE_SERVICE_KEY)')
+    add_provider_arguments(parser, default=None)
+    add_cache_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    url = args.supabase_url or os.getenv('SUPABASE_URL')
+    key = args.supabase_key or os.getenv('SUPABASE_SERVICE_KEY')
+    if not (url and key):
+        logger.error("❌ SUPABASE_URL / SUPABASE_SERVICE_KEY 가 필요합니다")
+        return 1
+    supabase = create_client(url, key)
+
+    if args.rollback:
+        restored = supabase.rpc('rollback_tennis_rules_embedding', {}).execute().data[0]
+        logger.info(f"↩️  이전 임베딩으로 되돌림: {restored['model']} ({restored['dim']}차원)")
+        build_language_indexes(supabase, args.hnsw_m, args.hnsw_ef_construction)
+        return 0
+    if args.drop_previous:
+        supabase.rpc('drop_tennis_rules_embedding_previous', {}).execute()
+        logger.info("✓ embedding_previous 삭제")
+        return 0
+
+    # provider 가 gemini 가 아니면 loader 처럼 "local:models/..." 형식으로 기록
+    provider = args.embedding_provider or provider_for_model(args.model)
+    model = args.model if provider_for_model(args.model) == provider else provider_model(provider, args.model)
+    cache = cache_from_args(args)
+    limiter = limiter_from_args(args)
+    client = EmbeddingClient(
+        model=model,
+        task_type='retrieval_document',
+        output_dimensionality=args.dim,
+        cache=cache,
+        limiter=limiter,
+        batch_size=args.batch_size,
+        embed_fn=embed_fn_from_args(args, provider=provider),
+        concurrency=args.concurrency,
+    )
+    job = ReembeddingJob(supabase, client, page_size=args.page_size)
+
+    try:
+        with profiled(args.profile, args.profile_top, Path(args.metrics_dir), job='reembed'):
+            total, remaining = job.prepare(reset=args.reset)
+            logger.info(f"✓ embedding_next 준비: 전체 {total:,}행, 남은 행 {remaining:,}")
+            remaining = job.backfill(remaining)
+            client.log_stats()
+            if remaining:
+                logger.error(f"❌ {remaining:,}개 행을 임베딩하지 못했습니다. 다시 실행하면 남은 행부터 이어갑니다")
+                return 1
+
+            if not args.skip_index:
+                job.build_index(args.hnsw_m, args.hnsw_ef_construction)
+
+            index_recall = job.index_recall(args.sample_size, args.recall_k)
+            logger.info(f"📏 HNSW recall@{args.recall_k} (전수 검색 대비, sample {args.sample_size}): {index_recall:.3f}")
+            passed = index_recall >= args.min_index_recall
+
+            def query_client(query_model: str, dim: int) -> EmbeddingClient:
+                return EmbeddingClient(
+                    model=query_model, task_type='retrieval_query', output_dimensionality=dim,
+                    cache=cache, limiter=limiter, batch_size=args.batch_size,
+                    embed_fn=embed_fn_from_args(args, provider=provider_for_model(query_model)),
+                    concurrency=args.concurrency,
+                )
+
+            current = current_model(supabase)
+            reports = job.golden_recall(load_golden_set(Path(args.golden)), args.recall_k,
+                                        query_client(model, args.dim),
+                                        query_client(current['model'], current['dim']) if current else None)
+            recall_key = f"recall@{args.recall_k}"
+            for name, report in reports.items():
+                logger.info(f"📏 golden {name:7s}: {recall_key} {report[recall_key]:.3f}, MRR {report['mrr']:.3f}")
+            if 'current' in reports:
+                passed = passed and reports['next'][recall_key] >= reports['current'][recall_key] - args.max_recall_drop
+            else:
+                logger.warning("⚠️  현재 모델 golden recall 이 없어 비교를 건너뜁니다")
+
+            if not args.swap:
+                logger.info("✓ 검증 통과. --swap 으로 교체하세요" if passed else "❌ 검증 실패 (교체하지 않음)")
+                return 0 if passed else 1
+            if not passed and not args.force:
+                logger.error("❌ 검증 실패로 교체하지 않습니다 (--force 로 강제 교체)")
+                return 1
+
+            # 실행 중 새로 적재된 행이 있으면 한 번 더 채운 뒤 교체
+            if job.backfill(job.remaining()):
+                logger.error("❌ 교체 직전 새 행을 임베딩하지 못했습니다")
+                return 1
+            swapped = job.swap()
+            job.build_language_indexes(args.hnsw_m, args.hnsw_ef_construction)
+            logger.info(f"✅ 교체 완료: match_tennis_rules 가 {swapped['model']} ({swapped['dim']}차원) 벡터를 읽습니다")
+            logger.info("   ETL / edge function 의 임베딩 모델도 같은 모델로 맞추세요 (되돌리기: --rollback)")
+    finally:
+        cache.close()
+        job.metrics.log_summary()
+        job.metrics.write(Path(args.metrics_dir))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""
+Offline Vector Search
+---------------------
+ETL artifact (float32 임베딩 행렬)를 memory-map 으로 읽어, Supabase 의
+match_tennis_rules 함수와 같은 의미로 검색합니다.
+
+    similarity = 1 - cosine_distance   (정규화된 벡터이므로 내적)
+    WHERE similarity > match_threshold
+    ORDER BY similarity DESC
+    LIMIT match_count
+
+- VectorIndex: 전수 검색 (행렬곱 + argpartition), 여러 질문을 한 번의 matmul 로 처리
+- IVFIndex:    큰 corpus 용 근사 검색 (spherical k-means 로 나눈 뒤 n_probe 개 리스트만 검색)
+- QuantizedIndex (tennis_rag.quantize): float16 / int8 / binary, Matryoshka 축소 벡터로 1차 검색 후
+  float32 벡터로 rerank
+- --mode lexical / hybrid (tennis_rag.lexical): BM25 역색인 검색, 조항 번호 질문은 임베딩 없이 처리
+
+사용법:
+    python -m tennis_rag.search --artifact insert_rules.artifact --query "타이브레이크 규칙"
+    python -m tennis_rag.search --artifact insert_rules.artifact --query-file questions.txt --ivf
+    python -m tennis_rag.search --artifact insert_rules.artifact --query "let 규칙" --first-pass binary --rerank-factor 8
+    python -m tennis_rag.search --artifact insert_rules.artifact --query "Rule 12" --mode hybrid
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .artifact import IVF_FILE, EmbeddingArtifact, load_derived, normalize_rows
+from .embedding_cache import add_cache_arguments, cache_from_args
+from .lexical import DEFAULT_RRF_K, HybridIndex, LexicalIndex, is_reference_query
+from .providers import add_provider_arguments, embed_fn_from_args, provider_for_model
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MATCH_THRESHOLD = 0.3
+DEFAULT_MATCH_COUNT = 10
+QUERY_BLOCK_ROWS = 1024
+
+
+class SearchResult(NamedTuple):
+    """match_tennis_rules 반환 행과 같은 필드 (id 는 artifact 행 번호)"""
+    id: int
+    source_file: str
+    rule_id: str
+    content: str
+    metadata: Dict
+    similarity: float
+
+
+def _as_query_matrix(queries) -> np.ndarray:
+    matrix = np.array(queries, dtype=np.float32, ndmin=2)
+    return normalize_rows(matrix)
+
+
+def _top_k(scores: np.ndarray, k: int, threshold: float) -> List[np.ndarray]:
+    """행마다 threshold 를 넘는 상위 k 개의 열 번호 (similarity 내림차순)"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return [np.empty(0, dtype=np.int64) for _ in range(scores.shape[0])]
+
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    ranked = np.take_along_axis(part, order, axis=1)
+    ranked_scores = np.take_along_axis(top_scores, order, axis=1)
+    return [idx[s > threshold] for idx, s in zip(ranked, ranked_scores)]
+
+
+class VectorIndex:
+    """전수(exact) 코사인 검색"""
+
+    def __init__(self, embeddings: np.ndarray, rows: Sequence[Dict]):
+        """
+        Args:
+            embeddings: L2 정규화된 float32 [N, dim] 행렬 (memmap 가능)
+            rows: 행별 source_file / rule_id / content / metadata
+        """
+        self.embeddings = embeddings
+        self.rows = rows
+
+    @classmethod
+    def from_artifact(cls, artifact_dir: Path) -> 'VectorIndex':
+        artifact = EmbeddingArtifact(artifact_dir)
+        return cls(artifact.embeddings, artifact.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _result(self, index: int, similarity: float) -> SearchResult:
+        row = self.rows[index]
+        return SearchResult(int(index), row['source_file'], row['rule_id'], row['content'],
+                            row.get('metadata') or {}, float(similarity))
+
+    def search(self, query: Sequence[float], match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+               match_count: int = DEFAULT_MATCH_COUNT) -> List[SearchResult]:
+        return self.search_batch([query], match_threshold, match_count)[0]
+
+    def search_batch(self, queries, match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+                     match_count: int = DEFAULT_MATCH_COUNT) -> List[List[SearchResult]]:
+        """여러 질문을 행렬곱으로 한 번에 검색 (질문 QUERY_BLOCK_ROWS 개 단위)"""
+        query_matrix = _as_query_matrix(queries)
+        results: List[List[SearchResult]] = []
+        for start in range(0, len(query_matrix), QUERY_BLOCK_ROWS):
+            block = query_matrix[start:start + QUERY_BLOCK_ROWS]
+            scores = block @ self.embeddings.T
+            for row_scores, indices in zip(scores, _top_k(scores, match_count, match_threshold)):
+                results.append([self._result(i, row_scores[i]) for i in indices])
+        return results
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file 근사 검색
+
+    spherical k-means 로 벡터를 n_lists 개 리스트로 나누고, 질문과 가장 가까운
+    n_probe 개 리스트의 벡터만 비교합니다. n_probe = n_lists 이면 전수 검색과 같습니다.
+    """
+
+    def __init__(self, embeddings: np.ndarray, rows: Sequence[Dict],
+                 centroids: np.ndarray, assignments: np.ndarray, n_probe: int = 8):
+        super().__init__(embeddings, rows)
+        self.centroids = centroids
+        self.n_probe = n_probe
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(len(centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(centroids))]
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, rows: Sequence[Dict], n_lists: Optional[int] = None,
+              n_iter: int = 15, n_probe: int = 8, seed: int = 0) -> 'IVFIndex':
+        """k-means 로 인덱스 생성 (n_lists 기본값: sqrt(N))"""
+        n = len(embeddings)
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        data = np.asarray(embeddings, dtype=np.float32)
+
+        centroids = data[rng.choice(n, size=n_lists, replace=False)].copy()
+        assignments = np.zeros(n, dtype=np.int64)
+        for _ in range(n_iter):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        return cls(embeddings, rows, centroids, assignments, n_probe)
+
+    def save(self, artifact_dir: Path, fingerprint: str = '') -> Path:
+        path = Path(artifact_dir) / IVF_FILE
+        assignments = np.empty(len(self.embeddings), dtype=np.int64)
+        for list_id, members in enumerate(self.lists):
+            assignments[members] = list_id
+        np.savez(path, centroids=self.centroids, assignments=assignments, fingerprint=np.array(fingerprint))
+        return path
+
+    @classmethod
+    def from_artifact(cls, artifact_dir: Path, n_probe: int = 8,
+                      n_lists: Optional[int] = None) -> 'IVFIndex':
+        """artifact 에 저장된 인덱스를 읽고, 없거나 artifact 가 바뀌었으면 만들어서 저장"""
+        artifact = EmbeddingArtifact(artifact_dir)
+        data = load_derived(Path(artifact_dir) / IVF_FILE, artifact.fingerprint) if n_lists is None else None
+        if data is not None:
+            return cls(artifact.embeddings, artifact.rows, data['centroids'],
+                       data['assignments'], n_probe)
+
+        index = cls.build(artifact.embeddings, artifact.rows, n_lists=n_lists, n_probe=n_probe)
+        index.save(artifact_dir, artifact.fingerprint)
+        return index
+
+    def search_batch(self, queries, match_threshold: float = DEFAULT_MATCH_THRESHOLD,
+                     match_count: int = DEFAULT_MATCH_COUNT) -> List[List[SearchResult]]:
+        query_matrix = _as_query_matrix(queries)
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(query_matrix @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        results: List[List[SearchResult]] = []
+        for query, probe in zip(query_matrix, probes):
+            candidates = np.concatenate([self.lists[i] for i in probe])
+            if len(candidates) == 0:
+                results.append([])
+                continue
+            scores = (self.embeddings[candidates] @ query)[np.newaxis, :]
+            top = _top_k(scores, match_count, match_threshold)[0]
+            results.append([self._result(candidates[i], scores[0, i]) for i in top])
+        return results
+
+
+def load_index(artifact_dir: Path, ivf: bool = False, n_probe: int = 8,
+               first_pass: Optional[str] = None, first_pass_dim: Optional[int] = None,
+               rerank_factor: int = 4, rerank: bool = True) -> VectorIndex:
+    if first_pass:
+        from .quantize import QuantizedIndex
+        return QuantizedIndex.from_artifact(artifact_dir, first_pass, first_pass_dim, rerank_factor, rerank)
+    if ivf:
+        return IVFIndex.from_artifact(artifact_dir, n_probe=n_probe)
+    return VectorIndex.from_artifact(artifact_dir)
+
+
+def query_client(meta: Dict, cache=None, embed_fn=None):
+    """artifact 와 같은 모델/차원으로 질문을 임베딩하는 클라이언트 (task_type=retrieval_query)"""
+    from .embedding_client import EmbeddingClient
+
+    return EmbeddingClient(
+        model=meta['model'],
+        task_type='retrieval_query',
+        output_dimensionality=meta['dim'],
+        cache=cache,
+        embed_fn=embed_fn,
+    )
+
+
+def embed_queries(questions: Sequence[str], client) -> np.ndarray:
+    vectors = client.embed(list(questions))
+    missing = [q for q, v in zip(questions, vectors) if v is None]
+    if missing:
+        raise RuntimeError(f"질문 임베딩 실패: {missing[:3]}")
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline tennis rules vector search')
+    parser.add_argument('--artifact', required=True, help='embedding artifact 디렉토리')
+    parser.add_argument('--query', action='append', default=[], help='검색할 질문 (여러 번 지정 가능)')
+    parser.add_argument('--query-file', help='질문 목록 파일 (한 줄에 하나)')
+    parser.add_argument('--query-vectors', help='미리 계산한 질문 임베딩 .npy (완전 오프라인)')
+    parser.add_argument('--match-threshold', type=float, default=DEFAULT_MATCH_THRESHOLD)
+    parser.add_argument('--match-count', type=int, default=DEFAULT_MATCH_COUNT)
+    parser.add_argument('--ivf', action='store_true', help='IVF 근사 인덱스 사용')
+    parser.add_argument('--n-probe', type=int, default=8, help='IVF 검색 시 확인할 리스트 수')
+    parser.add_argument('--first-pass', choices=('float32', 'float16', 'int8', 'binary'),
+                        help='양자화 벡터로 1차 검색 후 float32 로 rerank (tennis_rag.quantize)')
+    parser.add_argument('--first-pass-dim', type=int, help='1차 검색 Matryoshka 차원 (예: 256, 512)')
+    parser.add_argument('--rerank-factor', type=int, default=4, help='1차 검색 후보 수 = match_count x 이 값')
+    parser.add_argument('--no-rerank', action='store_true', help='1차 검색의 근사 similarity 그대로 출력')
+    parser.add_argument('--mode', choices=('vector', 'lexical', 'hybrid'), default='vector',
+                        help='lexical: BM25 만 (임베딩 없음), hybrid: BM25 + 벡터 RRF (tennis_rag.lexical)')
+    parser.add_argument('--rrf-k', type=int, default=DEFAULT_RRF_K, help='hybrid RRF 상수 k')
+    add_provider_arguments(parser, default=None)
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+
+    questions = list(args.query)
+    if args.query_file:
+        with open(args.query_file, 'r', encoding='utf-8') as f:
+            questions.extend(line.strip() for line in f if line.strip())
+
+    artifact_dir = Path(args.artifact)
+    if args.mode != 'vector' and not questions:
+        parser.error(f'--mode {args.mode} 에는 --query 또는 --query-file 이 필요합니다')
+
+    # lexical 은 임베딩 없음, hybrid 는 조항 번호만 있는 질문("Rule 12", "제5조")의 임베딩을 건너뜀
+    to_embed = [q for q in questions if args.mode == 'vector'
+                or (args.mode == 'hybrid' and not is_reference_query(q))]
+    vectors = None
+    if args.query_vectors:
+        vectors = np.load(args.query_vectors)
+        questions = questions or [f"query {i}" for i in range(len(vectors))]
+    elif to_embed:
+        meta = EmbeddingArtifact(artifact_dir).meta
+        # 질문은 artifact 를 만든 provider 로 임베딩해야 같은 벡터 공간이 됨
+        embed_fn = embed_fn_from_args(args, provider=args.embedding_provider or provider_for_model(meta['model']))
+        cache = cache_from_args(args)
+        embedded = dict(zip(to_embed, embed_queries(to_embed, query_client(meta, cache, embed_fn))))
+        cache.close()
+        vectors = [embedded.get(q) for q in questions] if args.mode == 'hybrid' else np.stack(
+            [embedded[q] for q in questions])
+    elif args.mode == 'vector':
+        parser.error('--query, --query-file 또는 --query-vectors 중 하나가 필요합니다')
+
+    if args.mode == 'vector':
+        index = load_index(artifact_dir, ivf=args.ivf, n_probe=args.n_probe, first_pass=args.first_pass,
+                           first_pass_dim=args.first_pass_dim, rerank_factor=args.rerank_factor,
+                           rerank=not args.no_rerank)
+    else:
+        lexical = LexicalIndex.from_artifact(artifact_dir)
+        index = lexical
+        if args.mode == 'hybrid':
+            vector_index = load_index(artifact_dir, ivf=args.ivf, n_probe=args.n_probe,
+                                      first_pass=args.first_pass, first_pass_dim=args.first_pass_dim,
+                                      rerank_factor=args.rerank_factor, rerank=not args.no_rerank)
+            index = HybridIndex(vector_index, lexical, rrf_k=args.rrf_k)
+    started = time.perf_counter()
+    if args.mode == 'vector':
+        results = index.search_batch(vectors, args.match_threshold, args.match_count)
+    elif args.mode == 'lexical':
+        results = [index.search(q, match_count=args.match_count) for q in questions]
+    else:
+        if vectors is None:
+            vectors = [None] * len(questions)
+        results = [index.search(q, v, args.match_threshold, args.match_count) for q, v in zip(questions, vectors)]
+    elapsed = time.perf_counter() - started
+
+    for question, matches in zip(questions, results):
+        print(f"\n❓ {question}")
+        for rank, match in enumerate(matches, 1):
+            print(f"  {rank:2d}. [{match.similarity:.3f}] {match.rule_id[:60]} ({match.source_file})")
+        if not matches:
+            print("  (threshold 를 넘는 결과 없음)")
+
+    print(f"\n{len(results)}개 질문, {len(index)}개 chunk 검색: {elapsed * 1000:.2f}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+SQL Export
+----------
+tennis_rules 행을 SQL Editor / psql 에서 적재할 수 있는 파일로 씁니다.
+
+- insert:   행마다 INSERT ... ON CONFLICT 1문장 (기존 출력 형식)
+- multirow: INSERT ... VALUES (...), (...), ... 로 여러 행을 한 문장에
+- copy:     COPY 호환 CSV (가장 빠름, upsert 불가 → 전체 재적재용)
+
+벡터의 소수 자릿수는 precision (유효숫자 수) 으로 조절할 수 있습니다.
+
+사용법 (scripts/ 에서, 임베딩 재호출 없이 artifact → SQL/CSV):
+    python -m tennis_rag export-sql --artifact insert_rules.artifact --sql-format copy --output rules.csv
+"""
+
+import argparse
+import csv
+import json
+import sys
+from typing import Dict, Iterable, List, Optional, TextIO
+
+from .pipeline import batched
+
+COLUMNS = ('source_file', 'rule_id', 'language', 'content', 'metadata', 'embedding', 'chunk_hash')
+SQL_FORMATS = ('insert', 'multirow', 'copy')
+DEFAULT_ROWS_PER_STATEMENT = 100
+# tennis_rules.embedding 은 VECTOR(768) 이고 quantized 인덱스도 halfvec(768) / bit(768) 로 고정
+# (supabase/migrations/20261017_add_tennis_rules_quantized_search.sql). 256/512 차원은 오프라인 검색용
+SQL_EMBEDDING_DIM = 768
+
+UPSERT_CLAUSE = (
+    " ON CONFLICT (chunk_hash) DO UPDATE SET metadata = EXCLUDED.metadata, "
+    "embedding = EXCLUDED.embedding, language = EXCLUDED.language"
+)
+
+
+def sql_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def row_language(row: Dict) -> Optional[str]:
+    """language 컬럼 값 (없으면 metadata 의 language)"""
+    return row.get('language') or (row.get('metadata') or {}).get('language')
+
+
+def check_sql_dim(dim: int) -> None:
+    """SQL/COPY 로 출력할 수 있는 차원인지 확인 (아니면 ValueError)"""
+    if dim != SQL_EMBEDDING_DIM:
+        raise ValueError(
+            f"SQL/COPY 출력은 {SQL_EMBEDDING_DIM}차원만 지원합니다 (요청: {dim}차원). "
+            f"tennis_rules 스키마가 VECTOR({SQL_EMBEDDING_DIM}) 로 고정되어 있으며, "
+            "축소 차원은 artifact 의 오프라인 검색(tennis_rag.quantize)에서만 사용하세요"
+        )
+
+
+def format_vector(values: Iterable[float], precision: Optional[int] = None) -> str:
+    """
+    pgvector 리터럴 '[x,y,...]'
+
+    precision 이 있으면 유효숫자 수를 제한합니다. numpy 배열(artifact 의 float32 행)은
+    precision 이 없을 때 float32 를 정확히 복원하는 최단 표현으로 씁니다.
+    """
+    if hasattr(values, 'astype'):
+        if precision is None:
+            return '[' + ','.join(values.astype(str)) + ']'
+        values = values.tolist()
+    if precision is None:
+        return '[' + ','.join(repr(float(v)) for v in values) + ']'
+    return '[' + ','.join(f"{v:.{precision}g}" for v in values) + ']'
+
+
+def _values_sql(row: Dict, precision: Optional[int]) -> str:
+    metadata_json = json.dumps(row['metadata'], ensure_ascii=False)
+    language = row_language(row)
+    return (
+        f"({sql_quote(row['source_file'])}, {sql_quote(row['rule_id'])}, "
+        f"{sql_quote(language) if language else 'NULL'}, "
+        f"{sql_quote(row['content'])}, {sql_quote(metadata_json)}::jsonb, "
+        f"'{format_vector(row['embedding'], precision)}'::vector, {sql_quote(row['chunk_hash'])})"
+    )
+
+
+def write_sql(rows: Iterable[Dict], f: TextIO, rows_per_statement: int = 1,
+              precision: Optional[int] = None) -> int:
+    """INSERT ... ON CONFLICT 문장 작성. 작성한 행 수를 반환"""
+    written = 0
+    header = f"INSERT INTO tennis_rules ({', '.join(COLUMNS)}) VALUES"
+    for group in batched(rows, max(1, rows_per_statement)):
+        if len(group) == 1:
+            f.write(f"{header} {_values_sql(group[0], precision)}{UPSERT_CLAUSE};\n")
+        else:
+            values = ',\n'.join(_values_sql(row, precision) for row in group)
+            f.write(f"{header}\n{values}\n{UPSERT_CLAUSE.strip()};\n")
+        written += len(group)
+    return written
+
+
+def write_copy_csv(rows: Iterable[Dict], f: TextIO, precision: Optional[int] = None) -> int:
+    """COPY tennis_rules (...) FROM ... WITH (FORMAT csv) 로 읽을 수 있는 CSV 작성"""
+    writer = csv.writer(f, lineterminator='\n')
+    written = 0
+    for row in rows:
+        writer.writerow([
+            row['source_file'],
+            row['rule_id'],
+            row_language(row) or '',
+            row['content'],
+            json.dumps(row['metadata'], ensure_ascii=False),
+            format_vector(row['embedding'], precision),
+            row['chunk_hash'],
+        ])
+        written += 1
+    return written
+
+
+def copy_command(csv_path: str) -> str:
+    """psql 에서 CSV 를 적재하는 명령"""
+    return f"\\copy tennis_rules ({', '.join(COLUMNS)}) FROM '{csv_path}' WITH (FORMAT csv)"
+
+
+def write_rows(rows: List[Dict], f: TextIO, sql_format: str = 'insert',
+               rows_per_statement: int = DEFAULT_ROWS_PER_STATEMENT,
+               precision: Optional[int] = None) -> int:
+    """sql_format 에 맞춰 작성"""
+    if sql_format == 'copy':
+        return write_copy_csv(rows, f, precision)
+    per_statement = rows_per_statement if sql_format == 'multirow' else 1
+    return write_sql(rows, f, per_statement, precision)
+
+
+def export_artifact(artifact_dir, output_file: str, sql_format: str = 'insert',
+                    rows_per_statement: int = DEFAULT_ROWS_PER_STATEMENT,
+                    precision: Optional[int] = None) -> int:
+    """저장된 embedding artifact 에서 SQL/COPY 파일 생성 (임베딩 재호출 없음)"""
+    from .artifact import EmbeddingArtifact
+
+    artifact = EmbeddingArtifact(artifact_dir)
+    check_sql_dim(artifact.dim)
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        return write_rows(artifact.iter_rows(), f, sql_format, rows_per_statement, precision)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .index_build import add_index_arguments, index_settings_from_args, write_bulk_load_script
+
+    parser = argparse.ArgumentParser(description='Export an embedding artifact as SQL / COPY CSV')
+    parser.add_argument('--artifact', required=True, help='embedding artifact 디렉토리')
+    parser.add_argument('--output', default='insert_rules.sql', help='출력 파일 (기본값: insert_rules.sql)')
+    parser.add_argument('--sql-format', default='insert', choices=SQL_FORMATS,
+                        help='insert: 행마다 upsert, multirow: 여러 행 INSERT, copy: COPY 호환 CSV (전체 재적재용)')
+    parser.add_argument('--rows-per-statement', type=int, default=DEFAULT_ROWS_PER_STATEMENT,
+                        help=f'multirow 문장 1개의 행 수 (기본값: {DEFAULT_ROWS_PER_STATEMENT})')
+    parser.add_argument('--float-precision', type=int, default=None,
+                        help='벡터 값의 유효숫자 수 (기본값: float32 를 정확히 표현하는 최소 자릿수)')
+    add_index_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        settings = index_settings_from_args(args) if args.bulk_load else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        written = export_artifact(args.artifact, args.output, args.sql_format,
+                                  args.rows_per_statement, args.float_precision)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"✓ {written}개 행 저장: {args.output} ({args.sql_format})")
+    if args.sql_format == 'copy':
+        print(f"psql 적재: {copy_command(args.output)}")
+    if settings is not None:
+        script = write_bulk_load_script(args.output, args.sql_format, settings)
+        print(f"✓ bulk load 스크립트 (인덱스 삭제 → 적재 → 생성 → ef_search 탐색): psql -f {script}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Extracted Text Cache
+--------------------
+PDF 에서 추출한 페이지별 텍스트를 (PDF SHA-256, extractor 버전) 을 키로 저장합니다.
+chunking 설정만 바꿔 다시 실행할 때 내용이 같은 PDF 는 PyPDF2 파싱을 통째로 건너뜁니다.
+
+- 저장소: 캐시 디렉토리의 SQLite 파일 하나 (pages.sqlite3), 페이지 텍스트는 zlib 압축
+- 페이지 번호를 함께 저장하므로 캐시에서 읽어도 PageText.page_number 가 그대로 (인용용)
+- 읽기는 페이지 묶음 단위로 lazy 하게 (큰 문서도 전체를 메모리에 올리지 않음)
+- 문서의 모든 페이지를 추출한 뒤에만 documents 행을 기록 → 중간에 실패한 문서는 캐시되지 않음
+- extractor 버전(PyPDF2 버전 + EXTRACTOR_VERSION)이 바뀌면 예전 항목은 자동으로 miss
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .embedding_cache import DEFAULT_CACHE_DIR
+from .manifest import file_sha256
+from .pdf_extract import PageText, extract_pages, extractor_version
+from .pipeline import iter_pages
+
+logger = logging.getLogger(__name__)
+
+TEXT_CACHE_FILE = 'pages.sqlite3'
+READ_BATCH_PAGES = 32
+
+
+class TextCache:
+    """SQLite 기반 페이지 텍스트 캐시 (스레드 안전)"""
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, enabled: bool = True,
+                 extractor: Optional[str] = None):
+        """
+        Args:
+            cache_dir: 캐시 파일을 저장할 디렉토리 (임베딩 캐시와 같은 위치)
+            enabled: False 이면 조회/저장을 모두 건너뜀 (--no-text-cache)
+            extractor: 캐시 key 의 extractor 버전 (None 이면 extractor_version())
+        """
+        self.enabled = enabled
+        self.extractor = extractor or extractor_version()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if enabled:
+            cache_dir = Path(cache_dir)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self.path = cache_dir / TEXT_CACHE_FILE
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                ' sha256 TEXT NOT NULL,'
+                ' extractor TEXT NOT NULL,'
+                ' source_name TEXT,'
+                ' page_count INTEGER NOT NULL,'
+                ' chars INTEGER NOT NULL,'
+                ' last_used REAL NOT NULL,'
+                ' PRIMARY KEY (sha256, extractor))'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                ' sha256 TEXT NOT NULL,'
+                ' extractor TEXT NOT NULL,'
+                ' page_number INTEGER NOT NULL,'
+                ' text BLOB NOT NULL,'
+                ' PRIMARY KEY (sha256, extractor, page_number)) WITHOUT ROWID'
+            )
+            self._conn.commit()
+
+    def lookup(self, sha256: str) -> Optional[int]:
+        """캐시된 문서의 페이지 수. 없으면 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT page_count FROM documents WHERE sha256 = ? AND extractor = ?',
+                (sha256, self.extractor)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                'UPDATE documents SET last_used = ? WHERE sha256 = ? AND extractor = ?',
+                (time.time(), sha256, self.extractor)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return row[0]
+
+    def iter_pages(self, sha256: str) -> Iterator[PageText]:
+        """캐시된 페이지를 순서대로 (READ_BATCH_PAGES 장씩 읽음, seconds 는 0)"""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT page_number, text FROM pages'
+                    ' WHERE sha256 = ? AND extractor = ? AND page_number > ?'
+                    ' ORDER BY page_number LIMIT ?',
+                    (sha256, self.extractor, last, READ_BATCH_PAGES)
+                ).fetchall()
+            for page_number, blob in rows:
+                yield PageText(page_number, zlib.decompress(blob).decode('utf-8'), 0.0)
+            if len(rows) < READ_BATCH_PAGES:
+                return
+            last = rows[-1][0]
+
+    def put_page(self, sha256: str, page: PageText) -> None:
+        """페이지 1장 저장 (commit_document 전까지는 조회되지 않음)"""
+        if not self.enabled:
+            return
+        blob = zlib.compress(page.text.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (sha256, extractor, page_number, text) VALUES (?, ?, ?, ?)',
+                (sha256, self.extractor, page.page_number, blob)
+            )
+
+    def commit_document(self, sha256: str, page_count: int, chars: int,
+                        source_name: Optional[str] = None) -> None:
+        """문서의 모든 페이지를 저장한 뒤 호출 (이후 lookup 에서 hit)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO documents'
+                ' (sha256, extractor, source_name, page_count, chars, last_used) VALUES (?, ?, ?, ?, ?, ?)',
+                (sha256, self.extractor, source_name, page_count, chars, time.time())
+            )
+            self._conn.commit()
+            self.writes += 1
+
+    def discard(self, sha256: str) -> None:
+        """추출에 실패한 문서의 페이지 삭제"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute('DELETE FROM pages WHERE sha256 = ? AND extractor = ?',
+                               (sha256, self.extractor))
+            self._conn.commit()
+
+    def store(self, sha256: str, pages: Sequence[PageText], source_name: Optional[str] = None) -> None:
+        for page in pages:
+            self.put_page(sha256, page)
+        self.commit_document(sha256, len(pages), sum(len(page.text) for page in pages), source_name)
+
+    def clear(self) -> None:
+        """캐시 전체 삭제 (--clear-text-cache)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute('DELETE FROM documents')
+            self._conn.execute('DELETE FROM pages')
+            self._conn.commit()
+        logger.info(f"✓ 추출 텍스트 캐시 삭제 완료: {self.path}")
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def log_stats(self) -> None:
+        if not self.enabled:
+            logger.info("추출 텍스트 캐시: 사용 안 함 (--no-text-cache)")
+            return
+        s = self.stats()
+        logger.info(f"추출 텍스트 캐시: hit {s['hits']} / miss {s['misses']} 문서, 저장 {s['writes']}")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+
+def _sha256_of(pdf_path: Path, hashes: Optional[Dict[Path, str]]) -> str:
+    if hashes and pdf_path in hashes:
+        return hashes[pdf_path]
+    return file_sha256(pdf_path)
+
+
+def iter_cached_pages(pdf_paths: Sequence[Path], text_cache: Optional[TextCache],
+                      hashes: Optional[Dict[Path, str]] = None,
+                      on_error: Optional[Callable[[Path, Exception], None]] = None,
+                      **kwargs) -> Iterator[Tuple[Path, PageText]]:
+    """
+    pipeline.iter_pages 와 같은 (pdf_path, PageText) stream. 캐시에 있는 문서는 캐시에서 읽고,
+    없는 문서만 추출해서 페이지를 흘려보내며 캐시에 저장합니다 (파일 순서 유지).
+
+    Args:
+        hashes: 이미 계산한 PDF SHA-256 (없으면 여기서 계산)
+        kwargs: iter_pages 옵션 (executor, pages_per_task, max_pending)
+    """
+    if text_cache is None or not text_cache.enabled:
+        yield from iter_pages(pdf_paths, on_error=on_error, **kwargs)
+        return
+
+    failed = set()
+
+    def record_error(pdf_path: Path, e: Exception) -> None:
+        failed.add(pdf_path)
+        if on_error is not None:
+            on_error(pdf_path, e)
+
+    def extract(misses: List[Tuple[Path, str]]) -> Iterator[Tuple[Path, PageText]]:
+        sha_by_path = dict(misses)
+        current: Optional[Path] = None
+        count = chars = 0
+
+        def finish(pdf_path: Optional[Path]) -> None:
+            if pdf_path is None:
+                return
+            if pdf_path in failed:
+                text_cache.discard(sha_by_path[pdf_path])
+            else:
+                text_cache.commit_document(sha_by_path[pdf_path], count, chars, pdf_path.name)
+
+        for pdf_path, page in iter_pages([path for path, _ in misses], on_error=record_error, **kwargs):
+            if pdf_path != current:
+                finish(current)
+                current, count, chars = pdf_path, 0, 0
+            text_cache.put_page(sha_by_path[pdf_path], page)
+            count += 1
+            chars += len(page.text)
+            yield pdf_path, page
+        finish(current)
+
+    # 연속된 miss 는 한 번에 추출 (프로세스 풀에 여러 파일의 페이지 범위를 함께 제출)
+    misses: List[Tuple[Path, str]] = []
+    for pdf_path in pdf_paths:
+        sha256 = _sha256_of(pdf_path, hashes)
+        if text_cache.lookup(sha256) is None:
+            misses.append((pdf_path, sha256))
+            continue
+        if misses:
+            yield from extract(misses)
+            misses = []
+        logger.info(f"↩️  추출 텍스트 캐시 사용: {pdf_path.name}")
+        for page in text_cache.iter_pages(sha256):
+            yield pdf_path, page
+    if misses:
+        yield from extract(misses)
+
+
+def extract_pages_cached(pdf_paths: Sequence[Path], text_cache: Optional[TextCache],
+                         executor=None, hashes: Optional[Dict[Path, str]] = None) -> Dict[Path, List[PageText]]:
+    """pdf_extract.extract_pages 의 캐시 버전 (읽기 실패한 파일은 빈 리스트, 캐시하지 않음)"""
+    if text_cache is None or not text_cache.enabled:
+        return extract_pages(pdf_paths, executor=executor)
+
+    results: Dict[Path, List[PageText]] = {}
+    misses: Dict[Path, str] = {}
+    for pdf_path in pdf_paths:
+        sha256 = _sha256_of(pdf_path, hashes)
+        if text_cache.lookup(sha256) is None:
+            misses[pdf_path] = sha256
+        else:
+            logger.info(f"↩️  추출 텍스트 캐시 사용: {pdf_path.name}")
+            results[pdf_path] = list(text_cache.iter_pages(sha256))
+
+    if misses:
+        extracted = extract_pages(list(misses), executor=executor)
+        for pdf_path, pages in extracted.items():
+            if pages:
+                text_cache.store(misses[pdf_path], pages, pdf_path.name)
+        results.update(extracted)
+    return {pdf_path: results[pdf_path] for pdf_path in pdf_paths}
+
+
+def add_text_cache_arguments(parser) -> None:
+    """PDF 를 읽는 명령 공용 옵션 (위치는 --cache-dir, 없으면 --text-cache-dir)"""
+    parser.add_argument(
+        '--text-cache-dir',
+        type=str,
+        help=f'추출 텍스트 캐시 디렉토리 (기본값: --cache-dir 또는 {DEFAULT_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--no-text-cache',
+        action='store_true',
+        help='추출 텍스트 캐시를 사용하지 않고 항상 PDF 파싱'
+    )
+    parser.add_argument(
+        '--clear-text-cache',
+        action='store_true',
+        help='실행 전에 추출 텍스트 캐시를 비움'
+    )
+
+
+def text_cache_from_args(args) -> TextCache:
+    cache_dir = args.text_cache_dir or getattr(args, 'cache_dir', None) or DEFAULT_CACHE_DIR
+    text_cache = TextCache(Path(cache_dir), enabled=not args.no_text_cache)
+    if args.clear_text_cache:
+        text_cache.clear()
+    return text_cache
@@ -0,0 +1,856 @@
+"""
+Tennis Rules ETL Script
+-----------------------
+PDF 파일에서 테니스 룰을 추출하고, 조항별로 chunking한 후,
+Gemini embeddings를 생성하여 Supabase에 업로드합니다.
+
+supabase / google.generativeai 는 실제로 업로드할 때만 import 합니다.
+
+사용법:
+    python -m tennis_rag upload --pdf-dir ./pdfs --supabase-url YOUR_URL --supabase-key YOUR_KEY --gemini-key YOUR_KEY
+    python upload_tennis_rules.py --pdf-dir ./pdfs   (기존 진입점, 같은 동작)
+
+필수 환경 변수:
+    SUPABASE_URL: Supabase 프로젝트 URL
+    SUPABASE_SERVICE_KEY: Supabase service role key (관리자 권한)
+    GEMINI_API_KEY: Google Gemini API key
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+from pathlib import Path
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import groupby, islice
+from typing import Callable, Deque, List, Dict, Tuple, Optional, Iterable, Iterator
+
+from .artifact import ArtifactWriter
+from .chunker import Chunker, add_chunking_arguments, chunker_from_args
+from .dedup import (
+    DEFAULT_DEDUP_MODE, DEFAULT_SIMILARITY, REUSE_WINDOW, DedupStats, NearDuplicateIndex, add_dedup_arguments,
+)
+from .bulk_loader import (
+    BulkLoader, DEFAULT_RETRY_QUEUE_PATH, DEFAULT_UPLOAD_BATCH_SIZE, DEFAULT_UPLOAD_CONCURRENCY,
+    add_bulk_load_arguments,
+)
+from .embedding_cache import EmbeddingCache, add_cache_arguments, cache_from_args
+from .embedding_client import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, EmbeddingClient,
+    add_rate_limit_arguments, limiter_from_args,
+)
+from .index_build import SupabaseIndexBuilder, add_index_arguments, index_settings_from_args, log_tuning
+from .journal import DEFAULT_UPLOAD_JOURNAL_PATH, RunJournal, add_journal_arguments
+from .metrics import PipelineMetrics, add_metrics_arguments, profiled
+from .manifest import ChunkManifest, DEFAULT_MANIFEST_PATH, chunk_hash, file_sha256
+from .pdf_extract import PageText, join_pages, log_page_timings, open_extract_pool
+from .pipeline import batched, threaded
+from .providers import add_provider_arguments, embed_fn_from_args, gemini_embed_fn, provider_model
+from .quantize import add_quantization_arguments, write_quantized
+from .rate_limit import RateLimiter
+from .text_cache import (
+    TextCache, add_text_cache_arguments, extract_pages_cached, iter_cached_pages, text_cache_from_args,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TennisRulesETL:
+    """테니스 룰 ETL 파이프라인"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, gemini_api_key: Optional[str],
+                 cache: Optional[EmbeddingCache] = None,
+                 limiter: Optional[RateLimiter] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 extract_workers: int = 1,
+                 manifest: Optional[ChunkManifest] = None,
+                 incremental: bool = False,
+                 upload_batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE,
+                 upload_concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+                 retry_queue_path: Optional[Path] = DEFAULT_RETRY_QUEUE_PATH,
+                 artifact_dir: Optional[Path] = None,
+                 embed_fn: Optional[Callable] = None,
+                 embedding_provider: str = 'gemini',
+                 chunker: Optional[Chunker] = None,
+                 dedup: str = DEFAULT_DEDUP_MODE,
+                 dedup_threshold: float = DEFAULT_SIMILARITY,
+                 metrics: Optional[PipelineMetrics] = None,
+                 journal_path: Optional[Path] = None,
+                 resume: bool = False,
+                 text_cache: Optional[TextCache] = None):
+        """
+        Args:
+            supabase_url: Supabase 프로젝트 URL
+            supabase_key: Supabase service role key
+            gemini_api_key: Gemini API key (embed_fn 을 주면 사용하지 않음)
+            cache: 임베딩 캐시 (None 이면 캐시 사용 안 함)
+            limiter: 임베딩 API RPM/TPM 제한 (None 이면 기본값)
+            batch_size: 임베딩 요청 1건당 최대 chunk 수
+            concurrency: 동시에 보낼 임베딩 요청 수
+            extract_workers: PDF 텍스트 추출 프로세스 수 (1: 순차, 0: CPU 코어 수)
+            manifest: 파일/chunk hash 기록 (None 이면 기록하지 않음)
+            incremental: True 이면 manifest 기준으로 바뀌지 않은 파일/chunk를 건너뜀
+            upload_batch_size: upsert batch 1개의 행 수
+            upload_concurrency: 동시에 전송할 upsert batch 수
+            retry_queue_path: 끝까지 실패한 batch를 보관할 파일 (다음 실행 시 재전송)
+            artifact_dir: 이번 실행에서 임베딩한 chunk를 float32 artifact로 저장할 디렉토리
+            embed_fn: genai.embed_content 호환 함수 (None 이면 Gemini API)
+            embedding_provider: embed_fn 의 provider 이름 (캐시/artifact 의 모델 이름 구분용)
+            chunker: 조항 chunker (None 이면 기본 토큰 상한)
+            dedup: 완전/근사 중복 chunk 처리 (reuse: 임베딩 재사용, drop: 제외, off)
+            dedup_threshold: 근사 중복으로 볼 SimHash 유사도
+            metrics: 단계별 계측 (None 이면 새로 생성, self.metrics 로 접근)
+            journal_path: 업로드 완료한 chunk_hash 를 batch 마다 기록할 journal (None 이면 기록 안 함)
+            resume: True 이면 journal 에 완료로 기록된 chunk 는 임베딩/업로드하지 않음
+            text_cache: PDF 별 추출 텍스트 캐시 (None 이면 매번 PDF 파싱)
+        """
+        from supabase import create_client
+
+        self.supabase = create_client(supabase_url, supabase_key)
+        self.embedding_model = provider_model(embedding_provider, 'models/text-embedding-004')
+        self.embedder = EmbeddingClient(
+            model=self.embedding_model,
+            task_type='retrieval_document',
+            cache=cache,
+            limiter=limiter,
+            batch_size=batch_size,
+            embed_fn=embed_fn or gemini_embed_fn(gemini_api_key),
+            concurrency=concurrency,
+        )
+        self.chunker = chunker or Chunker()
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self.metrics = metrics or PipelineMetrics('upload')
+        self.extract_workers = extract_workers
+        self.text_cache = text_cache
+        self._text_cache_recorded = 0
+        self._embedder_recorded: Dict[str, float] = {}
+        self.upload_batch_size = upload_batch_size
+        self.upload_concurrency = upload_concurrency
+        self.retry_queue_path = retry_queue_path
+        self.artifact_dir = artifact_dir
+        self.manifest = manifest
+        self.incremental = incremental and manifest is not None
+        self.journal = RunJournal(
+            journal_path, {'job': 'upload', 'model': self.embedding_model}, resume=resume,
+        ) if journal_path else None
+        self.resume = resume and self.journal is not None
+
+        logger.info(f"✓ Supabase 및 임베딩 provider 초기화 완료 ({embedding_provider})")
+
+    def extract_text_from_pdf(self, pdf_path: Path) -> str:
+        """PDF 파일에서 텍스트 추출"""
+        return self.extract_texts([pdf_path])[pdf_path]
+
+    def extract_texts(self, pdf_paths: List[Path]) -> Dict[Path, str]:
+        """
+        여러 PDF에서 텍스트 추출
+
+        extract_workers > 1 이면 모든 PDF의 페이지 범위를 하나의 프로세스 풀에 나눠 처리합니다.
+        추출 텍스트 캐시에 있는 PDF 는 파싱하지 않습니다.
+        읽기에 실패한 파일은 빈 문자열입니다.
+        """
+        pool = open_extract_pool(self.extract_workers)
+        try:
+            pages_by_file = extract_pages_cached(pdf_paths, self.text_cache, executor=pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        texts = {}
+        for pdf_path, pages in pages_by_file.items():
+            text = join_pages(pages)
+            self._record_pages(pages)
+            if not pages:
+                self.metrics.add('extract', errors=1)
+            else:
+                log_page_timings(pdf_path.name, pages)
+                logger.info(f"✓ {pdf_path.name}: {len(pages)} 페이지, {len(text)} 글자 추출 완료")
+            texts[pdf_path] = text
+        return texts
+
+    def _record_pages(self, pages: Iterable[PageText]) -> None:
+        """추출 단계 계측 (프로세스 풀에서 측정한 페이지별 추출 시간 합)"""
+        for page in pages:
+            self.metrics.add('extract', seconds=page.seconds, items=1, bytes=len(page.text.encode('utf-8')))
+
+    def chunk_by_articles(self, text: str, source_file: str, language: str) -> List[Dict]:
+        """
+        텍스트를 조항별로 chunking
+
+        영어: Article, Rule, Section, **N. 제목** 등으로 구분
+        한글: 제N조, 제N장 등으로 구분
+        (gen_sql.py 와 같은 tennis_rag.chunker 규칙)
+        """
+        chunks = list(self.metrics.iterate(
+            self.iter_article_chunks([text.rstrip('\n')], source_file, language),
+            'chunk', size=self._content_bytes,
+        ))
+        logger.info(f"✓ Chunking 완료: {len(chunks)} chunks 생성")
+        return chunks
+
+    def iter_article_chunks(self, pages: Iterable[str], source_file: str,
+                            language: str) -> Iterator[Dict]:
+        """
+        페이지 텍스트 stream을 조항별 chunk stream으로 변환 (tennis_rag.chunker)
+
+        완성된 조항부터 바로 내보내므로, 메모리는 조항 1개 크기로 유지됩니다.
+        """
+        for chunk in self.chunker.iter_chunks(pages, source_file):
+            yield {
+                'title': chunk.rule_id,
+                'content': chunk.content,
+                'source_file': source_file,
+                'language': language,
+                'section_type': chunk.section_type,
+                'chunk_index': chunk.index,
+            }
+
+    def generate_embeddings(self, chunks: List[Dict]) -> List[Dict]:
+        """Gemini API로 embeddings 생성 (캐시 + batch + rate limit)"""
+        logger.info(f"Embeddings 생성 시작: {len(chunks)} chunks")
+
+        texts = [f"{chunk['title']}\n\n{chunk['content']}" for chunk in chunks]
+        embeddings = self._embed(texts)
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk['embedding'] = embedding
+
+        # embedding이 없는 chunk 제거
+        valid_chunks = [c for c in chunks if c.get('embedding') is not None]
+        logger.info(f"✓ Embeddings 생성 완료: {len(valid_chunks)}/{len(chunks)} 성공")
+        self.embedder.log_stats()
+        self._record_embedder_stats()
+
+        return valid_chunks
+
+    def check_embedding_model(self) -> None:
+        """
+        DB 에 기록된 현재 임베딩 모델(tennis_rules_embedding_model, tennis_rag.reembed 가 갱신)과
+        이 실행의 모델이 다르면 경고 (다른 벡터 공간의 행이 섞임)
+        """
+        try:
+            rows = (self.supabase.table('tennis_rules_embedding_model').select('model')
+                    .eq('slot', 'current').execute().data)
+        except Exception:
+            return  # 마이그레이션 적용 전
+        if rows and rows[0]['model'] != self.embedding_model:
+            logger.warning(f"⚠️  DB 의 현재 임베딩 모델은 {rows[0]['model']} 인데 "
+                           f"{self.embedding_model} 로 적재합니다")
+
+    def check_legacy_rows(self) -> None:
+        """
+        chunk_hash 가 없는 행(20261016 이전 적재분)이 있으면 중단
+
+        NULL 은 unique index 에서 서로 다른 값이므로 upsert 가 갱신 대신 같은 조항을 한 번 더 넣습니다.
+        """
+        try:
+            rows = (self.supabase.table('tennis_rules').select('id')
+                    .is_('chunk_hash', 'null').limit(1).execute().data)
+        except Exception:
+            return  # 마이그레이션 적용 전 (chunk_hash 컬럼 없음)
+        if rows:
+            raise RuntimeError(
+                "chunk_hash 가 없는 기존 행이 있어 upsert 하면 중복됩니다. "
+                "supabase/migrations/20261016_backfill_tennis_rules_chunk_hash.sql 을 먼저 적용하세요"
+            )
+
+    def _embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        with self.metrics.timed('embed', items=len(texts),
+                                bytes=sum(len(t.encode('utf-8')) for t in texts)):
+            return self.embedder.embed(texts)
+
+    def _record_embedder_stats(self) -> None:
+        """임베딩 클라이언트 누적 통계 중 지난 기록 이후 늘어난 만큼을 embed 단계에 기록"""
+        stats = self.embedder.stats()
+        current = {
+            'retries': stats['retries'],
+            'errors': stats['failed'],
+            'requests': stats['requests'],
+            'rate_limited': stats['rate_limited'],
+            'tokens': stats['tokens_sent'],
+            'rate_limit_wait_seconds': stats['rate_limit_wait_seconds'],
+            'cache_hits': self.embedder.cache.stats()['hits'],
+        }
+        previous = self._embedder_recorded
+        self.metrics.add('embed', **{key: value - previous.get(key, 0) for key, value in current.items()})
+        self._embedder_recorded = current
+
+    def _record_text_cache_stats(self) -> None:
+        if self.text_cache is None:
+            return
+        self.text_cache.log_stats()
+        stats = self.text_cache.stats()
+        self.metrics.add('extract', cache_hits=stats['hits'] - self._text_cache_recorded)
+        self._text_cache_recorded = stats['hits']
+
+    def _record_load_report(self, report) -> None:
+        self.metrics.add('upload', items=report.loaded, retries=report.retries, errors=report.failed,
+                         batches=report.batches, wall_seconds=round(report.elapsed_seconds, 4))
+
+    @staticmethod
+    def _content_bytes(chunk: Dict) -> int:
+        return len(chunk['content'].encode('utf-8'))
+
+    def upload_to_supabase(self, chunks: List[Dict]) -> int:
+        """Supabase에 데이터 업로드"""
+        logger.info(f"Supabase 업로드 시작: {len(chunks)} chunks")
+
+        loader = self._open_loader()
+        loader.add_many([self._build_record(chunk) for chunk in chunks])
+        report = loader.close()
+        self._record_load_report(report)
+
+        logger.info(f"✓ Supabase 업로드 완료: {report.loaded} chunks")
+        return report.loaded
+
+    def _open_loader(self, on_result=None) -> BulkLoader:
+        def log_progress(records: List[Dict], ok: bool) -> None:
+            if on_result is not None:
+                on_result(records, ok)
+            if ok and self.journal is not None:
+                self.journal.record_many((record['chunk_hash'] for record in records), 'uploaded')
+            if ok:
+                logger.info(f"  업로드: {loader.report.loaded} chunks 완료")
+
+        loader = BulkLoader(
+            self._write_records,
+            batch_size=self.upload_batch_size,
+            max_in_flight=self.upload_concurrency,
+            retry_queue_path=self.retry_queue_path,
+            on_result=log_progress,
+        )
+        return loader
+
+    def _build_record(self, chunk: Dict) -> Dict:
+        """chunk → tennis_rules 행 (created_at은 DB 기본값 사용)"""
+        metadata = {
+            'language': chunk['language'],
+            'section_type': chunk['section_type'],
+            'chunk_index': chunk['chunk_index'],
+        }
+        if chunk.get('duplicate_of'):
+            metadata['duplicate_of'] = chunk['duplicate_of']
+        return {
+            'source_file': chunk['source_file'],
+            'rule_id': chunk['title'],
+            'language': chunk['language'],
+            'content': chunk['content'],
+            'metadata': metadata,
+            'embedding': chunk['embedding'],
+            'chunk_hash': self._chunk_hash(chunk),
+        }
+
+    def _write_records(self, records: List[Dict]) -> None:
+        """batch upsert (chunk_hash 기준이므로 재실행해도 중복 행이 생기지 않음)"""
+        payload_bytes = len(json.dumps(records, ensure_ascii=False).encode('utf-8'))
+        with self.metrics.timed('upload', bytes=payload_bytes):
+            self.supabase.table('tennis_rules').upsert(records, on_conflict='chunk_hash').execute()
+
+    @staticmethod
+    def _chunk_hash(chunk: Dict) -> str:
+        if 'chunk_hash' not in chunk:
+            chunk['chunk_hash'] = chunk_hash(chunk['source_file'], chunk['title'], chunk['content'])
+        return chunk['chunk_hash']
+
+    def delete_chunks(self, hashes: Iterable[str]) -> bool:
+        """chunk_hash 목록에 해당하는 행 삭제 (더 이상 존재하지 않는 조항)"""
+        hashes = sorted(hashes)
+        try:
+            for batch in batched(hashes, 100):
+                self.supabase.table('tennis_rules').delete().in_('chunk_hash', batch).execute()
+            logger.info(f"✓ 사라진 chunk {len(hashes)}개 삭제")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Supabase 삭제 실패 ({len(hashes)} chunks): {e}")
+            return False
+
+    def process_pdf(self, pdf_path: Path, language: str, text: Optional[str] = None) -> int:
+        """단일 PDF 파일 처리 (text 를 주면 PDF 추출을 건너뜀)"""
+        logger.info(f"\n{'='*60}")
+        logger.info(f"PDF 처리 시작: {pdf_path.name} ({language})")
+        logger.info(f"{'='*60}")
+
+        # 1. PDF에서 텍스트 추출
+        if text is None:
+            text = self.extract_text_from_pdf(pdf_path)
+        if not text:
+            return 0
+
+        # 2. 조항별 chunking
+        chunks = self.chunk_by_articles(text, pdf_path.name, language)
+        if not chunks:
+            logger.warning(f"⚠️  Chunk 생성 실패: {pdf_path.name}")
+            return 0
+        if self.resume:
+            remaining = [chunk for chunk in chunks if self._chunk_hash(chunk) not in self.journal]
+            logger.info(f"⏭  journal 기준 완료된 chunk {len(chunks) - len(remaining)}개 건너뜀")
+            chunks = remaining
+            if not chunks:
+                return 0
+
+        # 3. Embeddings 생성
+        chunks_with_embeddings = self.generate_embeddings(chunks)
+        if not chunks_with_embeddings:
+            logger.warning(f"⚠️  Embedding 생성 실패: {pdf_path.name}")
+            return 0
+
+        # 4. Supabase 업로드
+        uploaded = self.upload_to_supabase(chunks_with_embeddings)
+
+        logger.info(f"✓ {pdf_path.name} 처리 완료: {uploaded} chunks 업로드됨\n")
+        return uploaded
+
+    @staticmethod
+    def detect_language(pdf_file: Path) -> str:
+        """파일명으로 언어 감지 (ko/en)"""
+        if any(x in pdf_file.stem.lower() for x in ['한글', 'korean', 'ko', '규칙']):
+            return 'ko'
+        return 'en'
+
+    def process_directory(self, pdf_dir: Path) -> Tuple[int, int]:
+        """
+        디렉토리 내 모든 PDF 파일 처리 (streaming)
+
+        페이지 추출 → chunking → 임베딩 → 업로드가 크기 제한 queue로 연결되어 동시에 진행됩니다.
+        앞 단계가 뒤 단계보다 빠르면 queue가 가득 찬 시점에서 멈추므로(backpressure),
+        PDF 개수/크기와 관계없이 메모리에는 처리 중인 일부 페이지와 chunk만 남습니다.
+
+        Returns:
+            (최신 상태인 파일 수, 업로드된 chunk 수)
+        """
+        pdf_files = sorted(pdf_dir.glob("*.pdf"))
+
+        if not pdf_files:
+            logger.error(f"❌ PDF 파일을 찾을 수 없습니다: {pdf_dir}")
+            return 0, 0
+
+        logger.info(f"\n{'='*60}")
+        logger.info(f"총 {len(pdf_files)}개의 PDF 파일 발견")
+        logger.info(f"{'='*60}\n")
+
+        file_hashes = {pdf_file.name: file_sha256(pdf_file) for pdf_file in pdf_files}
+        unchanged_files = []
+        if self.incremental:
+            unchanged_files = [f for f in pdf_files if self.manifest.is_unchanged(f.name, file_hashes[f.name])]
+            for pdf_file in unchanged_files:
+                logger.info(f"⏭  변경 없음, 건너뜀: {pdf_file.name}")
+            for name in self.manifest.missing_files(file_hashes):
+                logger.warning(f"⚠️  manifest에는 있지만 디렉토리에 없는 파일 (DB 행 유지): {name}")
+        changed_files = [f for f in pdf_files if f not in unchanged_files]
+
+        current_hashes: Dict[str, set] = {}
+        failed_hashes: Dict[str, set] = {}
+        failed_files: set = set()
+        uploaded_by_file: Counter = Counter()
+        dedup_stats = DedupStats()
+
+        def on_failure(chunk: Dict) -> None:
+            failed_hashes.setdefault(chunk['source_file'], set()).add(chunk['chunk_hash'])
+
+        def on_result(records: List[Dict], ok: bool) -> None:
+            if ok:
+                uploaded_by_file.update(record['source_file'] for record in records)
+            else:
+                for record in records:
+                    on_failure(record)
+
+        def on_extract_error(path: Path, e: Exception) -> None:
+            # 중간 페이지에서 실패하면 일부 chunk 만 나오므로 파일 전체를 실패로 기록
+            failed_files.add(path.name)
+            self.metrics.add('extract', errors=1)
+
+        loader = self._open_loader(on_result)
+        loader.replay_retry_queue()
+
+        pool = open_extract_pool(self.extract_workers) if changed_files else None
+        try:
+            pages = threaded(iter_cached_pages(changed_files, self.text_cache,
+                                               hashes={f: file_hashes[f.name] for f in changed_files},
+                                               executor=pool,
+                                               on_error=on_extract_error),
+                             maxsize=64)
+            chunks = self.metrics.iterate(
+                self._iter_new_chunks(self.iter_directory_chunks(pages), current_hashes), 'hash')
+            if self.dedup != 'off':
+                chunks = self.metrics.iterate(self._iter_deduplicated(chunks, dedup_stats), 'dedup')
+            embedded = threaded(
+                self.iter_embedded_chunks(chunks, on_failure=on_failure),
+                maxsize=self.upload_batch_size * 2,
+            )
+
+            artifact = ArtifactWriter(self.artifact_dir, self.embedding_model) if self.artifact_dir else None
+            try:
+                for chunk in embedded:
+                    record = self._build_record(chunk)
+                    loader.add(record)
+                    if artifact is not None:
+                        artifact.add(record, chunk['embedding'])
+                if artifact is not None:
+                    artifact.close()
+            except BaseException:
+                # 중간에 실패하면 잘린 .npy / sidecar 를 남기지 않음
+                if artifact is not None:
+                    artifact.discard()
+                raise
+        finally:
+            self._record_load_report(loader.close())
+            if pool is not None:
+                pool.shutdown()
+
+        self.embedder.log_stats()
+        self._record_embedder_stats()
+        self._record_text_cache_stats()
+        dedup_stats.log(self.dedup, self.embedder.max_batch_size)
+        self.metrics.add('dedup', exact=dedup_stats.exact, near=dedup_stats.near,
+                         saved_tokens=dedup_stats.saved_tokens)
+        if self.manifest is not None:
+            self._sync_manifest(file_hashes, current_hashes, failed_hashes, failed_files)
+
+        for pdf_file in changed_files:
+            logger.info(f"✓ {pdf_file.name}: {uploaded_by_file[pdf_file.name]} chunks 업로드됨")
+
+        ok_files = [
+            f for f in changed_files
+            if current_hashes.get(f.name) and not failed_hashes.get(f.name) and f.name not in failed_files
+        ]
+        total_files = len(ok_files) + len(unchanged_files)
+        total_chunks = sum(uploaded_by_file.values())
+
+        logger.info(f"\n{'='*60}")
+        logger.info(f"✅ 전체 처리 완료")
+        logger.info(f"  - 처리된 파일: {total_files}/{len(pdf_files)} (변경 없음 {len(unchanged_files)})")
+        logger.info(f"  - 업로드된 chunks: {total_chunks}")
+        logger.info(f"{'='*60}\n")
+
+        return total_files, total_chunks
+
+    def _iter_new_chunks(self, chunks: Iterable[Dict],
+                         current_hashes: Dict[str, set]) -> Iterator[Dict]:
+        """
+        chunk_hash를 붙이고 파일별로 기록. incremental 모드에서는
+        manifest에 이미 있는 chunk(내용이 바뀌지 않은 조항)를 임베딩 전에 걸러냄
+        """
+        known: Dict[str, set] = {}
+        skipped = 0
+        resumed = 0
+        for chunk in chunks:
+            source_file = chunk['source_file']
+            hashes = current_hashes.setdefault(source_file, set())
+            if self._chunk_hash(chunk) in hashes:
+                # 같은 파일 안의 완전히 동일한 조항은 한 번만 업로드 (upsert 충돌 방지)
+                continue
+            hashes.add(chunk['chunk_hash'])
+
+            if self.resume and chunk['chunk_hash'] in self.journal:
+                # 이전 실행에서 업로드까지 끝난 chunk (manifest 에는 그대로 남김)
+                resumed += 1
+                continue
+            if self.incremental:
+                if source_file not in known:
+                    known[source_file] = self.manifest.known_hashes(source_file)
+                if chunk['chunk_hash'] in known[source_file]:
+                    skipped += 1
+                    continue
+            yield chunk
+
+        if self.incremental:
+            logger.info(f"⏭  변경 없는 chunk {skipped}개 건너뜀")
+        if self.resume:
+            logger.info(f"⏭  journal 기준 완료된 chunk {resumed}개 건너뜀")
+
+    def _iter_deduplicated(self, chunks: Iterable[Dict], stats: DedupStats) -> Iterator[Dict]:
+        """
+        모든 PDF에 걸쳐 완전/근사 중복 chunk를 찾음 (SimHash + LSH)
+
+        reuse: 먼저 나온 대표 chunk의 임베딩을 재사용하도록 duplicate_of 표시
+        drop: 중복 chunk는 임베딩/업로드하지 않음
+        """
+        index = NearDuplicateIndex(self.dedup_threshold)
+        for chunk in chunks:
+            duplicate = index.find_or_add(chunk['chunk_hash'], chunk['content'])
+            stats.record(chunk['content'], duplicate)
+            if duplicate is not None:
+                if self.dedup == 'drop':
+                    continue
+                chunk['duplicate_of'] = duplicate.key
+            yield chunk
+
+    def _sync_manifest(self, file_hashes: Dict[str, str], current_hashes: Dict[str, set],
+                       failed_hashes: Dict[str, set], failed_files: Optional[set] = None) -> None:
+        """
+        사라진 chunk 삭제 후 manifest 갱신
+
+        추출/임베딩/업로드 중 하나라도 실패한 파일은 chunk 목록이 불완전할 수 있으므로
+        사라진 chunk를 삭제하지 않고, 파일 hash도 남기지 않아 다음 실행에서 다시 처리합니다.
+        """
+        failed_files = failed_files or set()
+        for source_file, hashes in current_hashes.items():
+            known = self.manifest.known_hashes(source_file)
+            failed = failed_hashes.get(source_file, set())
+            removed = known - hashes
+            if failed or source_file in failed_files:
+                if removed:
+                    logger.warning(f"⚠️  {source_file}: 처리 실패로 사라진 chunk {len(removed)}개 삭제를 건너뜀")
+                self.manifest.update(source_file, None, (hashes - failed) | removed)
+                continue
+
+            delete_failed = bool(removed) and not self.delete_chunks(removed)
+            stored = hashes | (removed if delete_failed else set())
+            self.manifest.update(source_file, None if delete_failed else file_hashes[source_file], stored)
+
+        self.manifest.save()
+        logger.info(f"✓ manifest 저장: {self.manifest.path}")
+
+    def iter_directory_chunks(self, pages: Iterable[Tuple[Path, PageText]]) -> Iterator[Dict]:
+        """(pdf_path, PageText) stream을 파일별로 묶어 chunk stream으로 변환"""
+        pages = self.metrics.waiting(pages, 'chunk')
+        for pdf_path, file_pages in groupby(pages, key=lambda item: item[0]):
+            language = self.detect_language(pdf_path)
+            logger.info(f"PDF 처리 시작: {pdf_path.name} ({language})")
+
+            timings: List[PageText] = []
+            def page_texts():
+                for _, page in file_pages:
+                    self._record_pages([page])
+                    timings.append(page._replace(text=''))
+                    yield page.text
+
+            chunk_count = 0
+            chunks = self.iter_article_chunks(page_texts(), pdf_path.name, language)
+            for chunk in self.metrics.iterate(chunks, 'chunk', size=self._content_bytes):
+                chunk_count += 1
+                yield chunk
+
+            log_page_timings(pdf_path.name, timings)
+            logger.info(f"✓ {pdf_path.name}: {len(timings)} 페이지, {chunk_count} chunks 생성")
+
+    def iter_embedded_chunks(self, chunks: Iterable[Dict],
+                             on_failure: Optional[Callable[[Dict], None]] = None) -> Iterator[Dict]:
+        """
+        chunk stream에 embedding을 붙여 반환 (실패한 chunk는 on_failure 호출 후 제외)
+
+        batch 1개를 요청 1건으로 보내고, 요청이 하나 끝날 때마다 다음 batch 를 바로 제출하므로
+        느린 batch 가 있어도 여러 PDF에 걸쳐 항상 concurrency 개의 요청이 진행됩니다.
+        결과는 입력 순서대로 내보내며, duplicate_of 가 있는 chunk는 대표 chunk의 임베딩을 그대로 사용합니다.
+        대표 임베딩은 최근 REUSE_WINDOW 개만 메모리에 두고, 그보다 오래된 대표의 중복 chunk는
+        직접 임베딩합니다 (임베딩 캐시에 있으면 API 호출 없음).
+        """
+        concurrency = self.embedder.concurrency
+        chunk_iter = iter(chunks)
+        canonical: 'OrderedDict[str, List[float]]' = OrderedDict()
+        reembedded = 0
+        # (group, unique, future) 입력 순서. 끝났지만 아직 내보내지 않은 batch 는 최대 concurrency 배까지 보관
+        pending: Deque[Tuple[List[Dict], List[Dict], Future]] = deque()
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                running = sum(1 for _, _, future in pending if not future.done())
+                while not exhausted and running < concurrency and len(pending) < concurrency * 4:
+                    group = list(islice(chunk_iter, self.embedder.max_batch_size))
+                    if not group:
+                        exhausted = True
+                        break
+                    unique = [chunk for chunk in group if not chunk.get('duplicate_of')]
+                    texts = [f"{chunk['title']}\n\n{chunk['content']}" for chunk in unique]
+                    pending.append((group, unique, pool.submit(self._embed, texts)))
+                    running += 1
+                if not pending:
+                    break
+
+                if not pending[0][2].done():
+                    wait([future for _, _, future in pending if not future.done()], return_when=FIRST_COMPLETED)
+                while pending and pending[0][2].done():
+                    group, unique, future = pending.popleft()
+                    for chunk, embedding in zip(unique, future.result()):
+                        chunk['embedding'] = embedding
+                        if embedding is not None and self.dedup == 'reuse':
+                            canonical[chunk['chunk_hash']] = embedding
+                            if len(canonical) > REUSE_WINDOW:
+                                canonical.popitem(last=False)
+
+                    for chunk in group:
+                        duplicate_of = chunk.get('duplicate_of')
+                        if duplicate_of in canonical:
+                            canonical.move_to_end(duplicate_of)
+                            chunk['embedding'] = canonical[duplicate_of]
+                        elif duplicate_of:
+                            reembedded += 1
+                            chunk['embedding'] = self._embed([f"{chunk['title']}\n\n{chunk['content']}"])[0]
+                        if chunk['embedding'] is None:
+                            if on_failure is not None:
+                                on_failure(chunk)
+                            continue
+                        yield chunk
+
+        if reembedded:
+            logger.info(f"🔄 대표 임베딩이 메모리에 없어 다시 임베딩한 중복 chunk {reembedded}개")
+
+
+def main(argv: Optional[List[str]] = None):
+    """메인 함수"""
+    parser = argparse.ArgumentParser(
+        description='Tennis Rules ETL Pipeline - PDF to Supabase with Gemini Embeddings'
+    )
+    parser.add_argument(
+        '--pdf-dir',
+        type=str,
+        required=True,
+        help='PDF 파일이 있는 디렉토리 경로'
+    )
+    parser.add_argument(
+        '--supabase-url',
+        type=str,
+        help='Supabase URL (또는 환경변수 SUPABASE_URL 사용)'
+    )
+    parser.add_argument(
+        '--supabase-key',
+        type=str,
+        help='Supabase Service Role Key (또는 환경변수 SUPABASE_SERVICE_KEY 사용)'
+    )
+    parser.add_argument(
+        '--gemini-key',
+        type=str,
+        help='Gemini API Key (또는 환경변수 GEMINI_API_KEY 사용)'
+    )
+    add_chunking_arguments(parser)
+    add_dedup_arguments(parser)
+    add_provider_arguments(parser)
+    add_cache_arguments(parser)
+    add_rate_limit_arguments(parser)
+    parser.add_argument(
+        '--extract-workers',
+        type=int,
+        default=1,
+        help='PDF 텍스트 추출 프로세스 수 (기본값: 1 순차, 0: CPU 코어 수)'
+    )
+    add_text_cache_arguments(parser)
+    add_bulk_load_arguments(parser)
+    add_metrics_arguments(parser)
+    add_journal_arguments(parser, DEFAULT_UPLOAD_JOURNAL_PATH)
+    parser.add_argument(
+        '--artifact-dir',
+        type=str,
+        help='임베딩한 chunk를 float32 .npy + Parquet artifact로 저장할 디렉토리 (선택)'
+    )
+    add_quantization_arguments(parser)
+    add_index_arguments(parser)
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='manifest 기준으로 바뀐 파일/조항만 임베딩/업서트하고 사라진 조항은 삭제'
+    )
+    parser.add_argument(
+        '--manifest',
+        type=str,
+        default=str(DEFAULT_MANIFEST_PATH),
+        help=f'파일/chunk hash manifest 경로 (기본값: {DEFAULT_MANIFEST_PATH})'
+    )
+
+    args = parser.parse_args(argv)
+    try:
+        index_settings = index_settings_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # 로깅 설정
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        from dotenv import load_dotenv
+        import supabase  # noqa: F401
+        import PyPDF2  # noqa: F401
+    except ImportError as e:
+        print(f"❌ 필수 패키지가 설치되지 않았습니다: {e}")
+        print("다음 명령어로 설치하세요: pip install -r requirements.txt")
+        sys.exit(1)
+
+    # .env 파일 로드
+    load_dotenv()
+
+    # 환경 변수 확인
+    supabase_url = args.supabase_url or os.getenv('SUPABASE_URL')
+    supabase_key = args.supabase_key or os.getenv('SUPABASE_SERVICE_KEY')
+    gemini_key = args.gemini_key or os.getenv('GEMINI_API_KEY')
+    needs_gemini = args.embedding_provider == 'gemini'
+
+    if not all([supabase_url, supabase_key, gemini_key or not needs_gemini]):
+        logger.error("❌ 필수 환경 변수가 설정되지 않았습니다:")
+        logger.error("  - SUPABASE_URL")
+        logger.error("  - SUPABASE_SERVICE_KEY")
+        logger.error("  - GEMINI_API_KEY (--embedding-provider gemini 인 경우)")
+        logger.error("\n.env 파일을 생성하거나 명령줄 인자로 전달하세요.")
+        sys.exit(1)
+
+    pdf_dir = Path(args.pdf_dir)
+    if not pdf_dir.exists():
+        logger.error(f"❌ 디렉토리를 찾을 수 없습니다: {pdf_dir}")
+        sys.exit(1)
+
+    # ETL 실행
+    try:
+        cache = cache_from_args(args)
+        etl = TennisRulesETL(
+            supabase_url, supabase_key, gemini_key,
+            cache=cache, limiter=limiter_from_args(args), batch_size=args.batch_size,
+            concurrency=args.concurrency, extract_workers=args.extract_workers,
+            manifest=ChunkManifest(Path(args.manifest)), incremental=args.incremental,
+            upload_batch_size=args.upload_batch_size, upload_concurrency=args.upload_concurrency,
+            retry_queue_path=Path(args.retry_queue),
+            artifact_dir=Path(args.artifact_dir) if args.artifact_dir else None,
+            embed_fn=embed_fn_from_args(args, gemini_key),
+            embedding_provider=args.embedding_provider,
+            chunker=chunker_from_args(args),
+            dedup=args.dedup, dedup_threshold=args.dedup_threshold,
+            journal_path=Path(args.journal), resume=args.resume,
+            text_cache=text_cache_from_args(args),
+        )
+        etl.check_embedding_model()
+        etl.check_legacy_rows()
+        indexer = None
+        if args.bulk_load:
+            if args.incremental:
+                logger.warning("⚠️  --bulk-load 는 전체 재적재용입니다. 변경분이 적으면 인덱스를 다시 만드는 비용이 더 큽니다")
+            indexer = SupabaseIndexBuilder(etl.supabase, index_settings, etl.metrics)
+            indexer.drop()
+        with profiled(args.profile, args.profile_top, Path(args.metrics_dir), job='upload'):
+            try:
+                files, chunks = etl.process_directory(pdf_dir)
+            finally:
+                # 적재가 실패해도 인덱스 없이 남지 않도록 다시 생성
+                if indexer is not None:
+                    indexer.build()
+        if indexer is not None:
+            log_tuning(indexer.tune(), index_settings.min_recall)
+        cache.close()
+        etl.text_cache.close()
+        etl.journal.close()
+        if args.artifact_dir and args.quantize:
+            write_quantized(Path(args.artifact_dir), args.quantize, args.quantize_dim)
+
+        etl.metrics.log_summary()
+        outputs = etl.metrics.write(Path(args.metrics_dir))
+        logger.info(f"✓ 계측 결과 저장: {outputs['json']}, {outputs['prometheus']}")
+
+        if files > 0:
+            logger.info("✅ ETL 파이프라인이 성공적으로 완료되었습니다!")
+            sys.exit(0)
+        else:
+            logger.error("❌ 처리된 파일이 없습니다.")
+            sys.exit(1)
+
+    except Exception as e:
+        logger.error(f"❌ ETL 실행 중 오류 발생: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -211,6 +211,7 @@ async function processChunks(
       const { error: insertError } = await supabase.from('tennis_rules').insert({
         source_file: sourceFile,
         rule_id: chunk.rule_id,
+        language,
         content: chunk.content,
         metadata: {
           language,
@@ -2,6 +2,13 @@
 // Tennis Rules RAG - Edge Function
 // ====================================
 // User question → Gemini embedding → Vector search → Answer generation
+// Frequent questions are served from tennis_rules_query_cache
+// (built by `python -m tennis_rag.query_cache`), skipping the embedding
+// call and the vector search, and reusing answers already generated.
+// Rule-number questions ("Rule 12", "제5조") go to the lexical index
+// (search_tennis_rules_lexical) without an embedding call.
+// Vector search only scans the rulebook of the detected question
+// language (match_tennis_rules_by_language, per-language HNSW index).
 // Optimized for mobile viewing with citation support
 
 import { serve } from "https://deno.land/std@0.224.0/http/server.ts";
@@ -31,6 +38,50 @@ interface SearchResult {
   similarity: number;
 }
 
+interface CachedResult {
+  chunk_hash: string;
+  rule_id: string;
+  source_file: string;
+  similarity: number;
+}
+
+interface QueryCacheRow {
+  normalized_question: string;
+  results: CachedResult[];
+  match_threshold: number;
+  match_count: number;
+  answers: Record<string, string>;
+}
+
+// Cache key: must match normalize_question() in scripts/tennis_rag/query_cache.py
+function normalizeQuestion(text: string): string {
+  return text.normalize("NFKC").toLowerCase().replace(/[^\p{L}\p{N}]+/gu, " ").trim();
+}
+
+// Rule-number only question: must match is_reference_query() in scripts/tennis_rag/lexical.py
+const REFERENCE_PATTERNS = [
+  /\b(?:rule|article|section)\s*\d+\b/g,
+  /제\s*\d+\s*[조장]/g,
+  /\bappendix\s+(?:[ivx]+|\d+)\b/g,
+  /부록\s*(?:[ivx]+|\d+)/g,
+];
+const REFERENCE_FILLER = new Set([
+  "rule", "rules", "article", "section", "appendix", "the", "of", "what", "is", "says", "say",
+  "show", "me", "규칙", "조항", "내용", "부록", "알려줘", "무엇", "뭐야",
+]);
+
+function isReferenceQuery(text: string): boolean {
+  let remainder = text.normalize("NFKC").toLowerCase();
+  if (!REFERENCE_PATTERNS.some((pattern) => remainder.match(pattern))) {
+    return false;
+  }
+  for (const pattern of REFERENCE_PATTERNS) {
+    remainder = remainder.replace(pattern, " ");
+  }
+  const words = remainder.match(/[ㄱ-ㅎㅏ-ㅣ가-힣]+|[\p{L}\p{N}]+/gu) ?? [];
+  return words.every((word) => REFERENCE_FILLER.has(word));
+}
+
 // Detect language from question text
 function detectLanguage(text: string): 'ko' | 'en' {
   const koreanPattern = /[ㄱ-ㅎ|ㅏ-ㅣ|가-힣]/;
@@ -96,88 +147,172 @@ serve(async (req) => {
     const language = detectLanguage(question);
     console.log(`[RAG] Question (${language}): ${question}`);
 
-    // 2. Generate question embedding via Gemini API
-    const embeddingResponse = await fetch(
-      `https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-001:embedContent`,
-      {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          "x-goog-api-key": gemini_api_key, // Security: API key in header
-        },
-        body: JSON.stringify({
-          model: "models/gemini-embedding-001",
-          content: {
-            parts: [{ text: question }]
-          },
-          taskType: "RETRIEVAL_QUERY",
-          outputDimensionality: 768
-        })
-      }
-    );
+    const supabaseUrl = Deno.env.get("SUPABASE_URL");
+    const supabaseServiceKey = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY");
 
-    if (!embeddingResponse.ok) {
-      const errorText = await embeddingResponse.text();
-      const sanitizedError = sanitizeErrorMessage(errorText);
-      console.error("[RAG] Gemini API error:", sanitizedError);
+    if (!supabaseUrl || !supabaseServiceKey) {
+      console.error("[RAG] Supabase environment variables not set");
       return new Response(
-        JSON.stringify({ error: "Gemini API call failed", details: sanitizedError }),
+        JSON.stringify({ error: "Server configuration error: Missing Supabase credentials" }),
         { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
       );
     }
 
-    const embeddingData = await embeddingResponse.json();
-    const queryEmbedding = embeddingData?.embedding?.values;
+    const supabaseClient = createClient(supabaseUrl, supabaseServiceKey);
 
-    if (!queryEmbedding || !Array.isArray(queryEmbedding)) {
-      console.error("[RAG] Embedding extraction failed:", embeddingData);
-      return new Response(
-        JSON.stringify({ error: "Embedding generation failed" }),
-        { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
-      );
+    // 2. Precomputed query cache (exact match on the normalized question)
+    //    Usable only if it was built with at least as many results and
+    //    a threshold no stricter than this request's.
+    const normalizedQuestion = normalizeQuestion(question);
+    const { data: cacheRow, error: cacheError } = await supabaseClient
+      .from("tennis_rules_query_cache")
+      .select("normalized_question, results, match_threshold, match_count, answers")
+      .eq("normalized_question", normalizedQuestion)
+      .maybeSingle();
+
+    if (cacheError) {
+      // Table missing or unreachable: fall back to the normal path
+      console.warn("[RAG] Query cache lookup failed:", cacheError.message);
     }
 
-    console.log(`[RAG] Embedding generated: ${queryEmbedding.length} dimensions`);
+    const cached = cacheRow as QueryCacheRow | null;
+    const cacheHit = !!cached &&
+      match_count <= cached.match_count &&
+      match_threshold >= cached.match_threshold;
+    const answerKey = `${model}:${match_count}:${match_threshold}`;
+
+    let searchResults: SearchResult[] = [];
+    let embeddingDim: number | null = null;
+    let retrieval: "cache" | "lexical" | "vector" = "vector";
+
+    if (cacheHit) {
+      const hits = cached!.results
+        .filter((r) => r.similarity > match_threshold)
+        .slice(0, match_count);
+      const { data: rows, error: rowsError } = await supabaseClient
+        .from("tennis_rules")
+        .select("id, source_file, rule_id, content, metadata, chunk_hash")
+        .in("chunk_hash", hits.map((r) => r.chunk_hash));
+
+      if (rowsError) {
+        console.error("[RAG] Cached rules lookup error:", rowsError);
+        return new Response(
+          JSON.stringify({ error: "Vector search failed", details: rowsError }),
+          { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
+        );
+      }
 
-    // 3. Search similar documents in Supabase
-    const supabaseUrl = Deno.env.get("SUPABASE_URL");
-    const supabaseServiceKey = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY");
+      const byHash = new Map((rows ?? []).map((r: any) => [r.chunk_hash, r]));
+      searchResults = hits
+        .filter((r) => byHash.has(r.chunk_hash))
+        .map((r) => {
+          const { chunk_hash: _, ...row } = byHash.get(r.chunk_hash);
+          return { ...row, similarity: r.similarity } as SearchResult;
+        });
+      console.log(`[RAG] Query cache hit: ${searchResults.length} results`);
+      retrieval = "cache";
+    } else if (isReferenceQuery(question)) {
+      // 3a. Rule-number lookup: lexical index, no embedding call
+      const { data, error: searchError } = await supabaseClient.rpc(
+        "search_tennis_rules_lexical",
+        {
+          query_text: question,
+          match_count: match_count
+        }
+      );
 
-    if (!supabaseUrl || !supabaseServiceKey) {
-      console.error("[RAG] Supabase environment variables not set");
-      return new Response(
-        JSON.stringify({ error: "Server configuration error: Missing Supabase credentials" }),
-        { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
+      if (searchError) {
+        console.error("[RAG] Lexical search error:", searchError);
+        return new Response(
+          JSON.stringify({ error: "Lexical search failed", details: searchError }),
+          { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
+        );
+      }
+
+      searchResults = data as SearchResult[];
+      retrieval = "lexical";
+      console.log(`[RAG] Rule reference lookup: ${searchResults.length} results`);
+    } else {
+      // 3. Generate question embedding via Gemini API
+      const embeddingResponse = await fetch(
+        `https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-001:embedContent`,
+        {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            "x-goog-api-key": gemini_api_key, // Security: API key in header
+          },
+          body: JSON.stringify({
+            model: "models/gemini-embedding-001",
+            content: {
+              parts: [{ text: question }]
+            },
+            taskType: "RETRIEVAL_QUERY",
+            outputDimensionality: 768
+          })
+        }
       );
-    }
 
-    const supabaseClient = createClient(supabaseUrl, supabaseServiceKey);
+      if (!embeddingResponse.ok) {
+        const errorText = await embeddingResponse.text();
+        const sanitizedError = sanitizeErrorMessage(errorText);
+        console.error("[RAG] Gemini API error:", sanitizedError);
+        return new Response(
+          JSON.stringify({ error: "Gemini API call failed", details: sanitizedError }),
+          { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
+        );
+      }
 
-    const { data: searchResults, error: searchError } = await supabaseClient.rpc(
-      "match_tennis_rules",
-      {
+      const embeddingData = await embeddingResponse.json();
+      const queryEmbedding = embeddingData?.embedding?.values;
+
+      if (!queryEmbedding || !Array.isArray(queryEmbedding)) {
+        console.error("[RAG] Embedding extraction failed:", embeddingData);
+        return new Response(
+          JSON.stringify({ error: "Embedding generation failed" }),
+          { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
+        );
+      }
+
+      console.log(`[RAG] Embedding generated: ${queryEmbedding.length} dimensions`);
+
+      // 4. Search similar documents in Supabase (question language's rulebook only)
+      const searchParams = {
         query_embedding: queryEmbedding,
         match_threshold: match_threshold,
         match_count: match_count
+      };
+      let { data, error: searchError } = await supabaseClient.rpc(
+        "match_tennis_rules_by_language",
+        { ...searchParams, filter_language: language }
+      );
+
+      if (!searchError && (data?.length ?? 0) === 0) {
+        // No rulebook loaded in this language: search both
+        console.log(`[RAG] No ${language} results, searching all languages`);
+        ({ data, error: searchError } = await supabaseClient.rpc("match_tennis_rules", searchParams));
       }
-    );
 
-    if (searchError) {
-      console.error("[RAG] Search error:", searchError);
-      return new Response(
-        JSON.stringify({ error: "Vector search failed", details: searchError }),
-        { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
-      );
+      if (searchError) {
+        console.error("[RAG] Search error:", searchError);
+        return new Response(
+          JSON.stringify({ error: "Vector search failed", details: searchError }),
+          { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
+        );
+      }
+
+      searchResults = data as SearchResult[];
+      embeddingDim = queryEmbedding.length;
     }
 
     console.log(`[RAG] Search complete: ${searchResults?.length || 0} results`);
 
-    // 4. Build context with citation numbers
+    // 5. Build context with citation numbers
     const context = (searchResults as SearchResult[])
       ?.map((r, idx) => `[${idx + 1}] ${r.rule_id}\n${r.content}\n(Similarity: ${r.similarity.toFixed(3)})`)
       .join("\n\n---\n\n");
 
-    // 5. Generate answer with Gemini (ITF expert tone, complete answers)
+    // 6. Generate answer with Gemini (ITF expert tone, complete answers)
     const prompts = {
       ko: `당신은 ITF(국제테니스연맹) 규칙 전문가입니다. 아래 규칙 정보를 바탕으로 답변하십시오.
 
@@ -265,52 +400,71 @@ ${question}
 Answer:`
     };
 
-    const generateResponse = await fetch(
-      `https://generativelanguage.googleapis.com/v1beta/models/${model}:generateContent`,
-      {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          "x-goog-api-key": gemini_api_key,
-        },
-        body: JSON.stringify({
-          contents: [{
-            parts: [{ text: prompts[language] }]
-          }],
-          generationConfig: {
-            temperature: 0.3, // More consistent, factual answers
-            topP: 0.95,
-            topK: 40
-            // maxOutputTokens removed - let model complete full answer
-          }
-        })
-      }
-    );
-
-    if (!generateResponse.ok) {
-      const errorText = await generateResponse.text();
-      const sanitizedError = sanitizeErrorMessage(errorText);
-      console.error("[RAG] Answer generation error:", sanitizedError);
+    // Same question, model and retrieval settings: reuse the cached answer
+    const cachedAnswer = cacheHit ? cached!.answers?.[answerKey] : undefined;
+    let answer: string;
 
-      // Return error to frontend with proper status code
-      return new Response(
-        JSON.stringify({
-          error: "GEMINI_API_ERROR",
-          details: sanitizedError,
-          status: generateResponse.status
-        }),
+    if (cachedAnswer) {
+      answer = cachedAnswer;
+      console.log(`[RAG] Cached answer reused (${answerKey})`);
+    } else {
+      const generateResponse = await fetch(
+        `https://generativelanguage.googleapis.com/v1beta/models/${model}:generateContent`,
         {
-          status: generateResponse.status, // Pass through the error status (429, 401, etc.)
-          headers: { ...corsHeaders, "Content-Type": "application/json" }
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            "x-goog-api-key": gemini_api_key,
+          },
+          body: JSON.stringify({
+            contents: [{
+              parts: [{ text: prompts[language] }]
+            }],
+            generationConfig: {
+              temperature: 0.3, // More consistent, factual answers
+              topP: 0.95,
+              topK: 40
+              // maxOutputTokens removed - let model complete full answer
+            }
+          })
         }
       );
-    }
 
-    const generateData = await generateResponse.json();
-    const answer = generateData?.candidates?.[0]?.content?.parts?.[0]?.text ||
-                   (language === 'ko' ? "답변을 생성할 수 없습니다." : "Unable to generate answer.");
+      if (!generateResponse.ok) {
+        const errorText = await generateResponse.text();
+        const sanitizedError = sanitizeErrorMessage(errorText);
+        console.error("[RAG] Answer generation error:", sanitizedError);
+
+        // Return error to frontend with proper status code
+        return new Response(
+          JSON.stringify({
+            error: "GEMINI_API_ERROR",
+            details: sanitizedError,
+            status: generateResponse.status
+          }),
+          {
+            status: generateResponse.status, // Pass through the error status (429, 401, etc.)
+            headers: { ...corsHeaders, "Content-Type": "application/json" }
+          }
+        );
+      }
+
+      const generateData = await generateResponse.json();
+      answer = generateData?.candidates?.[0]?.content?.parts?.[0]?.text ||
+             (language === 'ko' ? "답변을 생성할 수 없습니다." : "Unable to generate answer.");
+
+      if (cacheHit && generateData?.candidates?.[0]?.content?.parts?.[0]?.text) {
+        const { error: updateError } = await supabaseClient
+          .from("tennis_rules_query_cache")
+          .update({ answers: { ...cached!.answers, [answerKey]: answer } })
+          .eq("normalized_question", normalizedQuestion);
+        if (updateError) {
+          console.warn("[RAG] Query cache answer update failed:", updateError.message);
+        }
+      }
+    }
 
-    // 6. Return response
+    // 7. Return response
     return new Response(
       JSON.stringify({
         question,
@@ -318,8 +472,10 @@ Answer:`
         sources: searchResults,
         metadata: {
           match_count: searchResults?.length || 0,
-          embedding_dim: queryEmbedding.length,
-          language
+          embedding_dim: embeddingDim,
+          language,
+          cache: cachedAnswer ? "answer" : cacheHit ? "retrieval" : "miss",
+          retrieval
         }
       }),
       {
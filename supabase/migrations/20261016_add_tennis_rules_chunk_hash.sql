@@ -0,0 +1,17 @@
+-- ============================================================
+-- Tennis Rules RAG - Incremental re-ingestion support
+-- ============================================================
+-- Adds a content hash per chunk so the ETL scripts can upsert
+-- changed rules and delete removed ones instead of re-inserting
+-- (and re-embedding) the whole rulebook.
+--
+-- Date: 2026-10-16
+-- chunk_hash = sha256(source_file + rule_id + normalized content)
+--   (computed by scripts/tennis_rag/manifest.py)
+-- ============================================================
+
+ALTER TABLE tennis_rules ADD COLUMN IF NOT EXISTS chunk_hash TEXT;
+
+-- Upsert target (ON CONFLICT (chunk_hash)) and delete lookups
+CREATE UNIQUE INDEX IF NOT EXISTS tennis_rules_chunk_hash_key
+ON tennis_rules(chunk_hash);
@@ -0,0 +1,85 @@
+-- ============================================================
+-- Tennis Rules RAG - chunk_hash backfill for legacy rows
+-- ============================================================
+-- Rows loaded before 20261016_add_tennis_rules_chunk_hash.sql have
+-- chunk_hash NULL. The unique index does not treat NULLs as equal,
+-- so the loaders' ON CONFLICT (chunk_hash) upsert inserted a second
+-- copy of every legacy rule instead of updating it.
+--
+-- Date: 2026-10-16
+--
+--   tennis_rules_chunk_hash()  the same key as
+--                              scripts/tennis_rag/manifest.py chunk_hash:
+--                              sha256(source_file \x1f trim(rule_id) \x1f
+--                              NFC content with whitespace runs collapsed)
+--   backfill                   legacy duplicates (the old loader inserted
+--                              the whole rulebook on every run) and rows
+--                              already reloaded with a hash are removed
+--                              first, then the hash is filled in
+--   trigger                    inserts without chunk_hash (etl-tennis-rules
+--                              edge function) get one computed
+--
+-- The Python loaders refuse to upsert while NULL hashes remain.
+-- ============================================================
+
+-- 1. Hash function (same input normalization as the Python loaders)
+CREATE OR REPLACE FUNCTION tennis_rules_chunk_hash(
+    source_file TEXT,
+    rule_id TEXT,
+    content TEXT
+)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT encode(sha256(convert_to(concat_ws(
+        chr(31),
+        source_file,
+        btrim(rule_id, E' \t\n\r\f\v'),
+        btrim(regexp_replace(normalize(content, NFC), '\s+', ' ', 'g'))
+    ), 'UTF8')), 'hex');
+$$;
+
+-- 2. Remove legacy rows that would collide, then backfill
+--    Keeps the newest legacy copy unless a hashed row already exists
+WITH legacy AS (
+    SELECT
+        id,
+        tennis_rules_chunk_hash(source_file, rule_id, content) AS hash,
+        row_number() OVER (
+            PARTITION BY tennis_rules_chunk_hash(source_file, rule_id, content)
+            ORDER BY id DESC
+        ) AS copy
+    FROM tennis_rules
+    WHERE chunk_hash IS NULL
+)
+DELETE FROM tennis_rules
+USING legacy
+WHERE tennis_rules.id = legacy.id
+  AND (
+      legacy.copy > 1
+      OR EXISTS (SELECT 1 FROM tennis_rules AS hashed WHERE hashed.chunk_hash = legacy.hash)
+  );
+
+UPDATE tennis_rules
+SET chunk_hash = tennis_rules_chunk_hash(source_file, rule_id, content)
+WHERE chunk_hash IS NULL;
+
+-- 3. Fill the hash for inserts that do not send one
+CREATE OR REPLACE FUNCTION set_tennis_rules_chunk_hash()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.chunk_hash IS NULL THEN
+        NEW.chunk_hash := tennis_rules_chunk_hash(NEW.source_file, NEW.rule_id, NEW.content);
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tennis_rules_chunk_hash_trigger ON tennis_rules;
+CREATE TRIGGER tennis_rules_chunk_hash_trigger
+    BEFORE INSERT ON tennis_rules
+    FOR EACH ROW
+    EXECUTE FUNCTION set_tennis_rules_chunk_hash();
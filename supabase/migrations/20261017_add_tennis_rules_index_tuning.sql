@@ -0,0 +1,236 @@
+-- ============================================================
+-- Tennis Rules RAG - Bulk-load HNSW build and ef_search tuning
+-- ============================================================
+-- Full reloads drop tennis_rules_embedding_cosine_idx first, load
+-- the rows without per-row graph updates, then build the index once
+-- with explicit parameters and measure recall / latency at several
+-- hnsw.ef_search values. Used by
+--   python -m tennis_rag upload --bulk-load         (Supabase RPC)
+--   python -m tennis_rag embed|export-sql --bulk-load
+--     → <output>.bulk.sql for psql (e.g. a local pgvector container)
+--   python -m tennis_rag index --build --tune
+--
+-- Date: 2026-10-17
+-- Requires pgvector 0.6.0+ for parallel HNSW builds
+--
+--   m                index graph degree (default 16)
+--   ef_construction  candidate list while building (default 64)
+--   maintenance_work_mem
+--                    the build is much faster when the graph fits
+--   ef_search        candidate list per query; the smallest value
+--                    reaching min_recall is recorded as chosen
+--
+-- Searches keep working while the index is missing (sequential
+-- scan), only slower.
+-- ============================================================
+
+-- 1. Tuning results (one row per ef_search value per run)
+CREATE TABLE IF NOT EXISTS tennis_rules_index_tuning (
+    id BIGSERIAL PRIMARY KEY,
+    run_at TIMESTAMPTZ NOT NULL,
+    row_count BIGINT NOT NULL,
+    m INT NOT NULL,
+    ef_construction INT NOT NULL,
+    ef_search INT NOT NULL,
+    match_count INT NOT NULL,
+    sample_size INT NOT NULL,
+    recall FLOAT NOT NULL,              -- HNSW top-k overlap with exact top-k
+    avg_ms FLOAT NOT NULL,              -- measured inside the database
+    p95_ms FLOAT NOT NULL,
+    chosen BOOLEAN NOT NULL DEFAULT false
+);
+
+CREATE INDEX IF NOT EXISTS tennis_rules_index_tuning_run_at_idx
+ON tennis_rules_index_tuning(run_at);
+
+-- No policies: readable by the service role only
+ALTER TABLE tennis_rules_index_tuning ENABLE ROW LEVEL SECURITY;
+
+-- 2. Drop the vector index before a bulk load
+CREATE OR REPLACE FUNCTION drop_tennis_rules_vector_index()
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    DROP INDEX IF EXISTS tennis_rules_embedding_cosine_idx;
+END;
+$$;
+
+-- 3. Build it once after the load, returns the build time in seconds
+CREATE OR REPLACE FUNCTION build_tennis_rules_vector_index(
+    m INT DEFAULT 16,
+    ef_construction INT DEFAULT 64,
+    maintenance_work_mem TEXT DEFAULT '1GB',
+    parallel_workers INT DEFAULT 2
+)
+RETURNS FLOAT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    started TIMESTAMPTZ := clock_timestamp();
+BEGIN
+    PERFORM set_config('maintenance_work_mem', maintenance_work_mem, true);
+    PERFORM set_config('max_parallel_maintenance_workers', parallel_workers::TEXT, true);
+
+    DROP INDEX IF EXISTS tennis_rules_embedding_cosine_idx;
+    EXECUTE format(
+        'CREATE INDEX tennis_rules_embedding_cosine_idx
+         ON tennis_rules USING hnsw (embedding vector_cosine_ops)
+         WITH (m = %s, ef_construction = %s)',
+        m, ef_construction
+    );
+    ANALYZE tennis_rules;
+
+    RETURN extract(EPOCH FROM clock_timestamp() - started);
+END;
+$$;
+
+-- 4. ef_search sweep
+--    Sample rows are used as queries; recall = overlap of the HNSW
+--    top match_count with the exact (sequential scan) top match_count.
+--    The smallest ef_search with recall >= min_recall is chosen
+--    (otherwise the one with the highest recall).
+CREATE OR REPLACE FUNCTION tune_tennis_rules_hnsw(
+    ef_search_values INT[] DEFAULT ARRAY[20, 40, 80, 160],
+    sample_size INT DEFAULT 100,
+    match_count INT DEFAULT 10,
+    min_recall FLOAT DEFAULT 0.95
+)
+RETURNS TABLE (
+    ef_search INT,
+    recall FLOAT,
+    avg_ms FLOAT,
+    p95_ms FLOAT,
+    chosen BOOLEAN
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    run_started TIMESTAMPTZ := clock_timestamp();
+    index_options TEXT[];
+    total BIGINT;
+    sample_vector VECTOR;
+    ef INT;
+    exact_ids BIGINT[];
+    approx_ids BIGINT[];
+    started TIMESTAMPTZ;
+BEGIN
+    IF to_regclass('tennis_rules_embedding_cosine_idx') IS NULL THEN
+        RAISE EXCEPTION 'tennis_rules_embedding_cosine_idx does not exist; build it first';
+    END IF;
+    SELECT reloptions INTO index_options
+    FROM pg_class
+    WHERE oid = to_regclass('tennis_rules_embedding_cosine_idx');
+    SELECT count(*) INTO total FROM tennis_rules;
+
+    CREATE TEMP TABLE IF NOT EXISTS hnsw_tuning_samples (
+        ef INT,
+        hit_rate FLOAT,
+        elapsed_ms FLOAT
+    ) ON COMMIT DROP;
+
+    -- Small tables would otherwise be answered by a sequential scan
+    PERFORM set_config('enable_seqscan', 'off', true);
+
+    FOR sample_vector IN
+        SELECT tennis_rules.embedding
+        FROM tennis_rules
+        WHERE tennis_rules.embedding IS NOT NULL
+        ORDER BY random()
+        LIMIT sample_size
+    LOOP
+        -- "+ 0" keeps the ORDER BY off the index: exact ground truth
+        EXECUTE
+            'SELECT array_agg(id) FROM (
+                SELECT id FROM tennis_rules
+                WHERE embedding IS NOT NULL
+                ORDER BY (embedding <=> $1) + 0
+                LIMIT $2
+             ) AS exact_top'
+        INTO exact_ids
+        USING sample_vector, match_count;
+
+        FOREACH ef IN ARRAY ef_search_values LOOP
+            PERFORM set_config('hnsw.ef_search', ef::TEXT, true);
+            started := clock_timestamp();
+            EXECUTE
+                'SELECT array_agg(id) FROM (
+                    SELECT id FROM tennis_rules
+                    ORDER BY embedding <=> $1
+                    LIMIT $2
+                 ) AS approx_top'
+            INTO approx_ids
+            USING sample_vector, match_count;
+
+            INSERT INTO hnsw_tuning_samples (ef, hit_rate, elapsed_ms)
+            VALUES (
+                ef,
+                (SELECT count(*) FROM unnest(approx_ids) AS hit WHERE hit = ANY (exact_ids))::FLOAT
+                    / greatest(cardinality(exact_ids), 1),
+                extract(EPOCH FROM clock_timestamp() - started) * 1000
+            );
+        END LOOP;
+    END LOOP;
+
+    INSERT INTO tennis_rules_index_tuning
+        (run_at, row_count, m, ef_construction, ef_search, match_count, sample_size, recall, avg_ms, p95_ms)
+    SELECT
+        run_started,
+        total,
+        coalesce((SELECT split_part(o, '=', 2)::INT FROM unnest(index_options) AS o WHERE o LIKE 'm=%'), 16),
+        coalesce((SELECT split_part(o, '=', 2)::INT FROM unnest(index_options) AS o WHERE o LIKE 'ef_construction=%'), 64),
+        samples.ef,
+        match_count,
+        count(*),
+        avg(samples.hit_rate),
+        avg(samples.elapsed_ms),
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY samples.elapsed_ms)
+    FROM hnsw_tuning_samples AS samples
+    GROUP BY samples.ef;
+
+    UPDATE tennis_rules_index_tuning
+    SET chosen = true
+    WHERE tennis_rules_index_tuning.id = (
+        SELECT candidate.id
+        FROM tennis_rules_index_tuning AS candidate
+        WHERE candidate.run_at = run_started
+        ORDER BY
+            candidate.recall >= min_recall DESC,
+            CASE WHEN candidate.recall >= min_recall THEN candidate.ef_search END,
+            candidate.recall DESC,
+            candidate.ef_search
+        LIMIT 1
+    );
+
+    DROP TABLE hnsw_tuning_samples;
+
+    RETURN QUERY
+    SELECT
+        tennis_rules_index_tuning.ef_search,
+        tennis_rules_index_tuning.recall,
+        tennis_rules_index_tuning.avg_ms,
+        tennis_rules_index_tuning.p95_ms,
+        tennis_rules_index_tuning.chosen
+    FROM tennis_rules_index_tuning
+    WHERE tennis_rules_index_tuning.run_at = run_started
+    ORDER BY tennis_rules_index_tuning.ef_search;
+END;
+$$;
+
+-- 5. Service role only
+REVOKE EXECUTE ON FUNCTION drop_tennis_rules_vector_index FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION build_tennis_rules_vector_index FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION tune_tennis_rules_hnsw FROM PUBLIC, anon, authenticated;
+
+GRANT EXECUTE ON FUNCTION drop_tennis_rules_vector_index TO service_role;
+GRANT EXECUTE ON FUNCTION build_tennis_rules_vector_index TO service_role;
+GRANT EXECUTE ON FUNCTION tune_tennis_rules_hnsw TO service_role;
+
+-- Apply the chosen value for every session, e.g.
+--   ALTER DATABASE postgres SET hnsw.ef_search = 80;
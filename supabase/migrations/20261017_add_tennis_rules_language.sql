@@ -0,0 +1,165 @@
+-- ============================================================
+-- Tennis Rules RAG - Language column and per-language vector search
+-- ============================================================
+-- Every chunk belongs to one rulebook ('ko' or 'en'), but the
+-- language only lived in metadata->>'language', so match_tennis_rules
+-- walked the HNSW graph of both rulebooks and the threshold dropped
+-- the other language afterwards. The language is now a first-class
+-- column written by the loaders, each language has its own partial
+-- HNSW index, and match_tennis_rules_by_language searches only the
+-- corpus of the question's language.
+--
+-- Date: 2026-10-17
+--
+--   language   backfilled from metadata; written explicitly by
+--              upload / embed / export-sql and etl-tennis-rules
+--   indexes    tennis_rules_embedding_ko_idx, tennis_rules_embedding_en_idx
+--              (partial HNSW, WHERE language = ...). The full-table
+--              index stays for unfiltered searches (match_tennis_rules,
+--              hybrid search, the query cache fallback).
+--
+-- Declarative LIST partitions by language were considered, but the
+-- primary key and the chunk_hash unique constraint the loaders upsert
+-- on would both have to include the partition key. Partial indexes
+-- give the same per-query work (one corpus) on the existing table.
+-- ============================================================
+
+-- 1. Language column (NULL = unknown, found by unfiltered search only)
+ALTER TABLE tennis_rules
+ADD COLUMN IF NOT EXISTS language TEXT;
+
+UPDATE tennis_rules
+SET language = metadata->>'language'
+WHERE language IS NULL
+  AND metadata ? 'language';
+
+CREATE INDEX IF NOT EXISTS tennis_rules_language_idx
+ON tennis_rules(language);
+
+-- 2. One partial HNSW index per rulebook language
+--    Rebuilt by build_tennis_rules_vector_index (bulk load) and by the
+--    re-embedding job after a swap / rollback. Add a language here when
+--    a new rulebook is loaded.
+CREATE OR REPLACE FUNCTION build_tennis_rules_language_indexes(
+    m INT DEFAULT 16,
+    ef_construction INT DEFAULT 64
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    lang TEXT;
+BEGIN
+    FOREACH lang IN ARRAY ARRAY['ko', 'en'] LOOP
+        EXECUTE format('DROP INDEX IF EXISTS %I', 'tennis_rules_embedding_' || lang || '_idx');
+        EXECUTE format(
+            'CREATE INDEX %I
+             ON tennis_rules USING hnsw (embedding vector_cosine_ops)
+             WITH (m = %s, ef_construction = %s)
+             WHERE language = %L',
+            'tennis_rules_embedding_' || lang || '_idx', m, ef_construction, lang
+        );
+    END LOOP;
+END;
+$$;
+
+SELECT build_tennis_rules_language_indexes();
+
+-- 3. Bulk load (20261017_add_tennis_rules_index_tuning.sql) drops and
+--    rebuilds the per-language indexes together with the full one
+CREATE OR REPLACE FUNCTION drop_tennis_rules_vector_index()
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    DROP INDEX IF EXISTS tennis_rules_embedding_cosine_idx;
+    DROP INDEX IF EXISTS tennis_rules_embedding_ko_idx;
+    DROP INDEX IF EXISTS tennis_rules_embedding_en_idx;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION build_tennis_rules_vector_index(
+    m INT DEFAULT 16,
+    ef_construction INT DEFAULT 64,
+    maintenance_work_mem TEXT DEFAULT '1GB',
+    parallel_workers INT DEFAULT 2
+)
+RETURNS FLOAT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    started TIMESTAMPTZ := clock_timestamp();
+BEGIN
+    PERFORM set_config('maintenance_work_mem', maintenance_work_mem, true);
+    PERFORM set_config('max_parallel_maintenance_workers', parallel_workers::TEXT, true);
+
+    DROP INDEX IF EXISTS tennis_rules_embedding_cosine_idx;
+    EXECUTE format(
+        'CREATE INDEX tennis_rules_embedding_cosine_idx
+         ON tennis_rules USING hnsw (embedding vector_cosine_ops)
+         WITH (m = %s, ef_construction = %s)',
+        m, ef_construction
+    );
+    PERFORM build_tennis_rules_language_indexes(m, ef_construction);
+    ANALYZE tennis_rules;
+
+    RETURN extract(EPOCH FROM clock_timestamp() - started);
+END;
+$$;
+
+-- 4. Language-filtered vector search
+--    filter_language NULL → same as match_tennis_rules (both rulebooks)
+CREATE OR REPLACE FUNCTION match_tennis_rules_by_language(
+    query_embedding VECTOR(768),
+    filter_language TEXT DEFAULT NULL,
+    match_threshold FLOAT DEFAULT 0.3,
+    match_count INT DEFAULT 10
+)
+RETURNS TABLE (
+    id BIGINT,
+    source_file TEXT,
+    rule_id TEXT,
+    content TEXT,
+    metadata JSONB,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF filter_language IS NULL THEN
+        RETURN QUERY SELECT * FROM match_tennis_rules(query_embedding, match_threshold, match_count);
+        RETURN;
+    END IF;
+
+    -- The language is inlined as a literal: a generic plan with a
+    -- parameter could not prove the partial index predicate
+    RETURN QUERY EXECUTE format(
+        'SELECT
+            tennis_rules.id,
+            tennis_rules.source_file,
+            tennis_rules.rule_id,
+            tennis_rules.content,
+            tennis_rules.metadata,
+            (1 - (tennis_rules.embedding <=> $1))::FLOAT AS similarity
+         FROM tennis_rules
+         WHERE tennis_rules.language = %L
+           AND 1 - (tennis_rules.embedding <=> $1) > $2
+         ORDER BY tennis_rules.embedding <=> $1
+         LIMIT $3',
+        filter_language
+    )
+    USING query_embedding, match_threshold, match_count;
+END;
+$$;
+
+-- 5. Permissions
+GRANT EXECUTE ON FUNCTION match_tennis_rules_by_language TO anon, authenticated;
+
+REVOKE EXECUTE ON FUNCTION build_tennis_rules_language_indexes FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION build_tennis_rules_language_indexes TO service_role;
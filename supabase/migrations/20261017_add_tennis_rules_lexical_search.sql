@@ -0,0 +1,162 @@
+-- ============================================================
+-- Tennis Rules RAG - Lexical (full-text / trigram) search
+-- ============================================================
+-- Exact lookups such as "Rule 12", "제5조" or a keyword like "let"
+-- do not need an embedding: they are answered from indexes that
+-- Postgres maintains at insert time, so the ETL loaders need no
+-- changes and the query path never calls the embedding API.
+--
+-- Date: 2026-10-17
+--
+--   search_tsv:  generated tsvector, rule_id (weight A) + content (B),
+--                'simple' config so Korean and English tokens are kept
+--   trigram:     pg_trgm GIN on content / rule_id for Korean partial
+--                words (particles attached, e.g. "타이브레이크는") and
+--                the rule-number regex on rule_id
+--
+-- search_tennis_rules_lexical ranks rule-number matches first, then
+-- ts_rank_cd + word_similarity. match_tennis_rules_hybrid fuses it
+-- with match_tennis_rules using Reciprocal Rank Fusion; without an
+-- embedding it is lexical-only. The same scoring runs offline with
+--   python -m tennis_rag search --artifact <artifact> --mode lexical|hybrid
+-- ============================================================
+
+-- 1. Extensions and indexed columns
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE tennis_rules
+ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(rule_id, '')), 'A') ||
+    setweight(to_tsvector('simple', content), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS tennis_rules_search_tsv_idx
+ON tennis_rules
+USING gin (search_tsv);
+
+CREATE INDEX IF NOT EXISTS tennis_rules_content_trgm_idx
+ON tennis_rules
+USING gin (content gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS tennis_rules_rule_id_trgm_idx
+ON tennis_rules
+USING gin (rule_id gin_trgm_ops);
+
+-- 2. Lexical search (no embedding)
+--    similarity = 100 for a rule-number match on rule_id
+--                 + ts_rank_cd (any query word) + word_similarity
+CREATE OR REPLACE FUNCTION search_tennis_rules_lexical(
+    query_text TEXT,
+    match_count INT DEFAULT 10
+)
+RETURNS TABLE (
+    id BIGINT,
+    source_file TEXT,
+    rule_id TEXT,
+    content TEXT,
+    metadata JSONB,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    rule_number TEXT;
+    rule_pattern TEXT;
+    words TSQUERY;
+BEGIN
+    -- "Rule 12" / "Article 12" / "Section 12" / "제12조"
+    rule_number := coalesce(
+        substring(lower(query_text) FROM '(?:rule|article|section)\s*(\d+)'),
+        substring(query_text FROM '제\s*(\d+)\s*조')
+    );
+    IF rule_number IS NOT NULL THEN
+        -- rule_id formats: "12. BALL TOUCHES A LINE", "Rule 12", "제12조 ..."
+        rule_pattern := '^\s*(rule\s*)?' || rule_number || '(\.|\y)|제\s*' || rule_number || '\s*조';
+    END IF;
+
+    -- plainto_tsquery ANDs the words; any word should match
+    words := nullif(replace(plainto_tsquery('simple', query_text)::TEXT, '&', '|'), '')::TSQUERY;
+
+    RETURN QUERY
+    SELECT
+        tennis_rules.id,
+        tennis_rules.source_file,
+        tennis_rules.rule_id,
+        tennis_rules.content,
+        tennis_rules.metadata,
+        (
+            CASE WHEN tennis_rules.rule_id ~* rule_pattern THEN 100 ELSE 0 END
+            + coalesce(ts_rank_cd(tennis_rules.search_tsv, words), 0)
+            + word_similarity(query_text, tennis_rules.content)
+        )::FLOAT AS similarity
+    FROM tennis_rules
+    WHERE tennis_rules.rule_id ~* rule_pattern
+       OR tennis_rules.search_tsv @@ words
+       OR query_text <% tennis_rules.content
+    ORDER BY 6 DESC  -- similarity (the name would clash with the OUT column)
+    LIMIT match_count;
+END;
+$$;
+
+-- 3. Hybrid search: Reciprocal Rank Fusion of lexical and vector ranks
+--    score = 1 / (rrf_k + lexical_rank) + 1 / (rrf_k + vector_rank)
+--    query_embedding NULL → lexical only (e.g. rule-number questions)
+CREATE OR REPLACE FUNCTION match_tennis_rules_hybrid(
+    query_text TEXT,
+    query_embedding VECTOR(768) DEFAULT NULL,
+    match_threshold FLOAT DEFAULT 0.3,
+    match_count INT DEFAULT 10,
+    rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+    id BIGINT,
+    source_file TEXT,
+    rule_id TEXT,
+    content TEXT,
+    metadata JSONB,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF query_embedding IS NULL THEN
+        RETURN QUERY SELECT * FROM search_tennis_rules_lexical(query_text, match_count);
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    WITH lexical AS (
+        SELECT l.id, row_number() OVER (ORDER BY l.similarity DESC) AS rank
+        FROM search_tennis_rules_lexical(query_text, match_count * 4) AS l
+    ),
+    semantic AS (
+        SELECT m.id, row_number() OVER (ORDER BY m.similarity DESC) AS rank
+        FROM match_tennis_rules(query_embedding, match_threshold, match_count * 4) AS m
+    ),
+    fused AS (
+        SELECT
+            coalesce(lexical.id, semantic.id) AS rule_row,
+            coalesce(1.0 / (rrf_k + lexical.rank), 0) + coalesce(1.0 / (rrf_k + semantic.rank), 0) AS score
+        FROM lexical
+        FULL OUTER JOIN semantic ON semantic.id = lexical.id
+    )
+    SELECT
+        tennis_rules.id,
+        tennis_rules.source_file,
+        tennis_rules.rule_id,
+        tennis_rules.content,
+        tennis_rules.metadata,
+        fused.score::FLOAT AS similarity
+    FROM fused
+    JOIN tennis_rules ON tennis_rules.id = fused.rule_row
+    ORDER BY fused.score DESC
+    LIMIT match_count;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_tennis_rules_lexical TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION match_tennis_rules_hybrid TO anon, authenticated;
+
+-- Korean partial-word matching threshold for <% (default 0.6), e.g.
+--   SET pg_trgm.word_similarity_threshold = 0.4;
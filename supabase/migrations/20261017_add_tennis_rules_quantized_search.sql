@@ -0,0 +1,100 @@
+-- ============================================================
+-- Tennis Rules RAG - Quantized first-pass search with rerank
+-- ============================================================
+-- Adds smaller HNSW indexes over quantized copies of the embedding
+-- and a search function that uses them for a first pass, then
+-- reranks the candidates with the full-precision VECTOR(768) column.
+--
+-- Date: 2026-10-17
+-- Requires pgvector 0.7.0+ (halfvec, bit, binary_quantize)
+--
+--   halfvec: float16 index, ~half the memory of the vector index
+--   binary:  1 bit per dimension (96 bytes/row), hamming distance
+--
+-- The table keeps the float32 column, so the rerank step returns
+-- the same similarity as match_tennis_rules. Recall vs. memory for
+-- each setting can be measured offline with
+--   python -m tennis_rag.quantize --artifact <artifact>
+-- Once the first-pass recall is acceptable, the full-precision
+-- index (tennis_rules_embedding_cosine_idx) can be dropped; rerank
+-- only reads the candidate rows.
+--
+-- Dimension: the casts below are fixed at 768 to match
+-- tennis_rules.embedding VECTOR(768). The 256 / 512 Matryoshka
+-- dimensions in scripts/tennis_rag/quantize.py are for offline
+-- artifact search only; gen_sql / export-sql refuse to emit SQL
+-- for any other dimension (sql_export.SQL_EMBEDDING_DIM).
+-- ============================================================
+
+-- 1. Expression indexes over quantized embeddings
+CREATE INDEX IF NOT EXISTS tennis_rules_embedding_halfvec_idx
+ON tennis_rules
+USING hnsw ((embedding::halfvec(768)) halfvec_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS tennis_rules_embedding_binary_idx
+ON tennis_rules
+USING hnsw ((binary_quantize(embedding)::bit(768)) bit_hamming_ops);
+
+-- 2. First pass on a quantized index, rerank with full precision
+--    first_pass: 'halfvec' or 'binary'
+--    candidates = match_count * rerank_factor
+CREATE OR REPLACE FUNCTION match_tennis_rules_quantized(
+    query_embedding VECTOR(768),
+    match_threshold FLOAT DEFAULT 0.3,
+    match_count INT DEFAULT 10,
+    first_pass TEXT DEFAULT 'halfvec',
+    rerank_factor INT DEFAULT 4
+)
+RETURNS TABLE (
+    id BIGINT,
+    source_file TEXT,
+    rule_id TEXT,
+    content TEXT,
+    metadata JSONB,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF first_pass NOT IN ('halfvec', 'binary') THEN
+        RAISE EXCEPTION 'first_pass must be halfvec or binary, got %', first_pass;
+    END IF;
+
+    RETURN QUERY
+    WITH candidates AS (
+        -- ORDER BY expressions match the index expressions above
+        (
+            SELECT tennis_rules.id
+            FROM tennis_rules
+            WHERE first_pass = 'halfvec'
+            ORDER BY tennis_rules.embedding::halfvec(768) <=> query_embedding::halfvec(768)
+            LIMIT match_count * rerank_factor
+        )
+        UNION ALL
+        (
+            SELECT tennis_rules.id
+            FROM tennis_rules
+            WHERE first_pass = 'binary'
+            ORDER BY binary_quantize(tennis_rules.embedding)::bit(768) <~> binary_quantize(query_embedding)
+            LIMIT match_count * rerank_factor
+        )
+    )
+    SELECT
+        tennis_rules.id,
+        tennis_rules.source_file,
+        tennis_rules.rule_id,
+        tennis_rules.content,
+        tennis_rules.metadata,
+        1 - (tennis_rules.embedding <=> query_embedding) AS similarity
+    FROM tennis_rules
+    JOIN candidates ON candidates.id = tennis_rules.id
+    WHERE 1 - (tennis_rules.embedding <=> query_embedding) > match_threshold
+    ORDER BY tennis_rules.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION match_tennis_rules_quantized TO anon, authenticated;
+
+-- Larger candidate pools need a larger HNSW search list, e.g.
+--   SET hnsw.ef_search = 100;
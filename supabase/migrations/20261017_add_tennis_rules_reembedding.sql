@@ -0,0 +1,316 @@
+-- ============================================================
+-- Tennis Rules RAG - Blue/green re-embedding
+-- ============================================================
+-- Switching the embedding model or dimension without deleting and
+-- reloading the live rows. The job (python -m tennis_rag reembed)
+-- fills a shadow column while match_tennis_rules keeps serving the
+-- current one:
+--
+--   1. prepare_tennis_rules_reembedding   ADD COLUMN embedding_next VECTOR(dim)
+--                                         (catalog-only, no table rewrite)
+--   2. set_tennis_rules_embedding_next    batched UPDATE from the job
+--   3. build_tennis_rules_embedding_next_index
+--                                         HNSW on embedding_next (blocks
+--                                         writes, not reads, while it builds)
+--   4. match_tennis_rules_next            ANN / exact search on the shadow
+--                                         column for recall validation
+--   5. swap_tennis_rules_embedding        one transaction: embedding →
+--                                         embedding_previous, embedding_next →
+--                                         embedding, indexes renamed with them
+--   6. rollback_tennis_rules_embedding    swap back to embedding_previous
+--      drop_tennis_rules_embedding_previous
+--
+-- match_tennis_rules and the other search functions resolve
+-- tennis_rules.embedding by name at run time, so they read the new
+-- column as soon as the swap commits. Loaders keep writing
+-- "embedding" and must use the model recorded in
+-- tennis_rules_embedding_model (slot 'current').
+--
+-- Date: 2026-10-17
+-- The functions run DDL, so they are SECURITY DEFINER and only the
+-- service role may call them.
+-- ============================================================
+
+-- 1. Which model / dimension each column holds
+CREATE TABLE IF NOT EXISTS tennis_rules_embedding_model (
+    slot TEXT PRIMARY KEY CHECK (slot IN ('current', 'next', 'previous')),
+    model TEXT NOT NULL,
+    dim INT NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- The query model used by the tennis-rag-query edge function
+INSERT INTO tennis_rules_embedding_model (slot, model, dim)
+VALUES ('current', 'models/gemini-embedding-001', 768)
+ON CONFLICT (slot) DO NOTHING;
+
+ALTER TABLE tennis_rules_embedding_model ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view tennis rules embedding model"
+    ON tennis_rules_embedding_model
+    FOR SELECT
+    USING (true);
+
+GRANT SELECT ON tennis_rules_embedding_model TO anon, authenticated;
+
+-- 2. Shadow column (recreated when the target model / dimension changes)
+CREATE OR REPLACE FUNCTION prepare_tennis_rules_reembedding(
+    target_model TEXT,
+    target_dim INT,
+    reset BOOLEAN DEFAULT false
+)
+RETURNS TABLE (
+    total BIGINT,
+    remaining BIGINT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    existing_dim INT;
+    existing_model TEXT;
+BEGIN
+    -- pgvector stores the dimension as the column typmod
+    SELECT atttypmod INTO existing_dim
+    FROM pg_attribute
+    WHERE attrelid = 'tennis_rules'::REGCLASS
+      AND attname = 'embedding_next'
+      AND NOT attisdropped;
+    SELECT tennis_rules_embedding_model.model INTO existing_model
+    FROM tennis_rules_embedding_model
+    WHERE slot = 'next';
+
+    IF existing_dim IS NOT NULL
+       AND (reset OR existing_dim <> target_dim OR existing_model IS DISTINCT FROM target_model) THEN
+        ALTER TABLE tennis_rules DROP COLUMN embedding_next;
+        existing_dim := NULL;
+    END IF;
+
+    IF existing_dim IS NULL THEN
+        EXECUTE format('ALTER TABLE tennis_rules ADD COLUMN embedding_next VECTOR(%s)', target_dim);
+    END IF;
+
+    INSERT INTO tennis_rules_embedding_model (slot, model, dim, updated_at)
+    VALUES ('next', target_model, target_dim, NOW())
+    ON CONFLICT (slot) DO UPDATE
+    SET model = EXCLUDED.model, dim = EXCLUDED.dim, updated_at = EXCLUDED.updated_at;
+
+    RETURN QUERY EXECUTE
+        'SELECT count(*), count(*) FILTER (WHERE embedding_next IS NULL) FROM tennis_rules';
+END;
+$$;
+
+-- 3. Batched shadow-column update
+--    rows: [{"id": 1, "embedding": [0.1, ...]}, ...]
+CREATE OR REPLACE FUNCTION set_tennis_rules_embedding_next(rows JSONB)
+RETURNS INT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    updated INT;
+BEGIN
+    EXECUTE
+        'UPDATE tennis_rules
+         SET embedding_next = (item->>''embedding'')::VECTOR
+         FROM jsonb_array_elements($1) AS item
+         WHERE tennis_rules.id = (item->>''id'')::BIGINT'
+    USING rows;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
+
+-- 4. HNSW index on the shadow column
+CREATE OR REPLACE FUNCTION build_tennis_rules_embedding_next_index(
+    m INT DEFAULT 16,
+    ef_construction INT DEFAULT 64
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    EXECUTE format(
+        'CREATE INDEX IF NOT EXISTS tennis_rules_embedding_next_cosine_idx
+         ON tennis_rules USING hnsw (embedding_next vector_cosine_ops)
+         WITH (m = %s, ef_construction = %s)',
+        m, ef_construction
+    );
+END;
+$$;
+
+-- 5. Search on the shadow column
+--    exact = true orders by a non-indexable expression (full scan),
+--    used as ground truth for the HNSW recall check
+CREATE OR REPLACE FUNCTION match_tennis_rules_next(
+    query_embedding VECTOR,
+    match_count INT DEFAULT 10,
+    exact BOOLEAN DEFAULT false
+)
+RETURNS TABLE (
+    id BIGINT,
+    rule_id TEXT,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF exact THEN
+        RETURN QUERY EXECUTE
+            'SELECT id, rule_id, 1 - (embedding_next <=> $1)
+             FROM tennis_rules
+             WHERE embedding_next IS NOT NULL
+             ORDER BY (embedding_next <=> $1) + 0
+             LIMIT $2'
+        USING query_embedding, match_count;
+    ELSE
+        RETURN QUERY EXECUTE
+            'SELECT id, rule_id, 1 - (embedding_next <=> $1)
+             FROM tennis_rules
+             ORDER BY embedding_next <=> $1
+             LIMIT $2'
+        USING query_embedding, match_count;
+    END IF;
+END;
+$$;
+
+-- 6. Atomic swap
+CREATE OR REPLACE FUNCTION swap_tennis_rules_embedding()
+RETURNS TABLE (
+    model TEXT,
+    dim INT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    missing BIGINT;
+BEGIN
+    -- Writers wait until commit; readers keep using the old column until then
+    LOCK TABLE tennis_rules IN SHARE ROW EXCLUSIVE MODE;
+
+    EXECUTE 'SELECT count(*) FROM tennis_rules WHERE embedding_next IS NULL' INTO missing;
+    IF missing > 0 THEN
+        RAISE EXCEPTION '% rows have no embedding_next yet; rerun the re-embedding job first', missing;
+    END IF;
+    IF to_regclass('tennis_rules_embedding_next_cosine_idx') IS NULL THEN
+        RAISE EXCEPTION 'tennis_rules_embedding_next_cosine_idx does not exist; build the index first';
+    END IF;
+
+    ALTER TABLE tennis_rules DROP COLUMN IF EXISTS embedding_previous;
+    ALTER TABLE tennis_rules RENAME COLUMN embedding TO embedding_previous;
+    ALTER TABLE tennis_rules RENAME COLUMN embedding_next TO embedding;
+    ALTER INDEX IF EXISTS tennis_rules_embedding_cosine_idx RENAME TO tennis_rules_embedding_previous_cosine_idx;
+    ALTER INDEX tennis_rules_embedding_next_cosine_idx RENAME TO tennis_rules_embedding_cosine_idx;
+
+    -- Quantized expression indexes follow the old column; rebuild them
+    -- with 20261017_add_tennis_rules_quantized_search.sql if needed
+    DROP INDEX IF EXISTS tennis_rules_embedding_halfvec_idx;
+    DROP INDEX IF EXISTS tennis_rules_embedding_binary_idx;
+
+    DELETE FROM tennis_rules_embedding_model WHERE slot = 'previous';
+    UPDATE tennis_rules_embedding_model SET slot = 'previous', updated_at = NOW() WHERE slot = 'current';
+    UPDATE tennis_rules_embedding_model SET slot = 'current', updated_at = NOW() WHERE slot = 'next';
+
+    -- Cached retrievals were computed against the old vectors
+    IF to_regclass('tennis_rules_query_cache') IS NOT NULL THEN
+        DELETE FROM tennis_rules_query_cache;
+    END IF;
+
+    RETURN QUERY
+    SELECT tennis_rules_embedding_model.model, tennis_rules_embedding_model.dim
+    FROM tennis_rules_embedding_model
+    WHERE slot = 'current';
+END;
+$$;
+
+-- 7. Rollback / cleanup
+CREATE OR REPLACE FUNCTION rollback_tennis_rules_embedding()
+RETURNS TABLE (
+    model TEXT,
+    dim INT
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    current_row tennis_rules_embedding_model%ROWTYPE;
+    previous_row tennis_rules_embedding_model%ROWTYPE;
+BEGIN
+    LOCK TABLE tennis_rules IN SHARE ROW EXCLUSIVE MODE;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = 'tennis_rules'::REGCLASS AND attname = 'embedding_previous' AND NOT attisdropped
+    ) THEN
+        RAISE EXCEPTION 'embedding_previous does not exist; nothing to roll back';
+    END IF;
+
+    ALTER TABLE tennis_rules RENAME COLUMN embedding TO embedding_rollback;
+    ALTER TABLE tennis_rules RENAME COLUMN embedding_previous TO embedding;
+    ALTER TABLE tennis_rules RENAME COLUMN embedding_rollback TO embedding_previous;
+    ALTER INDEX IF EXISTS tennis_rules_embedding_cosine_idx RENAME TO tennis_rules_embedding_rollback_idx;
+    ALTER INDEX IF EXISTS tennis_rules_embedding_previous_cosine_idx RENAME TO tennis_rules_embedding_cosine_idx;
+    ALTER INDEX IF EXISTS tennis_rules_embedding_rollback_idx RENAME TO tennis_rules_embedding_previous_cosine_idx;
+
+    -- Swap the two slots (a prepared 'next' row is left alone)
+    SELECT * INTO current_row FROM tennis_rules_embedding_model WHERE slot = 'current';
+    SELECT * INTO previous_row FROM tennis_rules_embedding_model WHERE slot = 'previous';
+    DELETE FROM tennis_rules_embedding_model WHERE slot IN ('current', 'previous');
+    INSERT INTO tennis_rules_embedding_model (slot, model, dim)
+    SELECT 'current', previous_row.model, previous_row.dim WHERE previous_row.model IS NOT NULL
+    UNION ALL
+    SELECT 'previous', current_row.model, current_row.dim WHERE current_row.model IS NOT NULL;
+
+    IF to_regclass('tennis_rules_query_cache') IS NOT NULL THEN
+        DELETE FROM tennis_rules_query_cache;
+    END IF;
+
+    RETURN QUERY
+    SELECT tennis_rules_embedding_model.model, tennis_rules_embedding_model.dim
+    FROM tennis_rules_embedding_model
+    WHERE slot = 'current';
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION drop_tennis_rules_embedding_previous()
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    ALTER TABLE tennis_rules DROP COLUMN IF EXISTS embedding_previous;
+    DELETE FROM tennis_rules_embedding_model WHERE slot = 'previous';
+END;
+$$;
+
+-- 8. Service role only
+REVOKE EXECUTE ON FUNCTION prepare_tennis_rules_reembedding FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION set_tennis_rules_embedding_next FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION build_tennis_rules_embedding_next_index FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION match_tennis_rules_next FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION swap_tennis_rules_embedding FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION rollback_tennis_rules_embedding FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION drop_tennis_rules_embedding_previous FROM PUBLIC, anon, authenticated;
+
+GRANT EXECUTE ON FUNCTION prepare_tennis_rules_reembedding TO service_role;
+GRANT EXECUTE ON FUNCTION set_tennis_rules_embedding_next TO service_role;
+GRANT EXECUTE ON FUNCTION build_tennis_rules_embedding_next_index TO service_role;
+GRANT EXECUTE ON FUNCTION match_tennis_rules_next TO service_role;
+GRANT EXECUTE ON FUNCTION swap_tennis_rules_embedding TO service_role;
+GRANT EXECUTE ON FUNCTION rollback_tennis_rules_embedding TO service_role;
+GRANT EXECUTE ON FUNCTION drop_tennis_rules_embedding_previous TO service_role;
+
+-- The HNSW build can exceed the API statement timeout on large tables;
+-- run it from the SQL editor instead (CONCURRENTLY keeps writes open):
+--   CREATE INDEX CONCURRENTLY tennis_rules_embedding_next_cosine_idx
+--   ON tennis_rules USING hnsw (embedding_next vector_cosine_ops);
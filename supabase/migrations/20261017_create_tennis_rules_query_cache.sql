@@ -0,0 +1,89 @@
+-- ============================================================
+-- Tennis Rules RAG - Precomputed query cache
+-- ============================================================
+-- Frequent questions, normalized, with their query embedding and
+-- the match_tennis_rules result computed in bulk by
+--   python -m tennis_rag.query_cache
+-- so the tennis-rag-query edge function can skip the embedding call
+-- and the vector search for them (and reuse generated answers).
+--
+-- Date: 2026-10-17
+-- normalized_question = NFKC + lowercase, punctuation removed,
+--   whitespace collapsed (same in query_cache.py and the edge function)
+-- Any write to tennis_rules empties the cache (statement trigger),
+-- so a stale result is never served; rebuild it after each ETL run.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS tennis_rules_query_cache (
+    normalized_question TEXT PRIMARY KEY,
+    question TEXT NOT NULL,             -- Most frequent original form
+    language TEXT,                      -- ko / en
+    frequency INT DEFAULT 1,            -- Occurrences in the question log
+
+    -- Query embedding (gemini-embedding-001, RETRIEVAL_QUERY, 768 dims)
+    embedding VECTOR(768),
+
+    -- Retrieval result: [{chunk_hash, rule_id, source_file, similarity}, ...]
+    results JSONB NOT NULL,
+    match_threshold FLOAT NOT NULL,
+    match_count INT NOT NULL,
+
+    -- Generated answers keyed by "<model>:<match_count>:<match_threshold>"
+    answers JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+    -- sha256 of the sorted tennis_rules.chunk_hash values at build time
+    corpus_version TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Nearest cached question for an embedding
+CREATE INDEX IF NOT EXISTS tennis_rules_query_cache_embedding_idx
+ON tennis_rules_query_cache
+USING hnsw (embedding vector_cosine_ops);
+
+CREATE OR REPLACE FUNCTION match_tennis_rules_query_cache(
+    query_embedding VECTOR(768),
+    min_similarity FLOAT DEFAULT 0.95,
+    match_count INT DEFAULT 1
+)
+RETURNS TABLE (
+    normalized_question TEXT,
+    question TEXT,
+    results JSONB,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        c.normalized_question,
+        c.question,
+        c.results,
+        1 - (c.embedding <=> query_embedding) AS similarity
+    FROM tennis_rules_query_cache c
+    WHERE 1 - (c.embedding <=> query_embedding) > min_similarity
+    ORDER BY c.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
+
+-- Invalidate on any change to the rules
+CREATE OR REPLACE FUNCTION invalidate_tennis_rules_query_cache()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM tennis_rules_query_cache;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tennis_rules_query_cache_invalidate ON tennis_rules;
+CREATE TRIGGER tennis_rules_query_cache_invalidate
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tennis_rules
+FOR EACH STATEMENT
+EXECUTE FUNCTION invalidate_tennis_rules_query_cache();
+
+-- Only the edge function (service role) and the builder use this table
+ALTER TABLE tennis_rules_query_cache ENABLE ROW LEVEL SECURITY;